@@ -1,17 +1,33 @@
-import requests
 import hmac
 import hashlib
 import yaml
 import time
 import json
 import random
-import websocket
 import sqlite3
 import os
+import atexit
+import logging
+import threading
 from datetime import datetime
-from threading import Thread
-from helpers import initialize_database, save_to_database, generate_signature
-from helpers import log_info, log_error, update_metrics  # Centralisé dans helpers.py
+from concurrent.futures import ThreadPoolExecutor
+from helpers import log_info, log_error, update_metrics, initialize_api_tracker  # Centralisé dans helpers.py
+from helpers import exchange_base_url, exchange_stream_url, rebase_stream_url
+from log_pipeline import configure_log_levels, get_logger
+from arbitrage_loops import LoopRepricer, find_arbitrage_loops, pair_symbol
+from loop_pricing import DepthLoopSizer
+from order_book_store import OrderBookStore
+from feed_manager import FeedManager
+from frame_decoder import DepthRecord, decode_frame
+from local_order_book import LocalOrderBookManager
+from http_client import get_http_client
+from order_signing import format_quantity, get_order_builder, parse_lot_sizes
+from order_dispatch import OrderDispatcher, prepare_loop_orders
+from market_recorder import MarketRecorder
+from columnar_store import EXECUTION_COLUMNS, TICK_COLUMNS, ColumnarWriter, execution_row
+from trade_writer import TradeWriter
+import instrumentation
+from instrumentation import span
 
 DB_PATH = "/data/tradeV3.sqlite"
 
@@ -21,17 +37,56 @@ with open("/config/config.yml", "r") as config_file:
 
 API_KEYS = config["api_keys"]
 SECRET_KEYS = config["secret_keys"]
-BASE_URL = "https://api.binance.com"
-WEB_SOCKET_URLS = [config[f"ws{i}_url"] for i in range(1, 21)]
+BASE_URL = exchange_base_url(config)  # BINANCE_BASE_URL permet de viser l'échange simulé (mock_exchange.py)
+WEB_SOCKET_URLS = [rebase_stream_url(config[f"ws{i}_url"], config) for i in range(1, 21)]
 
-order_book_cache = {}
+# Logs par trade en %-style paresseux ; LOG_LEVELS="arbitrage_execution=WARNING" (ou log_levels) les coupe
+logger = get_logger("arbitrage_execution")
+configure_log_levels(config.get("log_levels"))
+
+order_book_cache = OrderBookStore()  # Carnets convertis une seule fois en float64, lus par vues sans copie
+loop_repricer = None  # LoopRepricer des paires assignées, réévalué à chaque mise à jour de profondeur
+repricer_lock = threading.Lock()  # Flux WebSocket et resynchronisations des carnets locaux (executor) réévaluent en parallèle
+RANKED_LOOPS = config.get("ranked_loops", 20)  # Taille du top-K qui décide des boucles évaluées
+depth_sizer = DepthLoopSizer()  # Taille exécutable des boucles d'après les 5 niveaux de profondeur
+order_dispatcher = None  # OrderDispatcher du mode live, créé au premier ordre réel
+symbol_lot_sizes = {}  # Filtres LOT_SIZE / NOTIONAL des symboles des boucles, chargés au démarrage
+trade_writer = TradeWriter(DB_PATH)  # Écriture des trades par lots depuis un thread dédié
+
+# Stockage colonnaire optionnel (Parquet partitionné par date et symbole) des exécutions et des ticks
+columnar_config = config.get("columnar_store") or {}
+execution_store = tick_store = None
+if columnar_config.get("path"):
+    execution_store = ColumnarWriter(os.path.join(columnar_config["path"], "executions"), EXECUTION_COLUMNS,
+                                     batch_rows=columnar_config.get("batch_rows", 50000))
+    atexit.register(execution_store.close)
+    if columnar_config.get("record_ticks", False):
+        tick_store = ColumnarWriter(os.path.join(columnar_config["path"], "ticks"), TICK_COLUMNS,
+                                    batch_rows=columnar_config.get("batch_rows", 50000))
+        atexit.register(tick_store.close)
+
+# Réévaluation des boucles après la mise à jour du carnet d'un symbole
+def on_book_update(symbol):
+    if loop_repricer is not None:
+        # Ne recalcule que les boucles contenant ce symbole
+        with span("reprice"), repricer_lock:
+            loop_repricer.update_price(symbol, order_book_cache.best_bid(symbol), order_book_cache.best_ask(symbol))
+    if tick_store is not None:
+        book = order_book_cache.book(symbol)
+        if book is None or not len(book[0]) or not len(book[1]):
+            return  # Carnet inconnu ou côté vide (resynchronisation, paire sans contrepartie) : pas de tick
+        bids, asks = book
+        tick_store.append({"symbol": symbol, "bid": float(bids[0][0]), "ask": float(asks[0][0]),
+                           "bid_quantity": float(bids[0][1]), "ask_quantity": float(asks[0][1])})
 
 # Gestion des messages WebSocket
 def on_message(ws, message):
-    data = json.loads(message)
-    symbol = data.get("s")
-    if symbol:
-        order_book_cache[symbol] = data
+    with span("decode"):
+        record = decode_frame(message)  # Enregistrement typé (msgspec / orjson si installés)
+    if isinstance(record, DepthRecord) and record.symbol:
+        with span("book_update"):
+            order_book_cache.update(record.symbol, record.bids, record.asks)
+        on_book_update(record.symbol)
 
 def on_error(ws, error):
     log_error(f"Erreur WebSocket : {error}")
@@ -39,47 +94,43 @@ def on_error(ws, error):
 def on_close(ws):
     log_info("Connexion WebSocket fermée")
 
-# Connexion WebSocket pour chaque paire active
+# Connexions WebSocket combinées pour les paires actives (quelques connexions, un seul thread asyncio)
 def open_websocket_connections(symbols):
-    def start_ws(symbol):
-        url = f"wss://stream.binance.com:9443/ws/{symbol.lower()}@depth5"
-        ws = websocket.WebSocketApp(url, on_message=on_message, on_error=on_error, on_close=on_close)
-        ws.run_forever()
-
-    threads = [Thread(target=start_ws, args=(symbol,)) for symbol in symbols]
-    for thread in threads:
-        thread.start()
-    for thread in threads:
-        thread.join()
+    local_books = None
+    stream_suffix = "@depth5"
+    if config.get("local_order_books", False):
+        # Carnets locaux complets : diffs @depth appliqués sur un snapshot REST récupéré en arrière-plan
+        local_books = LocalOrderBookManager(store=order_book_cache, executor=ThreadPoolExecutor(max_workers=4),
+                                            on_update=on_book_update)
+        stream_suffix = "@depth@100ms"
+    # Enregistrement optionnel des trames brutes pour le rejeu hors production (market_recorder.py)
+    recorder = MarketRecorder(config["record_market_data"]) if config.get("record_market_data") else None
+    feed_manager = FeedManager(symbols, order_book_cache, base_url=exchange_stream_url(config), stream_suffix=stream_suffix,
+                               on_update=on_book_update, local_books=local_books, recorder=recorder)
+    feed_manager.start_in_thread()
+    atexit.register(feed_manager.stop)
+    return feed_manager
 
 # Placer un ordre sur Binance
 def place_order(symbol, side, quantity, api_key, secret_key, order_type="MARKET", price=None):
-    url = f"{BASE_URL}/api/v3/order"
-    timestamp = int(time.time() * 1000)
-    params = {
-        "symbol": symbol,
-        "side": side,
-        "type": order_type,
-        "quantity": quantity,
-        "timestamp": timestamp,
-    }
-
-    if order_type == "LIMIT" and price:
-        params["price"] = price
-        params["timeInForce"] = "GTC"
-
-    query_string = "&".join([f"{key}={value}" for key, value in params.items()])
-    signature = generate_signature(query_string, secret_key)
-    params["signature"] = signature
-
-    headers = {"X-MBX-APIKEY": api_key}
-    response = requests.post(url, headers=headers, params=params)
+    # Query string précalculée par (symbole, sens, type) et HMAC de la clé copié : pas de re-keying
+    order = get_order_builder(api_key, secret_key, BASE_URL).build(symbol, side, quantity, order_type, price)
+    with span("place_order"):
+        response = get_http_client().post(order.url, headers=order.headers)
     if response.status_code == 200:
-        log_info(f"Ordre {side} exécuté pour {symbol} à {quantity}")
+        logger.info("Ordre %s exécuté pour %s à %s", side, symbol, quantity)
         return response.json()
     else:
-        log_error(f"Erreur lors du placement de l'ordre pour {symbol}")
+        logger.error("Erreur lors du placement de l'ordre pour %s", symbol)
+        return None
+
+# Symboles des boucles rentables du top-K du repricer (None sans repricer : toutes les boucles sont évaluées)
+def ranked_loop_symbols(k=RANKED_LOOPS):
+    if loop_repricer is None:
         return None
+    with repricer_lock:
+        ranking = loop_repricer.top(k)
+    return {frozenset(pair_symbol(pair) for pair in loop) for loop, profit in ranking if profit > 0}
 
 # Charger les boucles d’arbitrage identifiées
 def load_arbitrage_loops():
@@ -87,22 +138,79 @@ def load_arbitrage_loops():
         config_data = yaml.safe_load(config_file)
         return config_data.get("arbitrage_loops", [])
 
+# Limiter la taille de la boucle à celle qui maximise le profit sur les 5 niveaux des carnets
+def loop_size_ratio(loop):
+    """Ratio (<= 1) à appliquer aux quantités de la boucle, ou None si elle n'est pas rentable ou si sa profondeur est inconnue."""
+    order_books = [order_book_cache.book(trade["symbol"]) for trade in loop]
+    if len(loop) != 3 or any(order_book is None for order_book in order_books):
+        # Sans les trois carnets, la taille exécutable est inconnue : la boucle n'est pas envoyée
+        logger.warning("Profondeur inconnue, boucle ignorée : %s", [trade["symbol"] for trade in loop])
+        return None
+    depth_sizer.load_order_books(order_books, [trade["side"] for trade in loop])
+    notional, expected_profit = depth_sizer.size(config["trading_fee"], config.get("min_return", 0.0))
+    if notional <= 0:
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Boucle non rentable sur la profondeur disponible : %s", [trade["symbol"] for trade in loop])
+        return None
+    first_leg = loop[0]
+    requested_notional = first_leg["quantity"] * depth_sizer.books[0, 0, 0] if first_leg["side"] == "BUY" else first_leg["quantity"]
+    size_ratio = min(1.0, notional / requested_notional) if requested_notional > 0 else 1.0
+    logger.info("Taille exécutable : %s | Profit attendu : %s | Ratio appliqué : %s", notional, expected_profit, size_ratio)
+    return size_ratio
+
+# Charger les filtres de quantité (LOT_SIZE, NOTIONAL) des symboles échangés
+def load_lot_sizes(symbols):
+    try:
+        response = get_http_client().get(f"{BASE_URL}/api/v3/exchangeInfo", endpoint="/api/v3/exchangeInfo",
+                                         params={"symbols": json.dumps(sorted(symbols), separators=(",", ":"))})
+        response.raise_for_status()
+        symbol_lot_sizes.update(parse_lot_sizes(response.json()))
+    except Exception as e:
+        log_error(f"Erreur lors du chargement des filtres LOT_SIZE : {e}")
+    missing = set(symbols) - set(symbol_lot_sizes)
+    if missing:
+        logger.warning("Filtres LOT_SIZE inconnus, boucles concernées ignorées : %s", sorted(missing))
+
+# Quantités de la boucle à la taille retenue, arrondies au stepSize et formatées sans exposant
+def sized_legs(loop, size_ratio):
+    """Jambes prêtes à l'envoi, ou None si un symbole n'a pas de filtre connu ou passe sous minQty/minNotional."""
+    legs = []
+    for trade in loop:
+        symbol = trade["symbol"]
+        lot_size = symbol_lot_sizes.get(symbol)
+        if lot_size is None:
+            logger.warning("Filtre LOT_SIZE inconnu pour %s, boucle ignorée", symbol)
+            return None
+        price = order_book_cache.best_ask(symbol) if trade["side"] == "BUY" else order_book_cache.best_bid(symbol)
+        quantity = format_quantity(trade["quantity"] * size_ratio, lot_size, price)
+        if quantity is None:
+            # Une jambe seule laisserait une position ouverte : toute la boucle est ignorée
+            logger.info("Quantité de %s sous minQty/minNotional après arrondi, boucle ignorée", symbol)
+            return None
+        legs.append(dict(trade, quantity=quantity))
+    return legs
+
 # Exécuter des transactions pour chaque étape de la boucle
 def execute_trade(loop, api_key, secret_key):
     total_profit = 0
     usdt_balance = config["initial_usdt_balance"]
-    for trade in loop:
+
+    size_ratio = loop_size_ratio(loop)
+    legs = sized_legs(loop, size_ratio) if size_ratio is not None else None
+    if legs is None:
+        return total_profit, usdt_balance
+
+    for trade in legs:
         symbol = trade["symbol"]
         side = trade["side"]
-        quantity = trade["quantity"]
+        quantity = float(trade["quantity"])
 
-        order_book = order_book_cache.get(symbol)
-        if order_book:
-            price = float(order_book["bids"][0][0]) if side == "BUY" else float(order_book["asks"][0][0])
+        if symbol in order_book_cache:
+            price = order_book_cache.best_bid(symbol) if side == "BUY" else order_book_cache.best_ask(symbol)
             profit = (price * quantity * (1 - config["trading_fee"])) - (price * quantity)
             total_profit += profit
             usdt_balance += profit
-            log_info(f"Trade exécuté : {symbol} | Profit : {profit} USDT | Balance actuelle : {usdt_balance}")
+            logger.info("Trade exécuté : %s | Profit : %s USDT | Balance actuelle : %s", symbol, profit, usdt_balance)
 
             # Préparer les données pour la base
             trade_data = {
@@ -147,20 +255,55 @@ def execute_trade(loop, api_key, secret_key):
                 "final_balance": usdt_balance
             }
 
-            save_to_database(trade_data)  # Enregistrer dans la base
+            with span("save"):
+                trade_writer.submit(trade_data)  # Mise en file : l'écriture groupée se fait hors de la boucle
+                if execution_store is not None:
+                    execution_store.append(execution_row(trade_data))  # Écrit par lots en Parquet
         else:
-            log_error(f"Aucun carnet d'ordres pour {symbol} dans le cache")
+            logger.error("Aucun carnet d'ordres pour %s dans le cache", symbol)
             continue
 
-    update_metrics(loop, total_profit)  # Mettre à jour les métriques pour Prometheus/Grafana
+    update_metrics("loop_profit", total_profit)  # Mettre à jour les métriques pour Prometheus/Grafana
     return total_profit, usdt_balance
 
+# Exécution réelle : les trois ordres sont signés d'avance puis envoyés selon la politique configurée
+def execute_trade_live(loop, api_key, secret_key):
+    global order_dispatcher
+    size_ratio = loop_size_ratio(loop)
+    legs = sized_legs(loop, size_ratio) if size_ratio is not None else None
+    if legs is None:
+        return None
+
+    if order_dispatcher is None:
+        # Envoi séquentiel par défaut : concurrent/pipelined seulement si les soldes de chaque actif sont déjà détenus
+        order_dispatcher = OrderDispatcher(config.get("dispatch_policy", "sequential"),
+                                           stagger_seconds=config.get("dispatch_stagger_seconds", 0.002),
+                                           pre_held_inventory=config.get("pre_held_inventory", False))
+    builder = get_order_builder(api_key, secret_key, BASE_URL)
+    trace = order_dispatcher.dispatch(prepare_loop_orders(builder, legs), legs)
+
+    for leg in trace.legs:
+        logger.info("Jambe %s %s %s | statut : %s | exécuté : %s/%s | accusé : %s s | erreur : %s",
+                    leg.leg, leg.symbol, leg.side, leg.order_status, leg.executed_quantity, leg.quantity,
+                    leg.ack_seconds, leg.error)
+    logger.info("Boucle %s en %s s (politique %s)", "exécutée" if trace.succeeded else "incomplète",
+                trace.completion_seconds, trace.policy)
+    if trace.exposed_legs:
+        # Exécution partielle : les jambes passées sont inversées pour ne pas garder de position ouverte
+        unwound = order_dispatcher.unwind(builder, trace)
+        logger.warning("Boucle dénouée : %s ordre(s) inverse(s) exécuté(s) sur %s",
+                       sum(leg.filled for leg in unwound), len(unwound))
+    return trace
+
 # Fonction principale
 if __name__ == "__main__":
     log_info("Démarrage de l'exécution des transactions d'arbitrage...")
 
-    # Initialiser la base de données
-    initialize_database()
+    # Seaux de poids des clés API partagés par les requêtes REST (snapshots des carnets locaux, ordres)
+    initialize_api_tracker(API_KEYS)
+
+    # Histogrammes des étapes du chemin critique sur le port 9200 (INSTRUMENTATION=1)
+    instrumentation.serve_metrics()
 
     # Charger les boucles d'arbitrage
     arbitrage_loops = load_arbitrage_loops()
@@ -169,14 +312,27 @@ if __name__ == "__main__":
     api_key = random.choice(API_KEYS)
     secret_key = SECRET_KEYS[API_KEYS.index(api_key)]
 
+    # Index des boucles triangulaires des paires assignées pour la réévaluation incrémentale
+    assigned_pairs = config.get("assigned_pairs", [])
+    if assigned_pairs:
+        loop_repricer = LoopRepricer(find_arbitrage_loops(assigned_pairs), config["trading_fee"])
+
     # Lancer les WebSockets pour les paires actives
     pairs = [trade["symbol"] for loop in arbitrage_loops for trade in loop]
     unique_pairs = list(set(pairs))
-    open_websocket_connections(unique_pairs)
+    load_lot_sizes(unique_pairs)
+    feed_manager = open_websocket_connections(unique_pairs)  # Non bloquant : les carnets se remplissent en arrière-plan
 
-    # Exécution des boucles
+    # Exécution des boucles : avec un repricer, seules celles de son top-K rentable sont évaluées
     for loop in arbitrage_loops:
+        ranked = ranked_loop_symbols()
+        if ranked is not None and frozenset(trade["symbol"] for trade in loop) not in ranked:
+            logger.info("Boucle hors du top %s rentable, ignorée : %s", RANKED_LOOPS, [trade["symbol"] for trade in loop])
+            continue
         log_info(f"Exécution de la boucle : {loop}")
-        profit, balance = execute_trade(loop, api_key, secret_key)
-        log_info(f"Profit total de la boucle : {profit} USDT")
+        if config.get("live_trading", False):
+            execute_trade_live(loop, api_key, secret_key)
+        else:
+            profit, balance = execute_trade(loop, api_key, secret_key)
+            log_info(f"Profit total de la boucle : {profit} USDT")
         time.sleep(1)
@@ -1,7 +1,7 @@
 import logging
 import json
 from datetime import datetime
-from helpers import save_json, load_json, push_prometheus_metric
+from error_logging import get_error_sink
 
 # -----------------------------
 # CONFIGURATION DU LOGGER
@@ -9,7 +9,7 @@ from helpers import save_json, load_json, push_prometheus_metric
 
 logger = logging.getLogger("error_logging")
 logger.setLevel(logging.ERROR)
-file_handler = logging.FileHandler("../data/error_logs.json", mode='a')
+file_handler = logging.FileHandler("../data/error_logs.log", mode='a')  # Texte à part du journal JSONL
 file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
 logger.addHandler(file_handler)
 
@@ -17,11 +17,10 @@ logger.addHandler(file_handler)
 # GESTION DES ERREURS
 # -----------------------------
 
-ERROR_LOG_FILE = "../data/error_logs.json"
-
 def log_critical_error(message: str, details: str = "", prometheus_url: str = None) -> None:
     """
-    Enregistre une erreur critique dans le fichier JSON et pousse une alerte vers Prometheus si configurée.
+    Enregistre une erreur critique dans le journal JSONL et pousse une alerte vers Prometheus si configurée.
+    L'écriture et l'alerte ont lieu dans le thread du journal : l'appelant n'attend ni le disque ni le réseau.
     """
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     error_entry = {
@@ -31,22 +30,15 @@ def log_critical_error(message: str, details: str = "", prometheus_url: str = No
         "details": details
     }
 
-    # Ajout au fichier JSON
-    existing_logs = load_json(ERROR_LOG_FILE) or []
-    existing_logs.append(error_entry)
-    save_json(existing_logs, ERROR_LOG_FILE)
+    # Ajout au journal JSONL (et alerte Prometheus regroupée par lot)
+    get_error_sink().submit(error_entry, alert_url=prometheus_url)
 
     # Log dans le logger standard
     logger.critical(f"{message} - {details}")
 
-    # Alerte vers Prometheus
-    if prometheus_url:
-        metric_name = "pipeline_critical_errors"
-        push_prometheus_metric(metric_name, 1, prometheus_url)
-
 def log_warning(message: str, details: str = "") -> None:
     """
-    Enregistre un avertissement dans le fichier JSON et les logs locaux.
+    Enregistre un avertissement dans le journal JSONL et les logs locaux.
     """
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     warning_entry = {
@@ -56,20 +48,18 @@ def log_warning(message: str, details: str = "") -> None:
         "details": details
     }
 
-    # Ajout au fichier JSON
-    existing_logs = load_json(ERROR_LOG_FILE) or []
-    existing_logs.append(warning_entry)
-    save_json(existing_logs, ERROR_LOG_FILE)
+    # Ajout au journal JSONL
+    get_error_sink().submit(warning_entry)
 
     # Log dans le logger standard
     logger.warning(f"{message} - {details}")
 
-def get_recent_errors(limit: int = 10) -> list:
+def get_recent_errors(limit: int = 10, from_memory: bool = False) -> list:
     """
-    Récupère les erreurs les plus récentes enregistrées dans le fichier JSON.
+    Récupère les erreurs les plus récentes en lisant le journal depuis la fin
+    (ou le tampon circulaire du processus si from_memory).
     """
-    logs = load_json(ERROR_LOG_FILE) or []
-    return logs[-limit:]
+    return get_error_sink().recent(limit, from_memory)
 
 # -----------------------------
 # TEST DES FONCTIONS (FACULTATIF)
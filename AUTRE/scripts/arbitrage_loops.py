@@ -1,9 +1,21 @@
+import math
 import yaml
+import bisect
 import itertools
+from collections import defaultdict
 from helpers import log_info, log_error, update_metrics  # Répartition vers helpers.py
 
 CONFIG_PATH = "/config/"  # Répertoire où sont stockés les fichiers config.yml individuels pour chaque WebSocket
 
+# Charge les frais de trading depuis le fichier de configuration associé à ce WebSocket (0 si absents)
+def load_trading_fee(ws_id):
+    try:
+        with open(f"{CONFIG_PATH}/{ws_id}_config.yml", "r") as config_file:
+            return float(yaml.safe_load(config_file)["settings"].get("trading_fee", 0.0))
+    except Exception as e:
+        log_error(f"Erreur lors du chargement des frais de trading pour {ws_id}: {e}")
+        return 0.0
+
 # Charge les paires depuis le fichier de configuration associé à ce WebSocket
 def load_pairs_from_config(ws_id):
     config_path = f"{CONFIG_PATH}/{ws_id}_config.yml"
@@ -17,13 +29,31 @@ def load_pairs_from_config(ws_id):
         log_error(f"Erreur lors du chargement des paires pour {ws_id}: {e}")
         return []
 
+# Construit l'index du graphe des devises : chaque actif est un nœud, chaque paire une arête orientée.
+# Les arêtes sont indexées dans les deux sens (sortantes par actif de base, directes par couple base/quote)
+# pour que la recherche de boucles n'ait plus à tester toutes les permutations de paires.
+def build_currency_graph(pairs):
+    outgoing = defaultdict(list)  # base -> [(index, paire), ...] dans l'ordre des paires assignées
+    edges = defaultdict(list)     # (base, quote) -> [(index, paire), ...]
+    for index, pair in enumerate(pairs):
+        outgoing[pair["base"]].append((index, pair))
+        edges[(pair["base"], pair["quote"])].append((index, pair))
+    return outgoing, edges
+
 # Identifie les boucles triangulaires d'arbitrage à partir des paires assignées
+# Parcours base -> quote -> X -> base sur le graphe des devises, en O(arêtes × degré) au lieu de O(n³).
+# Les tuples renvoyés et leur ordre sont identiques à ceux du balayage des permutations.
 def find_arbitrage_loops(pairs):
     arbitrage_loops = []
     try:
-        for (pair_a, pair_b, pair_c) in itertools.permutations(pairs, 3):
-            if pair_a["quote"] == pair_b["base"] and pair_b["quote"] == pair_c["base"] and pair_c["quote"] == pair_a["base"]:
-                arbitrage_loops.append((pair_a, pair_b, pair_c))
+        outgoing, edges = build_currency_graph(pairs)
+        for index_a, pair_a in enumerate(pairs):
+            for index_b, pair_b in outgoing.get(pair_a["quote"], ()):
+                if index_b == index_a:
+                    continue
+                for index_c, pair_c in edges.get((pair_b["quote"], pair_a["base"]), ()):
+                    if index_c != index_a and index_c != index_b:
+                        arbitrage_loops.append((pair_a, pair_b, pair_c))
         log_info(f"Nombre de boucles identifiées : {len(arbitrage_loops)}")
         update_metrics("arbitrage_loops_found", len(arbitrage_loops))  # Mise à jour des métriques
         return arbitrage_loops
@@ -31,22 +61,112 @@ def find_arbitrage_loops(pairs):
         log_error(f"Erreur lors de l'identification des boucles : {e}")
         return []
 
+# Ancien balayage de toutes les permutations de 3 paires, conservé comme référence pour les benchmarks
+def find_arbitrage_loops_bruteforce(pairs):
+    return [
+        (pair_a, pair_b, pair_c)
+        for (pair_a, pair_b, pair_c) in itertools.permutations(pairs, 3)
+        if pair_a["quote"] == pair_b["base"] and pair_b["quote"] == pair_c["base"] and pair_c["quote"] == pair_a["base"]
+    ]
+
 # Calcule le profit potentiel pour une boucle d'arbitrage
-def calculate_profit(loop):
+# Implémentation scalaire de référence : la première jambe achète au prix ask, les deux suivantes vendent
+# au prix bid (repli sur "price" si le carnet n'est pas connu), frais de trading déduits à chaque jambe.
+# Changement de comportement : l'ancien calcul n'utilisait que "price" et ignorait les frais. Il est
+# retrouvé à l'identique pour des paires sans bid/ask avec trading_fee=0 ; les appelants passent le
+# trading_fee configuré.
+def calculate_profit(loop, trading_fee=0.0):
     try:
         pair_a, pair_b, pair_c = loop
         amount = 1  # Montant de base
-        amount /= pair_a["price"]
-        amount *= pair_b["price"]
-        amount *= pair_c["price"]
+        amount /= pair_a.get("ask", pair_a["price"])
+        amount *= pair_b.get("bid", pair_b["price"])
+        amount *= pair_c.get("bid", pair_c["price"])
+        amount *= (1 - trading_fee) ** 3
         profit = amount - 1
         return profit
     except Exception as e:
         log_error(f"Erreur lors du calcul du profit pour la boucle {loop}: {e}")
         return 0
 
+# Symbole d'échange d'une paire (ex. BTCUSDT), reconstruit depuis base/quote si absent
+def pair_symbol(pair):
+    return pair.get("symbol") or f"{pair['base']}{pair['quote']}"
+
+# Index inverse symbole -> indices des boucles qui contiennent ce symbole
+def build_symbol_loop_index(arbitrage_loops):
+    symbol_index = defaultdict(list)
+    for loop_id, loop in enumerate(arbitrage_loops):
+        for symbol in {pair_symbol(pair) for pair in loop}:
+            symbol_index[symbol].append(loop_id)
+    return dict(symbol_index)
+
+# Réévaluation incrémentale des boucles : seules les boucles touchées par une mise à jour sont recalculées
+class LoopRepricer:
+    """
+    Maintient le profit de chaque boucle et un classement trié des boucles les plus rentables.
+    Une mise à jour du carnet d'ordres d'un symbole ne recalcule que les boucles qui le contiennent,
+    et la lecture du top-K est une simple tranche du classement.
+
+    Les paires sont copiées à la construction : update_price modifie bid/ask/price de ces copies,
+    jamais les dictionnaires passés à find_arbitrage_loops.
+    """
+
+    def __init__(self, arbitrage_loops, trading_fee=0.0):
+        self.trading_fee = trading_fee
+        copies = {}
+        self.loops = [tuple(copies.setdefault(id(pair), dict(pair)) for pair in loop) for loop in arbitrage_loops]
+        self.symbol_index = build_symbol_loop_index(self.loops)
+        self.pairs_by_symbol = defaultdict(list)
+        for pair in copies.values():
+            self.pairs_by_symbol[pair_symbol(pair)].append(pair)
+        self.profits = [self._profit(loop) for loop in self.loops]
+        self._ranking = sorted((-profit, loop_id) for loop_id, profit in enumerate(self.profits))
+
+    def _profit(self, loop):
+        # Prix nul, négatif ou NaN (côté vide du carnet : best_bid/best_ask à 0.0) : la boucle est
+        # rejetée en fin de classement, calculate_profit retournant 0 sur une division par zéro
+        for pair in loop:
+            if not all(pair.get(field, 1.0) > 0 for field in ("bid", "ask", "price")):
+                return -math.inf
+        profit = calculate_profit(loop, self.trading_fee)
+        return profit if math.isfinite(profit) else -math.inf
+
+    def _reprice(self, loop_id):
+        profit = self._profit(self.loops[loop_id])
+        old_key = (-self.profits[loop_id], loop_id)
+        del self._ranking[bisect.bisect_left(self._ranking, old_key)]
+        bisect.insort(self._ranking, (-profit, loop_id))
+        self.profits[loop_id] = profit
+
+    def update_price(self, symbol, bid, ask):
+        """Met à jour le meilleur bid/ask d'un symbole et ne recalcule que les boucles concernées."""
+        loop_ids = self.symbol_index.get(symbol, ())
+        if not loop_ids:
+            return loop_ids
+        for pair in self.pairs_by_symbol[symbol]:
+            pair["bid"] = bid
+            pair["ask"] = ask
+            pair["price"] = (bid + ask) / 2
+        for loop_id in loop_ids:
+            self._reprice(loop_id)
+        return loop_ids
+
+    def update_from_order_book(self, symbol, order_book):
+        """Met à jour les boucles à partir d'un message de profondeur (bids/asks au format Binance)."""
+        try:
+            bid = float(order_book["bids"][0][0])
+            ask = float(order_book["asks"][0][0])
+        except (KeyError, IndexError, TypeError, ValueError):
+            return ()
+        return self.update_price(symbol, bid, ask)
+
+    def top(self, k=10):
+        """Retourne les k boucles les plus rentables sous forme de (boucle, profit) ; O(k)."""
+        return [(self.loops[loop_id], -neg_profit) for neg_profit, loop_id in self._ranking[:k]]
+
 # Enregistre les boucles d’arbitrage rentables dans le fichier de configuration associé au WebSocket
-def update_loop_configuration(ws_id, profitable_loops):
+def update_loop_configuration(ws_id, profitable_loops, trading_fee=0.0):
     config_path = f"{CONFIG_PATH}/{ws_id}_config.yml"
     try:
         with open(config_path, "r") as config_file:
@@ -54,7 +174,7 @@ def update_loop_configuration(ws_id, profitable_loops):
 
         # Mise à jour avec les boucles rentables
         config_data["settings"]["profitable_arbitrage_loops"] = [
-            {"pairs": loop, "profit": calculate_profit(loop)} for loop in profitable_loops
+            {"pairs": loop, "profit": calculate_profit(loop, trading_fee)} for loop in profitable_loops
         ]
 
         with open(config_path, "w") as config_file:
@@ -73,12 +193,15 @@ def main(ws_id):
         update_metrics("assigned_pairs_count", 0)  # Mise à jour des métriques pour indiquer l'absence de paires
         return
 
-    # Identifier les boucles potentielles et calculer leur profit
+    # Identifier les boucles potentielles et calculer leur profit en une passe vectorisée
+    from loop_pricing import LoopPricingEngine  # Import local : loop_pricing dépend de ce module
+    trading_fee = load_trading_fee(ws_id)
     arbitrage_loops = find_arbitrage_loops(pairs)
-    profitable_loops = [loop for loop in arbitrage_loops if calculate_profit(loop) > 0]
+    profits = LoopPricingEngine(arbitrage_loops).compute_profits(trading_fee)
+    profitable_loops = [loop for loop, profit in zip(arbitrage_loops, profits) if profit > 0]
 
     # Mettre à jour la configuration avec les boucles rentables
-    update_loop_configuration(ws_id, profitable_loops)
+    update_loop_configuration(ws_id, profitable_loops, trading_fee)
 
 if __name__ == "__main__":
     ws_id = "ws_1"  # Exemple d'ID WebSocket, à modifier pour chaque instance
@@ -0,0 +1,64 @@
+import time
+from arbitrage_loops import find_arbitrage_loops, find_arbitrage_loops_bruteforce
+from synthetic_market import generate_synthetic_market
+
+# -----------------------------
+# BENCHMARK DE LA DÉCOUVERTE DES BOUCLES D'ARBITRAGE
+# -----------------------------
+
+MARKET_SIZES = (100, 1000, 2000)  # Nombre de symboles des marchés synthétiques
+MAX_BRUTEFORCE_PAIRS = 300  # Au-delà, le temps du balayage des permutations est extrapolé (n³)
+
+def _permutation_count(n: int) -> int:
+    return n * (n - 1) * (n - 2)
+
+def benchmark_loop_discovery(sizes=MARKET_SIZES, max_bruteforce_pairs: int = MAX_BRUTEFORCE_PAIRS) -> list:
+    """
+    Compare le parcours du graphe des devises au balayage des permutations.
+
+    :param sizes: Tailles de marché (en symboles) à évaluer.
+    :param max_bruteforce_pairs: Taille maximale pour laquelle le balayage complet est réellement exécuté.
+    :return: Liste de résultats par taille de marché.
+    """
+    results = []
+    for size in sizes:
+        pairs = generate_synthetic_market(size)
+
+        start = time.perf_counter()
+        graph_loops = find_arbitrage_loops(pairs)
+        graph_seconds = time.perf_counter() - start
+
+        if size <= max_bruteforce_pairs:
+            start = time.perf_counter()
+            bruteforce_loops = find_arbitrage_loops_bruteforce(pairs)
+            bruteforce_seconds = time.perf_counter() - start
+            if bruteforce_loops != graph_loops:
+                raise AssertionError(f"Résultats divergents pour {size} symboles")
+            estimated = False
+        else:
+            sample = pairs[:max_bruteforce_pairs]
+            start = time.perf_counter()
+            find_arbitrage_loops_bruteforce(sample)
+            sample_seconds = time.perf_counter() - start
+            bruteforce_seconds = sample_seconds * _permutation_count(size) / _permutation_count(len(sample))
+            estimated = True
+
+        results.append({
+            "symbols": size,
+            "loops": len(graph_loops),
+            "graph_seconds": graph_seconds,
+            "bruteforce_seconds": bruteforce_seconds,
+            "bruteforce_estimated": estimated,
+            "speedup": bruteforce_seconds / graph_seconds if graph_seconds else float("inf"),
+        })
+    return results
+
+if __name__ == "__main__":
+    for result in benchmark_loop_discovery():
+        suffix = " (estimé)" if result["bruteforce_estimated"] else ""
+        print(
+            f"{result['symbols']:>5} symboles | {result['loops']:>7} boucles | "
+            f"graphe : {result['graph_seconds'] * 1000:10.2f} ms | "
+            f"permutations : {result['bruteforce_seconds'] * 1000:14.2f} ms{suffix} | "
+            f"gain x{result['speedup']:.0f}"
+        )
@@ -0,0 +1,139 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from columnar_store import EXECUTION_COLUMNS, ColumnarWriter, scan
+
+# -----------------------------
+# BENCHMARK PARQUET PARTITIONNÉ CONTRE SQLITE ET JSON
+# -----------------------------
+
+ROW_COUNT = 10_000_000
+CHUNK_ROWS = 1_000_000
+SYMBOL_COUNT = 50
+DAY_COUNT = 30
+MAX_JSON_ROWS = 1_000_000  # Au-delà, le temps et la taille JSON sont extrapolés linéairement
+START_NS = 1_704_067_200 * 10 ** 9  # 2024-01-01T00:00:00Z
+REPORT_DATE = "2024-01-15"
+REPORT_SYMBOL = "SYM0007USDT"
+
+def synthetic_chunk(offset: int, rows: int, total_rows: int, rng: np.random.Generator) -> pa.Table:
+    """Exécutions synthétiques triées dans le temps, réparties sur DAY_COUNT jours et SYMBOL_COUNT symboles."""
+    span_ns = DAY_COUNT * 86400 * 10 ** 9
+    index = np.arange(offset, offset + rows, dtype=np.int64)
+    symbols = np.array([f"SYM{i:04d}USDT" for i in range(SYMBOL_COUNT)], dtype=object)
+    return pa.table({
+        "ts": pa.array(START_NS + index * (span_ns // total_rows), pa.timestamp("ns", tz="UTC")),
+        "execution_id": pa.array(np.char.add("exec_", index.astype(str))),
+        "loop_id": pa.array(np.char.add("loop_", (index % 997).astype(str))),
+        "instance_id": pa.array(np.char.add("instance_", (index % 10).astype(str))),
+        "symbol": pa.array(symbols[rng.integers(0, SYMBOL_COUNT, rows)]),
+        "side": pa.array(np.where(rng.random(rows) < 0.5, "BUY", "SELL")),
+        "price": rng.uniform(0.01, 50000, rows),
+        "quantity": rng.uniform(0.001, 10, rows),
+        "profit": rng.normal(0, 0.5, rows),
+        "fee": np.full(rows, 0.001),
+        "balance": rng.uniform(90, 110, rows),
+    })
+
+def directory_size(root: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for path, _, names in os.walk(root) for name in names)
+
+def benchmark_columnar_store(row_count: int = ROW_COUNT, directory: str = None) -> dict:
+    directory = directory or tempfile.mkdtemp(prefix="columnar_bench_")
+    parquet_root = os.path.join(directory, "executions")
+    sqlite_path = os.path.join(directory, "trades.sqlite")
+    json_path = os.path.join(directory, "trade_data.json")
+    json_rows = min(row_count, MAX_JSON_ROWS)
+    rng = np.random.default_rng(3)
+    results = {"rows": row_count, "json_rows": json_rows}
+
+    writer = ColumnarWriter(parquet_root, EXECUTION_COLUMNS)
+    conn = sqlite3.connect(sqlite_path)
+    conn.execute("CREATE TABLE trades (ts TEXT, execution_id TEXT, loop_id TEXT, instance_id TEXT, symbol TEXT, "
+                 "side TEXT, price REAL, quantity REAL, profit REAL, fee REAL, balance REAL)")
+    json_records = []
+    write_seconds = {"parquet": 0.0, "sqlite": 0.0}
+    for offset in range(0, row_count, CHUNK_ROWS):
+        chunk = synthetic_chunk(offset, min(CHUNK_ROWS, row_count - offset), row_count, rng)
+        start = time.perf_counter()
+        writer.write_table(chunk)
+        write_seconds["parquet"] += time.perf_counter() - start
+
+        frame = chunk.to_pandas()
+        frame["ts"] = frame["ts"].dt.strftime("%Y-%m-%d %H:%M:%S.%f")
+        start = time.perf_counter()
+        conn.executemany("INSERT INTO trades VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", frame.itertuples(index=False))
+        conn.commit()
+        write_seconds["sqlite"] += time.perf_counter() - start
+        if len(json_records) < json_rows:
+            json_records.extend(frame.head(json_rows - len(json_records)).to_dict("records"))
+    with open(json_path, "w") as json_file:
+        json.dump(json_records, json_file)
+    del json_records
+    results["write_seconds"] = write_seconds
+
+    scale = row_count / json_rows
+    results["size_mb"] = {
+        "parquet": directory_size(parquet_root) / 1e6,
+        "sqlite": os.path.getsize(sqlite_path) / 1e6,
+        "json": os.path.getsize(json_path) / 1e6 * scale,
+    }
+
+    # Requête 1 : prix moyen et quantité totale d'une journée (rapport quotidien)
+    day_start, day_end = f"{REPORT_DATE} 00:00:00", f"{REPORT_DATE} 23:59:59.999999"
+    start = time.perf_counter()
+    table = scan(parquet_root, columns=["price", "quantity"], start_date=REPORT_DATE, end_date=REPORT_DATE)
+    parquet_day = (pc.mean(table["price"]).as_py(), pc.sum(table["quantity"]).as_py())
+    parquet_day_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    sqlite_day = conn.execute("SELECT AVG(price), SUM(quantity) FROM trades WHERE ts BETWEEN ? AND ?",
+                              (day_start, day_end)).fetchone()
+    sqlite_day_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    with open(json_path) as json_file:
+        rows = [row for row in json.load(json_file) if row["ts"].startswith(REPORT_DATE)]
+    json_day_seconds = (time.perf_counter() - start) * scale
+    if abs(parquet_day[1] - sqlite_day[1]) > 1e-6 * abs(sqlite_day[1]):
+        raise AssertionError("Parquet et SQLite divergent sur la requête journalière")
+
+    # Requête 2 : profit moyen d'un symbole sur toute la période
+    start = time.perf_counter()
+    table = scan(parquet_root, columns=["profit"], symbols=[REPORT_SYMBOL])
+    pc.mean(table["profit"]).as_py()
+    parquet_symbol_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    conn.execute("SELECT AVG(profit) FROM trades WHERE symbol = ?", (REPORT_SYMBOL,)).fetchone()
+    sqlite_symbol_seconds = time.perf_counter() - start
+
+    # Requête 3 : extraction complète de metrics_report (symbole, prix, quantité, horodatage) vers pandas
+    start = time.perf_counter()
+    scan(parquet_root, columns=["symbol", "price", "quantity", "ts"]).to_pandas()
+    parquet_full_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    pd.read_sql("SELECT symbol, price, quantity, ts FROM trades", conn)
+    sqlite_full_seconds = time.perf_counter() - start
+    conn.close()
+
+    results["scan_seconds"] = {
+        "day": {"parquet": parquet_day_seconds, "sqlite": sqlite_day_seconds, "json": json_day_seconds},
+        "symbol": {"parquet": parquet_symbol_seconds, "sqlite": sqlite_symbol_seconds},
+        "full_to_pandas": {"parquet": parquet_full_seconds, "sqlite": sqlite_full_seconds},
+    }
+    results["directory"] = directory
+    return results
+
+if __name__ == "__main__":
+    results = benchmark_columnar_store(int(sys.argv[1]) if len(sys.argv) > 1 else ROW_COUNT)
+    print(f"{results['rows']} lignes (JSON mesuré sur {results['json_rows']} lignes puis extrapolé)")
+    print("Écriture (s) : " + " | ".join(f"{k} {v:.1f}" for k, v in results["write_seconds"].items()))
+    print("Taille (Mo) : " + " | ".join(f"{k} {v:.0f}" for k, v in results["size_mb"].items()))
+    for query, timings in results["scan_seconds"].items():
+        print(f"Lecture {query} (s) : " + " | ".join(f"{k} {v:.3f}" for k, v in timings.items()))
+    print(f"Fichiers conservés dans {results['directory']}")
@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+import logging
+import tempfile
+from log_pipeline import dropped_records, get_logger, setup_log_pipeline, shutdown_log_pipeline
+
+# -----------------------------
+# BENCHMARK DU COÛT DES LOGS PAR TRADE : HANDLER SYNCHRONE CONTRE FILE DE JOURNALISATION
+# -----------------------------
+
+TRADES = 50000
+LEGS = 3  # execute_trade journalise la taille de la boucle puis chaque jambe
+SLOW_WRITE_SECONDS = 0.0002  # Sortie lente (terminal, pipe saturé, disque chargé) : 200 µs par écriture
+
+class SlowStream:
+    """Flux dont chaque écriture attend SLOW_WRITE_SECONDS, comme un stderr redirigé vers un collecteur lent."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        time.sleep(SLOW_WRITE_SECONDS)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.stream.close()
+
+def _trade_values(i: int):
+    return f"SYM{i % 50:03d}USDT", 0.0123456789 * (i % 7), 100.0 + i * 1e-4
+
+def run_legacy(stream, trades: int) -> float:
+    """Ancien log_info : f-string construite à chaque appel, écriture synchrone par StreamHandler."""
+    legacy = logging.getLogger("benchmark_legacy")
+    legacy.propagate = False
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    legacy.addHandler(handler)
+    legacy.setLevel(logging.INFO)
+
+    def log_info(message, details=""):
+        legacy.info(f"INFO : {message} - Détails : {details}")
+
+    start = time.perf_counter()
+    for i in range(trades):
+        symbol, profit, balance = _trade_values(i)
+        log_info(f"Taille exécutable : {balance} | Profit attendu : {profit} | Ratio appliqué : {1.0}")
+        for _ in range(LEGS):
+            log_info(f"Trade exécuté : {symbol} | Profit : {profit} USDT | Balance actuelle : {balance}")
+    elapsed = time.perf_counter() - start
+    handler.stream.close()
+    legacy.removeHandler(handler)
+    return elapsed / trades * 1e6
+
+def run_pipeline(logger: logging.Logger, trades: int) -> float:
+    """Nouveau chemin : %-style paresseux, mise en file ; mise en forme JSON et écriture dans le listener."""
+    start = time.perf_counter()
+    for i in range(trades):
+        symbol, profit, balance = _trade_values(i)
+        logger.info("Taille exécutable : %s | Profit attendu : %s | Ratio appliqué : %s", balance, profit, 1.0)
+        for _ in range(LEGS):
+            logger.info("Trade exécuté : %s | Profit : %s USDT | Balance actuelle : %s", symbol, profit, balance)
+    return (time.perf_counter() - start) / trades * 1e6
+
+def run_queue(stream, trades: int, queue_size: int, level: int = logging.NOTSET) -> tuple:
+    """Coût côté appelant avec la file ; retourne (µs/trade, secondes pour vider la file, abandons)."""
+    setup_log_pipeline(level="INFO", log_format="json", queue_size=queue_size, stream=stream)
+    logger = get_logger("arbitrage_execution")
+    logger.setLevel(level)  # LOG_LEVELS="arbitrage_execution=WARNING" revient à logging.WARNING ici
+    per_trade = run_pipeline(logger, trades)
+    dropped = dropped_records()
+    start = time.perf_counter()
+    shutdown_log_pipeline()  # Vide la file : temps d'écriture hors du chemin d'exécution
+    logger.setLevel(logging.NOTSET)
+    return per_trade, time.perf_counter() - start, dropped
+
+def benchmark_logging(trades: int = TRADES) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for sink in ("file", "slow"):
+            def open_stream(name):
+                stream = open(os.path.join(directory, f"{sink}_{name}.log"), "w")
+                return SlowStream(stream) if sink == "slow" else stream
+            count = trades if sink == "file" else trades // 10
+
+            stream = open_stream("legacy")
+            results[(sink, "legacy")] = (run_legacy(stream, count), 0.0, 0)
+            stream.close()
+            stream = open_stream("queue")
+            results[(sink, "queue")] = run_queue(stream, count, queue_size=count * (LEGS + 1))
+            stream.close()
+            # File volontairement petite : les enregistrements en trop sont abandonnés et comptés, sans bloquer
+            stream = open_stream("small")
+            results[(sink, "small_queue")] = run_queue(stream, count, queue_size=1000)
+            stream.close()
+            stream = open_stream("warning")
+            results[(sink, "warning_level")] = run_queue(stream, count, queue_size=1000, level=logging.WARNING)
+            stream.close()
+    return results
+
+if __name__ == "__main__":
+    results = benchmark_logging(int(sys.argv[1]) if len(sys.argv) > 1 else TRADES)
+    labels = {"legacy": "synchrone", "queue": "file", "small_queue": "file de 1000", "warning_level": "module en WARNING"}
+    for sink in ("file", "slow"):
+        print(f"Sortie {'fichier' if sink == 'file' else 'lente (200 µs/écriture)'} - coût des logs par trade "
+              f"({LEGS + 1} messages) :")
+        for key, label in labels.items():
+            per_trade, drain, dropped = results[(sink, key)]
+            print(f"  {label:>18} : {per_trade:8.1f} µs/trade | file vidée en {drain:.2f} s | {dropped} abandons")
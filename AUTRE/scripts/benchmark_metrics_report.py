@@ -0,0 +1,85 @@
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import resource
+import tempfile
+import subprocess
+
+# -----------------------------
+# BENCHMARK MÉMOIRE DE METRICS_REPORT : LECTURE COMPLÈTE, PAR LOTS ET AGRÉGATION SQL
+# -----------------------------
+
+ROW_COUNTS = (1_000_000, 10_000_000)
+SEED_CHUNK = 500_000
+MODES = ("full", "chunked", "pushdown")
+SYMBOLS = [f"SYM{i:03d}USDT" for i in range(50)]
+
+def seed_trades(db_path: str, row_count: int) -> None:
+    """Table trades (symbol, price, quantity, trade_time) de metrics_report, remplie de données synthétiques."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE trades (symbol TEXT, price REAL, quantity REAL, trade_time TEXT)")
+    rng = random.Random(7)
+    for offset in range(0, row_count, SEED_CHUNK):
+        conn.executemany("INSERT INTO trades VALUES (?, ?, ?, ?)", (
+            (SYMBOLS[i % len(SYMBOLS)], rng.uniform(0.01, 50000), rng.uniform(0.001, 10),
+             f"2024-01-{1 + i % 28:02d} {i % 24:02d}:00:00")
+            for i in range(offset, min(row_count, offset + SEED_CHUNK))
+        ))
+        conn.commit()
+    conn.close()
+
+def run_child(mode: str, db_path: str) -> dict:
+    """Exécuté dans un processus neuf : le pic RSS mesuré est celui du seul calcul du rapport."""
+    import metrics_report
+    conn = sqlite3.connect(db_path)
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == "full":
+        metrics = metrics_report.calculate_metrics(metrics_report.fetch_trading_data(conn))
+    else:
+        metrics = metrics_report.calculate_metrics(metrics_report.aggregate_trading_data(conn, pushdown=mode == "pushdown"))
+    seconds = time.perf_counter() - start
+    conn.close()
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    metrics.pop("timestamp", None)
+    return {"mode": mode, "seconds": seconds, "peak_rss_mb": peak_kb / 1024,
+            "report_rss_mb": (peak_kb - baseline_kb) / 1024, "metrics": metrics}
+
+def benchmark_metrics_report(row_counts=ROW_COUNTS) -> list:
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for row_count in row_counts:
+            db_path = os.path.join(directory, f"trades_{row_count}.sqlite")
+            seed_trades(db_path, row_count)
+            reference = None
+            for mode in MODES:
+                output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, db_path],
+                                        capture_output=True, text=True)
+                if output.returncode != 0:
+                    results.append({"rows": row_count, "mode": mode, "error": output.stderr.strip().splitlines()[-1:]})
+                    continue
+                result = json.loads(output.stdout.strip().splitlines()[-1])
+                result["rows"] = row_count
+                # Les trois chemins doivent produire le même rapport
+                reference = reference or result["metrics"]
+                for key, value in reference.items():
+                    if abs(result["metrics"][key] - value) > 1e-6 * max(1.0, abs(value)):
+                        raise AssertionError(f"{mode} diverge sur {key} : {result['metrics'][key]} != {value}")
+                results.append(result)
+            os.remove(db_path)
+    return results
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        print(json.dumps(run_child(sys.argv[2], sys.argv[3])))
+    else:
+        row_counts = tuple(int(value) for value in sys.argv[1:]) or ROW_COUNTS
+        for r in benchmark_metrics_report(row_counts):
+            if "error" in r:
+                print(f"{r['rows']:>9} lignes | {r['mode']:>8} | échec : {r['error']}")
+                continue
+            print(f"{r['rows']:>9} lignes | {r['mode']:>8} | {r['seconds']:.2f} s | pic RSS {r['peak_rss_mb']:.0f} Mo "
+                  f"(+{r['report_rss_mb']:.0f} Mo pour le rapport)")
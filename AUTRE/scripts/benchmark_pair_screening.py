@@ -0,0 +1,93 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import data_fetching
+from data_fetching import filter_active_pairs, pair_meets_criteria
+from rate_limiter import RateLimiter
+
+# -----------------------------
+# BENCHMARK DU FILTRAGE DES PAIRES CONTRE UN STUB HTTP LOCAL
+# -----------------------------
+
+STUB_LATENCY_SECONDS = 0.05  # Latence artificielle par requête, proche d'un aller-retour réel vers Binance
+STUB_MIN_VOLUME = 100000  # Seuil de volume appliqué pendant le benchmark, indépendant de config.yml
+
+def make_stub_handler(symbols, latency, serve_bulk_ticker=True):
+    """Handler HTTP servant des réponses fixes pour /api/v3/depth et /api/v3/ticker/24hr."""
+    # Champs réellement renvoyés par Binance uniquement ; les paires à partir de la 50e dépassent STUB_MIN_VOLUME
+    tickers = {symbol: {"symbol": symbol, "lastPrice": "1.05", "volume": str(1000 + i), "quoteVolume": str(50000 + 1000 * i)}
+               for i, symbol in enumerate(symbols)}
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive pour mesurer l'effet de la session partagée
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(latency)
+            parsed = urlparse(self.path)
+            symbol = parse_qs(parsed.query).get("symbol", [None])[0]
+            if parsed.path == "/api/v3/depth":
+                body = {"lastUpdateId": 1, "bids": [["1.0", "1.0"]], "asks": [["1.1", "1.0"]]}
+                status = 200
+            elif parsed.path == "/api/v3/ticker/24hr" and symbol in tickers:
+                body, status = tickers[symbol], 200
+            elif parsed.path == "/api/v3/ticker/24hr" and symbol is None and serve_bulk_ticker:
+                body, status = list(tickers.values()), 200
+            else:
+                body, status = {"code": -1, "msg": "Not found"}, 404
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+def run_stub(symbols, latency=STUB_LATENCY_SECONDS, serve_bulk_ticker=True):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_stub_handler(symbols, latency, serve_bulk_ticker))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def benchmark_pair_screening(pair_count=500, latency=STUB_LATENCY_SECONDS):
+    """Compare le filtrage séquentiel historique, le filtrage concurrent et l'appel groupé /ticker/24hr."""
+    symbols = [f"SYM{i:04d}USDT" for i in range(pair_count)]
+    # Le stub n'impose pas de limite : on lève le budget pour mesurer la concurrence seule
+    data_fetching.screening_limiter = RateLimiter(weight_per_minute=10 ** 9)
+    data_fetching.VOLUME_THRESHOLD = STUB_MIN_VOLUME
+    results = {}
+
+    server = run_stub(symbols, latency, serve_bulk_ticker=False)
+    data_fetching.BASE_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    start = time.perf_counter()
+    sequential = [pair for pair in symbols if pair_meets_criteria(pair, "key", "secret")]
+    results["sequential_seconds"] = time.perf_counter() - start
+    start = time.perf_counter()
+    concurrent = filter_active_pairs(symbols, "key", "secret")
+    results["concurrent_seconds"] = time.perf_counter() - start
+    assert concurrent == sequential
+    server.shutdown()
+
+    server = run_stub(symbols, latency, serve_bulk_ticker=True)
+    data_fetching.BASE_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    start = time.perf_counter()
+    accepted = filter_active_pairs(symbols, "key", "secret")
+    assert accepted == sequential
+    results["accepted_pairs"] = len(accepted)
+    results["bulk_ticker_seconds"] = time.perf_counter() - start
+    server.shutdown()
+    return results
+
+if __name__ == "__main__":
+    results = benchmark_pair_screening()
+    print(
+        f"Séquentiel : {results['sequential_seconds']:.2f} s | "
+        f"concurrent : {results['concurrent_seconds']:.2f} s | "
+        f"/ticker/24hr groupé : {results['bulk_ticker_seconds']:.2f} s | "
+        f"paires retenues : {results['accepted_pairs']}"
+    )
@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import multiprocessing
+from helpers import connect_sqlite, insert_statement
+from trade_writer import TRADE_COLUMNS, trade_row, trade_table_ddl
+
+# -----------------------------
+# BENCHMARK DE CONCURRENCE SUR TRADEV3.SQLITE : RÉGLAGES PAR DÉFAUT CONTRE PROFIL WAL
+# -----------------------------
+
+SEED_TRADES = 200000  # Historique présent avant la mesure
+WRITER_COUNT = 2  # Processus qui écrivent (arbitrage_execution, inactive_loops_management)
+READER_COUNT = 3  # Processus qui lisent (export_vers_MySQL, rapports)
+DURATION_SECONDS = 10.0
+PAIRS = [f"SYM{i:03d}USDT" for i in range(50)]
+
+def _trade(i: int) -> dict:
+    return {"execution_id": f"exec_{i}", "loop_id": f"loop_{i % 500}", "instance_id": f"instance_{i % 10}",
+            "pair": PAIRS[i % len(PAIRS)], "side": "BUY" if i % 2 else "SELL", "open_rate": 100.0 + i % 97,
+            "amount": 0.01, "realized_profit": 0.001 * (i % 7 - 3),
+            "open_date": f"2024-01-{1 + i % 28:02d}T{i % 24:02d}:00:00Z"}
+
+def _connect(db_path: str, tuned: bool) -> sqlite3.Connection:
+    if tuned:
+        return connect_sqlite(db_path)
+    return sqlite3.connect(db_path, timeout=5.0)  # Ancien connect_sqlite : journal rollback, synchronous=FULL
+
+def _writer(db_path: str, tuned: bool, worker: int, deadline: float, results) -> None:
+    conn = _connect(db_path, tuned)
+    insert = insert_statement("trades", TRADE_COLUMNS)
+    latencies, errors, i = [], 0, worker * 10 ** 7
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.execute(insert, trade_row(_trade(i)))  # Un trade par transaction, comme save_to_database
+            conn.commit()
+            latencies.append(time.perf_counter() - start)
+        except sqlite3.OperationalError:
+            errors += 1
+            conn.rollback()
+        i += 1
+    conn.close()
+    results.put(("writer", latencies, errors))
+
+def _reader(db_path: str, tuned: bool, worker: int, deadline: float, results) -> None:
+    conn = _connect(db_path, tuned)
+    queries = [
+        ("SELECT COUNT(*), SUM(realized_profit) FROM trades WHERE pair = ?", lambda n: (PAIRS[n % len(PAIRS)],)),
+        ("SELECT COUNT(*) FROM trades WHERE open_date >= ? AND open_date < ?",
+         lambda n: (f"2024-01-{1 + n % 27:02d}", f"2024-01-{2 + n % 27:02d}")),
+        ("SELECT AVG(open_rate) FROM trades WHERE loop_id = ?", lambda n: (f"loop_{n % 500}",)),
+        ("SELECT COUNT(*) FROM trades WHERE instance_id = ?", lambda n: (f"instance_{n % 10}",)),
+    ]
+    latencies, errors, n = [], 0, worker
+    while time.time() < deadline:
+        query, params = queries[n % len(queries)]
+        start = time.perf_counter()
+        try:
+            conn.execute(query, params(n)).fetchall()
+            latencies.append(time.perf_counter() - start)
+        except sqlite3.OperationalError:
+            errors += 1
+        n += 1
+    conn.close()
+    results.put(("reader", latencies, errors))
+
+def _percentile(values, fraction: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def run_profile(tuned: bool, seed_trades: int = SEED_TRADES, duration: float = DURATION_SECONDS) -> dict:
+    """Lance les écrivains et les lecteurs dans des processus distincts et agrège leurs mesures."""
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "tradeV3.sqlite")
+        conn = sqlite3.connect(db_path)
+        conn.execute(trade_table_ddl())
+        conn.executemany(insert_statement("trades", TRADE_COLUMNS), (trade_row(_trade(i)) for i in range(seed_trades)))
+        conn.commit()
+        conn.close()
+        if tuned:
+            connect_sqlite(db_path).close()  # Passage en WAL et création des index une fois pour toutes
+
+        results = multiprocessing.Queue()
+        deadline = time.time() + duration
+        processes = [multiprocessing.Process(target=_writer, args=(db_path, tuned, w, deadline, results))
+                     for w in range(WRITER_COUNT)]
+        processes += [multiprocessing.Process(target=_reader, args=(db_path, tuned, r, deadline, results))
+                      for r in range(READER_COUNT)]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    writes = [latency for kind, latencies, _ in collected if kind == "writer" for latency in latencies]
+    reads = [latency for kind, latencies, _ in collected if kind == "reader" for latency in latencies]
+    return {
+        "writes_per_second": len(writes) / duration,
+        "write_p50_ms": _percentile(writes, 0.5) * 1e3,
+        "write_p99_ms": _percentile(writes, 0.99) * 1e3,
+        "reads_per_second": len(reads) / duration,
+        "read_p50_ms": _percentile(reads, 0.5) * 1e3,
+        "read_p99_ms": _percentile(reads, 0.99) * 1e3,
+        "lock_errors": sum(errors for _, _, errors in collected),
+    }
+
+if __name__ == "__main__":
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else DURATION_SECONDS
+    for label, tuned in (("défaut", False), ("profil WAL", True)):
+        r = run_profile(tuned, duration=duration)
+        print(f"{label:>10} | écritures {r['writes_per_second']:.0f}/s (p50 {r['write_p50_ms']:.2f} ms, "
+              f"p99 {r['write_p99_ms']:.2f} ms) | lectures {r['reads_per_second']:.0f}/s "
+              f"(p50 {r['read_p50_ms']:.2f} ms, p99 {r['read_p99_ms']:.2f} ms) | verrous : {r['lock_errors']}")
@@ -0,0 +1,255 @@
+import os
+import time
+import uuid
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+from log_pipeline import get_logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow n'est requis que si le stockage colonnaire est activé
+    pa = pc = ds = pq = None
+
+# -----------------------------
+# STOCKAGE COLONNAIRE PARQUET (PARTITIONS DATE / SYMBOLE)
+# -----------------------------
+
+PARTITION_COLUMNS = ("date", "symbol")
+DEFAULT_BATCH_ROWS = 50000  # Lignes gardées en mémoire avant l'écriture d'un fichier par partition
+DEFAULT_FLUSH_SECONDS = 60.0  # Écriture au moins toutes les minutes, même si le lot est incomplet
+COMPRESSION = "zstd"
+MAX_PARTITIONS = 100000  # Un lot importé peut couvrir des milliers de couples (date, symbole) ; pyarrow en limite 1024
+DEFAULT_PENDING_BATCHES = 4  # Lots remis au thread d'écriture avant que append() n'attende
+_STOP = object()  # Sentinelle de fin du thread d'écriture
+
+logger = get_logger("columnar_store")
+
+# Colonnes des deux jeux de données (hors colonnes de partition, portées par les répertoires)
+EXECUTION_COLUMNS = {
+    "ts": "timestamp[ns, tz=UTC]",
+    "execution_id": "string",
+    "loop_id": "string",
+    "instance_id": "string",
+    "symbol": "string",
+    "side": "string",
+    "price": "float64",
+    "quantity": "float64",
+    "profit": "float64",
+    "fee": "float64",
+    "balance": "float64",
+}
+TICK_COLUMNS = {
+    "ts": "timestamp[ns, tz=UTC]",
+    "symbol": "string",
+    "bid": "float64",
+    "ask": "float64",
+    "bid_quantity": "float64",
+    "ask_quantity": "float64",
+}
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError("pyarrow est requis pour le stockage colonnaire")
+
+def arrow_schema(columns: Dict[str, str]) -> "pa.Schema":
+    """Schéma Arrow à partir d'un dictionnaire {colonne: type}."""
+    _require_pyarrow()
+    types = {"string": pa.string(), "float64": pa.float64(), "int64": pa.int64(),
+             "timestamp[ns, tz=UTC]": pa.timestamp("ns", tz="UTC")}
+    return pa.schema([(name, types[kind]) for name, kind in columns.items()])
+
+def partitioning() -> "ds.Partitioning":
+    """Partitionnement hive date=AAAA-MM-JJ/symbol=XXX commun à l'écriture et à la lecture."""
+    _require_pyarrow()
+    return ds.partitioning(pa.schema([(name, pa.string()) for name in PARTITION_COLUMNS]), flavor="hive")
+
+class ColumnarWriter:
+    """
+    Écrit des lignes par lots dans un jeu de données Parquet partitionné par date et symbole.
+
+    append() ne fait qu'ajouter les valeurs dans des listes par colonne. Quand le lot est complet
+    (taille ou âge), ses listes sont remises à un thread dédié, comme pour TradeWriter : la conversion
+    Arrow et l'écriture (un fichier par partition et par lot) ne bloquent jamais le chemin d'exécution.
+    La file des lots est bornée : si l'écriture prend du retard, append() attend (contre-pression).
+    flush() attend que tous les lots remis soient écrits ; close() écrit le reliquat et arrête le thread.
+    """
+
+    def __init__(self, root: str, columns: Dict[str, str], batch_rows: int = DEFAULT_BATCH_ROWS,
+                 flush_seconds: float = DEFAULT_FLUSH_SECONDS, max_pending: int = DEFAULT_PENDING_BATCHES):
+        _require_pyarrow()
+        self.root = root
+        self.schema = arrow_schema(columns)
+        self.batch_rows = batch_rows
+        self.flush_seconds = flush_seconds
+        self.rows_written = 0
+        self.files_written = 0
+        self._buffers: Dict[str, List[Any]] = {name: [] for name in self.schema.names}
+        self._buffered = 0
+        self._batch_started = time.monotonic()
+        self._lock = threading.Lock()  # Protège les listes en cours de remplissage
+        self._write_lock = threading.Lock()  # Sérialise les écritures du thread et de write_table()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="columnar_writer", daemon=True)
+                self._thread.start()
+
+    def append(self, row: Dict[str, Any]) -> None:
+        """Ajoute une ligne ; ts peut être un datetime, un horodatage ns (int) ou absent (maintenant)."""
+        batch = None
+        with self._lock:
+            for name, values in self._buffers.items():
+                values.append(row.get(name))
+            if self._buffers["ts"][-1] is None:
+                self._buffers["ts"][-1] = time.time_ns()
+            self._buffered += 1
+            if self._buffered >= self.batch_rows or time.monotonic() - self._batch_started >= self.flush_seconds:
+                batch = self._take_locked()
+        if batch is not None:
+            self._submit(batch)  # Hors du verrou : l'attente éventuelle ne bloque pas les autres append()
+
+    def write_table(self, table: "pa.Table") -> None:
+        """Écrit directement (de façon synchrone) une table Arrow déjà constituée (rejeu, import massif)."""
+        self._write(table.select(self.schema.names).cast(self.schema))
+
+    def flush(self) -> None:
+        """Remet le lot en cours au thread et attend que tous les lots en attente soient écrits."""
+        with self._lock:
+            batch = self._take_locked()
+        if batch is not None:
+            self._submit(batch)
+        if self._thread is not None:
+            self._queue.join()
+
+    def _take_locked(self) -> Optional[Dict[str, List[Any]]]:
+        self._batch_started = time.monotonic()
+        if not self._buffered:
+            return None
+        batch, self._buffers = self._buffers, {name: [] for name in self.schema.names}
+        self._buffered = 0
+        return batch
+
+    def _submit(self, batch: Dict[str, List[Any]]) -> None:
+        if self._thread is None:
+            self.start()
+        self._queue.put(batch)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                # Aucun append() depuis flush_seconds : le lot entamé est écrit quand même
+                with self._lock:
+                    stale = time.monotonic() - self._batch_started >= self.flush_seconds
+                    item = self._take_locked() if stale else None
+                if item is not None:
+                    self._write_batch(item)
+                continue
+            try:
+                if item is _STOP:
+                    return
+                self._write_batch(item)
+            finally:
+                self._queue.task_done()
+
+    def _write_batch(self, batch: Dict[str, List[Any]]) -> None:
+        try:
+            self._write(pa.Table.from_pydict(batch, schema=self.schema))
+        except Exception as e:
+            # Un lot invalide (type inattendu, disque plein...) est perdu, mais le thread continue de vider la file
+            logger.error("Échec de l'écriture d'un lot de %s lignes dans %s : %s",
+                         len(batch["ts"]), self.root, e)
+
+    def _count_file(self, written_file) -> None:
+        self.files_written += 1
+
+    def _write(self, table: "pa.Table") -> None:
+        table = table.append_column("date", pc.strftime(table["ts"], format="%Y-%m-%d"))
+        with self._write_lock:
+            # file_visitor est appelé une fois par fichier écrit : pas de passe group_by pour les compter
+            pq.write_to_dataset(
+                table, self.root, partitioning=partitioning(), compression=COMPRESSION,
+                basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore", file_visitor=self._count_file,
+                max_partitions=MAX_PARTITIONS,
+            )
+            self.rows_written += table.num_rows
+
+    def close(self, timeout: float = 30.0) -> None:
+        """Écrit le reliquat puis arrête le thread."""
+        self.flush()
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+# -----------------------------
+# LECTURE AVEC PROJECTION ET FILTRES POUSSÉS
+# -----------------------------
+
+def open_dataset(root: str) -> "ds.Dataset":
+    _require_pyarrow()
+    return ds.dataset(root, format="parquet", partitioning=partitioning())
+
+def scan(root: str, columns: Optional[Iterable[str]] = None, start_date: Optional[str] = None,
+         end_date: Optional[str] = None, symbols: Optional[Iterable[str]] = None,
+         filter_expression=None) -> "pa.Table":
+    """
+    Lit uniquement les colonnes et les partitions demandées.
+
+    :param columns: Colonnes projetées (toutes si None), colonnes de partition comprises.
+    :param start_date: Première date incluse (AAAA-MM-JJ) ; élague les répertoires date=.
+    :param end_date: Dernière date incluse (AAAA-MM-JJ).
+    :param symbols: Symboles à lire ; élague les répertoires symbol=.
+    :param filter_expression: Filtre pyarrow.dataset supplémentaire, poussé jusqu'aux statistiques Parquet.
+    :return: Table Arrow (to_pandas() pour les rapports).
+    """
+    expression = _filter_expression(start_date, end_date, symbols, filter_expression)
+    return open_dataset(root).to_table(columns=list(columns) if columns is not None else None, filter=expression)
+
+def scan_batches(root: str, columns: Optional[Iterable[str]] = None, start_date: Optional[str] = None,
+                 end_date: Optional[str] = None, symbols: Optional[Iterable[str]] = None,
+                 filter_expression=None, batch_rows: int = DEFAULT_BATCH_ROWS) -> Iterable["pa.RecordBatch"]:
+    """Comme scan(), mais par lots d'au plus batch_rows lignes : la mémoire ne dépend pas du volume lu."""
+    expression = _filter_expression(start_date, end_date, symbols, filter_expression)
+    return open_dataset(root).to_batches(columns=list(columns) if columns is not None else None,
+                                         filter=expression, batch_size=batch_rows)
+
+def _filter_expression(start_date, end_date, symbols, filter_expression):
+    expression = filter_expression
+    conditions = []
+    if start_date is not None:
+        conditions.append(ds.field("date") >= start_date)
+    if end_date is not None:
+        conditions.append(ds.field("date") <= end_date)
+    if symbols is not None:
+        conditions.append(ds.field("symbol").isin(list(symbols)))
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+def execution_row(trade_data: Dict[str, Any], ts: Optional[datetime] = None) -> Dict[str, Any]:
+    """Convertit le dictionnaire trade_data d'execute_trade en ligne du jeu de données des exécutions."""
+    return {
+        "ts": ts or datetime.now(timezone.utc),
+        "execution_id": trade_data.get("execution_id"),
+        "loop_id": trade_data.get("loop_id"),
+        "instance_id": trade_data.get("instance_id"),
+        "symbol": trade_data.get("pair"),
+        "side": trade_data.get("side"),
+        "price": trade_data.get("open_rate"),
+        "quantity": trade_data.get("amount"),
+        "profit": trade_data.get("realized_profit"),
+        "fee": trade_data.get("fee_open"),
+        "balance": trade_data.get("final_balance"),
+    }
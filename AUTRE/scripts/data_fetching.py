@@ -5,23 +5,63 @@ import json
 import time
 import hmac
 import hashlib
-from helpers import log_info, log_error, generate_signature, process_websocket_message
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from helpers import log_info, log_error, log_debug, generate_signature
+from helpers import exchange_base_url, rebase_stream_url
+from frame_decoder import decode_frame
+from http_client import get_http_client
+from rate_limiter import REQUEST_WEIGHT_PER_MINUTE, RateLimiter, request_weight
 
-# Charger la configuration depuis config.yml
-with open("/config/config.yml", "r") as config_file:
-    config = yaml.safe_load(config_file)["settings"]
+CONFIG_FILE = "/config/config.yml"
+MAX_CONCURRENT_REQUESTS = 16  # Requêtes de filtrage simultanées
+SCREENING_WEIGHT_SHARE = 0.5  # Part du budget réservée au filtrage des paires au démarrage
 
-API_KEYS = config["api_keys"]  # Liste des 29 clés API
-SECRET_KEYS = config["secret_keys"]  # Liste des 29 clés secrètes correspondantes
-VOLUME_THRESHOLD = config["pair_validation_criteria"]["min_volume"]
-MIN_DAYS_LISTED = config["pair_validation_criteria"]["min_days_active"]
-WEB_SOCKET_URLS = [config[f"ws{i}_url"] for i in range(1, 21)]  # Charger les 20 WebSocket URLs
+# Résolus à la première utilisation : l'import du module ne lit pas config.yml (surchargeables par les tests et benchmarks)
+BASE_URL = None  # BINANCE_BASE_URL permet de viser l'échange simulé (mock_exchange.py)
+screening_limiter = None  # Seau de poids par clé API, recalé sur X-MBX-USED-WEIGHT-1M
+VOLUME_THRESHOLD = None
+
+# Client HTTP partagé du processus : les connexions keep-alive sont réutilisées entre les requêtes
+http_client = get_http_client()
+
+# Dernier enregistrement décodé par symbole, alimenté par les flux WebSocket
+latest_records = {}
+
+# Charger la configuration depuis config.yml (une seule lecture par processus)
+@lru_cache(maxsize=1)
+def load_settings():
+    with open(CONFIG_FILE, "r") as config_file:
+        return yaml.safe_load(config_file)["settings"]
+
+def get_base_url():
+    global BASE_URL
+    if BASE_URL is None:
+        BASE_URL = exchange_base_url(load_settings())
+    return BASE_URL
+
+def get_screening_limiter():
+    global screening_limiter
+    if screening_limiter is None:
+        screening_limiter = RateLimiter(load_settings()["api_keys"],
+                                        weight_per_minute=int(REQUEST_WEIGHT_PER_MINUTE * SCREENING_WEIGHT_SHARE))
+    return screening_limiter
+
+def get_volume_threshold():
+    global VOLUME_THRESHOLD
+    if VOLUME_THRESHOLD is None:
+        VOLUME_THRESHOLD = load_settings()["pair_validation_criteria"]["min_volume"]
+    return VOLUME_THRESHOLD
+
+def get_websocket_urls():
+    config = load_settings()
+    return [rebase_stream_url(config[f"ws{i}_url"], config) for i in range(1, 21)]  # Les 20 WebSocket URLs
 
 # Connexion à l'API Binance pour récupérer les paires actives
 def get_active_pairs(api_key, secret_key):
-    url = "https://api.binance.com/api/v3/exchangeInfo"
+    url = f"{get_base_url()}/api/v3/exchangeInfo"
     headers = {"X-MBX-APIKEY": api_key}
-    response = requests.get(url, headers=headers)
+    response = http_client.get(url, headers=headers)
     
     if response.status_code == 200:
         data = response.json()
@@ -34,10 +74,12 @@ def get_active_pairs(api_key, secret_key):
 
 # Récupérer le carnet d'ordres d'une paire spécifique
 def get_order_book(symbol, api_key, secret_key, limit=5):
-    url = f"https://api.binance.com/api/v3/depth"
+    url = f"{get_base_url()}/api/v3/depth"
     params = {"symbol": symbol, "limit": limit}
     headers = {"X-MBX-APIKEY": api_key}
-    response = requests.get(url, headers=headers, params=params)
+    get_screening_limiter().acquire(request_weight("/api/v3/depth", params), api_key)
+    response = http_client.get(url, headers=headers, params=params)
+    get_screening_limiter().update_from_response(api_key, response.status_code, response.headers)
     
     if response.status_code == 200:
         return response.json()
@@ -45,28 +87,72 @@ def get_order_book(symbol, api_key, secret_key, limit=5):
         log_error(f"Erreur lors de la récupération du carnet d'ordres pour {symbol}")
         return None
 
-# Filtrer les paires actives selon les critères de volume et de durée
-def filter_active_pairs(pairs, api_key, secret_key):
-    filtered_pairs = []
-    for pair in pairs:
-        if pair_meets_criteria(pair, api_key, secret_key):
-            filtered_pairs.append(pair)
+# Récupérer le ticker 24h d'une paire spécifique
+def get_ticker(symbol, api_key):
+    url = f"{get_base_url()}/api/v3/ticker/24hr"
+    params = {"symbol": symbol}
+    headers = {"X-MBX-APIKEY": api_key}
+    get_screening_limiter().acquire(request_weight("/api/v3/ticker/24hr", params), api_key)
+    response = http_client.get(url, headers=headers, params=params)
+    get_screening_limiter().update_from_response(api_key, response.status_code, response.headers)
+
+    if response.status_code == 200:
+        return response.json()
+    else:
+        log_error(f"Erreur lors de la récupération du ticker 24h pour {symbol}")
+        return None
+
+# Récupérer en une seule requête les tickers 24h de toutes les paires
+def get_24hr_tickers(api_key):
+    url = f"{get_base_url()}/api/v3/ticker/24hr"
+    headers = {"X-MBX-APIKEY": api_key}
+    try:
+        get_screening_limiter().acquire(request_weight("/api/v3/ticker/24hr"), api_key)
+        response = http_client.get(url, headers=headers)
+    except requests.RequestException as e:
+        log_error(f"Erreur lors de la récupération des tickers 24h : {e}")
+        return None
+    get_screening_limiter().update_from_response(api_key, response.status_code, response.headers)
+
+    if response.status_code == 200:
+        return {ticker["symbol"]: ticker for ticker in response.json()}
+    else:
+        log_error(f"Erreur lors de la récupération des tickers 24h : {response.status_code}")
+        return None
+
+# Filtrer les paires actives selon le critère de volume
+# Un seul appel /ticker/24hr couvre toutes les paires ; à défaut, les tickers individuels sont interrogés en parallèle
+# Binance n'expose l'ancienneté d'une paire ni sur /ticker/24hr ni sur /depth : min_days_active n'est pas appliqué ici
+def filter_active_pairs(pairs, api_key, secret_key, max_workers=MAX_CONCURRENT_REQUESTS):
+    tickers = get_24hr_tickers(api_key)
+    if tickers is not None:
+        results = [ticker_meets_criteria(tickers.get(pair)) for pair in pairs]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(lambda pair: pair_meets_criteria(pair, api_key, secret_key), pairs))
+    filtered_pairs = [pair for pair, accepted in zip(pairs, results) if accepted]
     log_info(f"Paires filtrées : {len(filtered_pairs)} sur {len(pairs)}")
     return filtered_pairs
 
-# Vérifier si une paire répond aux critères de volume et de durée
+# Vérifier si une paire répond au critère de volume à partir de son ticker 24h individuel
 def pair_meets_criteria(pair, api_key, secret_key):
-    order_book = get_order_book(pair, api_key, secret_key)
-    if order_book:
-        volume = float(order_book.get("volume", 0))
-        days_listed = int(order_book.get("days_listed", 0))  # Ajuster si ce champ est disponible
-        return volume >= VOLUME_THRESHOLD and days_listed >= MIN_DAYS_LISTED
+    try:
+        ticker = get_ticker(pair, api_key)
+    except requests.RequestException as e:
+        log_error(f"Erreur lors de la récupération du ticker 24h pour {pair} : {e}")
+        return False
+    return ticker_meets_criteria(ticker)
+
+# Vérifier le critère à partir du ticker 24h (volume en devise de cotation)
+def ticker_meets_criteria(ticker):
+    if ticker:
+        return float(ticker.get("quoteVolume", 0)) >= get_volume_threshold()
     return False
 
 # Ouverture de connexions WebSocket pour les mises à jour en temps réel
 def open_websocket_connections():
     websockets = []
-    for url in WEB_SOCKET_URLS:
+    for url in get_websocket_urls():
         ws = websocket.WebSocketApp(
             url,
             on_message=on_message,
@@ -79,8 +165,10 @@ def open_websocket_connections():
 
 # Gestion des messages WebSocket
 def on_message(ws, message):
-    data = json.loads(message)
-    process_websocket_message(data)  # Délégation de la logique au helpers.py
+    record = decode_frame(message)  # DepthRecord / TickerRecord typé, décodé par msgspec ou orjson si disponibles
+    if record is not None:
+        latest_records[record.symbol] = record
+        log_debug(f"Mise à jour reçue pour {record.symbol}")
 
 def on_error(ws, error):
     log_error(f"Erreur WebSocket : {error}")
@@ -94,10 +182,12 @@ if __name__ == "__main__":
         log_info("Démarrage du script de récupération des données")
         
         # Utilisation d'une des clés API pour récupérer les paires actives
-        pairs = get_active_pairs(API_KEYS[0], SECRET_KEYS[0])
+        config = load_settings()
+        api_key, secret_key = config["api_keys"][0], config["secret_keys"][0]
+        pairs = get_active_pairs(api_key, secret_key)
         
         # Filtrage des paires
-        filtered_pairs = filter_active_pairs(pairs, API_KEYS[0], SECRET_KEYS[0])
+        filtered_pairs = filter_active_pairs(pairs, api_key, secret_key)
         
         # Ouverture des connexions WebSocket pour les paires filtrées
         open_websocket_connections()
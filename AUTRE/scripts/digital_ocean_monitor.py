@@ -1,5 +1,6 @@
 import time
-from helpers import get_digital_ocean_metrics, push_prometheus_metric, log_action
+from helpers import get_digital_ocean_metrics, log_action
+from metrics_push import MONITOR_FLUSH_CYCLES, get_metric_batcher
 
 PROMETHEUS_PUSHGATEWAY_URL = "http://localhost:9091/metrics/job/digital_ocean_monitor"
 DIGITAL_OCEAN_API_TOKEN = "YOUR_API_TOKEN"  # Remplacer par votre clé API
@@ -12,13 +13,15 @@ def monitor_digital_ocean(interval: int = 10):
         interval (int): Intervalle de temps en secondes entre deux collectes de métriques.
     """
     log_action("Lancement du Digital Ocean Monitor")
+    # Toutes les clés d'un cycle partent ensemble, en un seul POST toutes les MONITOR_FLUSH_CYCLES collectes
+    batcher = get_metric_batcher(PROMETHEUS_PUSHGATEWAY_URL, interval * MONITOR_FLUSH_CYCLES)
     while True:
         try:
             metrics = get_digital_ocean_metrics(DIGITAL_OCEAN_API_TOKEN)
             if metrics:
                 # Pousser les métriques Digital Ocean vers Prometheus
                 for metric_name, value in metrics.items():
-                    push_prometheus_metric(metric_name, value, PROMETHEUS_PUSHGATEWAY_URL)
+                    batcher.set(metric_name, value)
                 log_action("Métriques Digital Ocean collectées et envoyées à Prometheus")
             else:
                 log_action("Pas de métriques Digital Ocean disponibles")
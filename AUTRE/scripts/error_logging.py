@@ -1,5 +1,25 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import fcntl
 import logging
-from helpers import load_config, save_json, push_prometheus_metric, current_timestamp
+import tempfile
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+from helpers import load_config, push_prometheus_metric, current_timestamp
+from metrics_push import get_metric_batcher
+
+DEFAULT_ERROR_FILE = "../data/error_logs.jsonl"
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024  # Rotation au-delà de 50 Mo
+DEFAULT_MAX_AGE_SECONDS = 86400  # Rotation au moins une fois par jour
+DEFAULT_BACKUP_COUNT = 7  # Fichiers conservés : error_logs.jsonl.1 ... .7
+DEFAULT_RING_SIZE = 1000  # Erreurs récentes gardées en mémoire (0 : désactivé)
+DEFAULT_QUEUE_SIZE = 10000
+TAIL_BLOCK_BYTES = 64 * 1024
 
 # -----------------------------
 # CONFIGURATION DU LOGGER D'ERREURS
@@ -9,12 +29,16 @@ def setup_error_logger() -> logging.Logger:
     """
     Configure un logger dédié aux erreurs critiques.
     """
+    error_logger = logging.getLogger("error_logger")
+    if error_logger.handlers:
+        return error_logger  # Déjà configuré : ne pas empiler les gestionnaires à chaque appel
+
     # Charger la configuration depuis config.yaml
     config = load_config()
-    log_file = config.get("error_logging", {}).get("error_file", "../data/error_logs.json")
+    error_file = config.get("error_logging", {}).get("error_file", DEFAULT_ERROR_FILE)
+    log_file = os.path.splitext(error_file)[0] + ".log"  # Texte libre à part : le fichier JSONL reste lisible ligne à ligne
 
     # Configurer le logger
-    error_logger = logging.getLogger("error_logger")
     error_logger.setLevel(logging.ERROR)
 
     # Gestionnaire pour écrire les erreurs dans un fichier
@@ -30,34 +54,225 @@ def setup_error_logger() -> logging.Logger:
     return error_logger
 
 # -----------------------------
-# ENREGISTREMENT DES ERREURS DANS UN FICHIER JSON
+# JOURNAL D'ERREURS JSONL EN AJOUT SEUL
 # -----------------------------
 
-def log_error_to_json(error_message: str, details: str = "") -> None:
+class ErrorLogSink:
     """
-    Enregistre une erreur dans le fichier error_logs.json.
+    Journal d'erreurs au format JSON Lines, une entrée par ligne, en ajout seul.
+
+    submit() ne fait qu'ajouter l'entrée au tampon circulaire et la déposer dans une file bornée :
+    l'écriture a lieu dans un thread dédié, qui regroupe les lignes en attente en un seul write()
+    sur un descripteur O_APPEND (ajouts atomiques même si plusieurs processus écrivent le même fichier).
+    Si la file est pleine (tempête d'erreurs), l'entrée est comptée dans dropped au lieu de bloquer
+    l'appelant. Le fichier tourne par taille (max_bytes) et par période (max_age_seconds) ;
+    la rotation est protégée par un verrou fcntl partagé entre processus.
     """
-    config = load_config()
-    error_file = config.get("error_logging", {}).get("error_file", "../data/error_logs.json")
 
-    # Charger les logs existants ou initialiser une liste vide
+    def __init__(self, path: str = DEFAULT_ERROR_FILE, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS, backup_count: int = DEFAULT_BACKUP_COUNT,
+                 ring_size: int = DEFAULT_RING_SIZE, max_queue: int = DEFAULT_QUEUE_SIZE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.backup_count = backup_count
+        self.ring: Optional[deque] = deque(maxlen=ring_size) if ring_size else None
+        self.dropped = 0
+        self.written = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._fd: Optional[int] = None
+        self._period = 0
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    # Écriture -----------------------------------------------------------
+
+    def submit(self, entry: Dict[str, Any], alert_url: Optional[str] = None) -> bool:
+        """
+        Enregistre une entrée sans attendre le disque.
+
+        :param alert_url: Pushgateway à alerter (pipeline_critical_errors) une fois l'entrée écrite.
+        :return: False si l'entrée a été abandonnée car la file était pleine.
+        """
+        if self._thread is None:
+            self.start()
+        if self.ring is not None:
+            self.ring.append(entry)
+        try:
+            self._queue.put_nowait((entry, alert_url))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="error_log_sink", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Attend que les entrées déjà soumises soient écrites."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.write_batch([entry for entry, _ in batch])
+                # Même jauge pipeline_critical_errors qu'avant le regroupement (règles d'alerte inchangées),
+                # envoyée avec les autres métriques du processus
+                alerts: Dict[str, int] = {}
+                for _, alert_url in batch:
+                    if alert_url:
+                        alerts[alert_url] = alerts.get(alert_url, 0) + 1
+                for alert_url, count in alerts.items():
+                    get_metric_batcher(alert_url).set("pipeline_critical_errors", count)
+            except Exception as e:
+                setup_error_logger().error(f"Écriture du journal d'erreurs {self.path} impossible : {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def write_batch(self, entries: List[Dict[str, Any]]) -> None:
+        """Écrit directement un lot d'entrées (un seul appel write) puis fait tourner le fichier si nécessaire."""
+        data = "".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry in entries).encode("utf-8")
+        fd = self._open()
+        os.write(fd, data)
+        self.written += len(entries)
+        if self._should_rotate(fd):
+            self._rotate()
+
+    def _open(self) -> int:
+        if self._fd is not None:
+            try:
+                if os.fstat(self._fd).st_ino == os.stat(self.path).st_ino:
+                    return self._fd
+            except FileNotFoundError:
+                pass
+            os.close(self._fd)  # Un autre processus a fait tourner le fichier : on rouvre le nouveau
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        stat = os.fstat(self._fd)
+        self._period = int((stat.st_mtime if stat.st_size else time.time()) // self.max_age_seconds)
+        return self._fd
+
+    def _should_rotate(self, fd: int) -> bool:
+        return (os.fstat(fd).st_size >= self.max_bytes
+                or int(time.time() // self.max_age_seconds) != self._period)
+
+    def _rotate(self) -> None:
+        with open(f"{self.path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # Un autre processus a peut-être déjà fait tourner le fichier pendant l'attente du verrou
+                if os.stat(self.path).st_ino != os.fstat(self._fd).st_ino:
+                    return
+            except FileNotFoundError:
+                return
+            finally:
+                os.close(self._fd)
+                self._fd = None
+            for index in range(self.backup_count - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{index}"):
+                    os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+            if self.backup_count:
+                os.replace(self.path, f"{self.path}.1")
+            else:
+                os.remove(self.path)
+
+    # Lecture ------------------------------------------------------------
+
+    def recent(self, limit: int = 10, from_memory: bool = False) -> List[Dict[str, Any]]:
+        """
+        Dernières entrées, de la plus ancienne à la plus récente.
+
+        :param from_memory: Lire le tampon circulaire (erreurs de ce processus uniquement) plutôt que le fichier.
+        """
+        if from_memory and self.ring is not None:
+            return list(self.ring)[-limit:]
+        self.flush()
+        return read_recent_errors(self.path, limit, self.backup_count)
+
+def _tail_lines(path: str, limit: int) -> List[bytes]:
+    """Lit au plus limit lignes complètes en remontant depuis la fin du fichier, par blocs de 64 Ko."""
     try:
-        error_logs = load_json(error_file) or []
-    except Exception as e:
-        error_logs = []
-        logger = setup_error_logger()
-        logger.error(f"Impossible de charger error_logs.json : {e}")
+        with open(path, "rb") as file:
+            position = file.seek(0, os.SEEK_END)
+            buffer = b""
+            while position > 0 and buffer.count(b"\n") <= limit:
+                step = min(TAIL_BLOCK_BYTES, position)
+                position -= step
+                file.seek(position)
+                buffer = file.read(step) + buffer
+    except FileNotFoundError:
+        return []
+    lines = [line for line in buffer.split(b"\n") if line]
+    if position > 0:
+        lines = lines[1:]  # Première ligne du bloc potentiellement tronquée
+    return lines[-limit:]
+
+def read_recent_errors(path: str, limit: int = 10, backup_count: int = DEFAULT_BACKUP_COUNT) -> List[Dict[str, Any]]:
+    """Dernières entrées du journal, en complétant au besoin par les fichiers tournés (.1, .2...)."""
+    entries: List[Dict[str, Any]] = []
+    for candidate in [path] + [f"{path}.{index}" for index in range(1, backup_count + 1)]:
+        older = []
+        for line in _tail_lines(candidate, limit - len(entries)):
+            try:
+                older.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue  # Ligne en cours d'écriture par un autre processus
+        entries = older + entries
+        if len(entries) >= limit or (candidate != path and not os.path.exists(candidate)):
+            break  # Le fichier courant peut manquer juste après une rotation : on lit alors .1
+    return entries[-limit:]
+
+_error_sink: Optional[ErrorLogSink] = None
+_error_sink_lock = threading.Lock()
+
+def get_error_sink() -> ErrorLogSink:
+    """Journal d'erreurs partagé du processus, paramétré par la section error_logging de config.yaml."""
+    global _error_sink
+    with _error_sink_lock:
+        if _error_sink is None:
+            config = load_config() or {}
+            settings = config.get("error_logging", {})
+            _error_sink = ErrorLogSink(
+                path=settings.get("error_file", DEFAULT_ERROR_FILE),
+                max_bytes=settings.get("max_bytes", DEFAULT_MAX_BYTES),
+                max_age_seconds=settings.get("max_age_seconds", DEFAULT_MAX_AGE_SECONDS),
+                backup_count=settings.get("backup_count", DEFAULT_BACKUP_COUNT),
+                ring_size=settings.get("ring_size", DEFAULT_RING_SIZE),
+            )
+        return _error_sink
+
+def get_recent_errors(limit: int = 10, from_memory: bool = False) -> List[Dict[str, Any]]:
+    """Récupère les erreurs les plus récentes sans relire tout le journal."""
+    return get_error_sink().recent(limit, from_memory)
+
+# -----------------------------
+# ENREGISTREMENT DES ERREURS DANS LE JOURNAL JSONL
+# -----------------------------
 
-    # Ajouter une nouvelle entrée de log
-    error_logs.append({
+def log_error_to_json(error_message: str, details: str = "") -> None:
+    """
+    Ajoute une erreur au journal error_logs.jsonl (une ligne, sans relire le fichier).
+    """
+    get_error_sink().submit({
         "timestamp": current_timestamp(),
         "error_message": error_message,
         "details": details
     })
 
-    # Sauvegarder les logs dans error_logs.json
-    save_json(error_logs, error_file)
-
 # -----------------------------
 # ENVOI D'ALERTES VIA PROMETHEUS
 # -----------------------------
@@ -79,11 +294,62 @@ def send_error_alert_to_prometheus(error_message: str, prometheus_url: str = Non
             logger = setup_error_logger()
             logger.error(f"Impossible d'envoyer une alerte Prometheus : {e}")
 
+# -----------------------------
+# BENCHMARK : LECTURE-MODIFICATION-ÉCRITURE CONTRE AJOUT JSONL (FACULTATIF)
+# -----------------------------
+
+def benchmark_error_sink(existing_errors: int = 20000, storm: int = 100000) -> Dict[str, float]:
+    """Coût d'un log d'erreur côté appelant et de get_recent_errors, avec un historique de existing_errors entrées."""
+    results = {}
+    entry = {"timestamp": current_timestamp(), "level": "CRITICAL", "message": "Connexion échouée", "details": "500"}
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_path = os.path.join(directory, "error_logs.json")
+        with open(legacy_path, "w") as file:
+            json.dump([entry] * existing_errors, file, indent=4)
+        start = time.perf_counter()
+        for _ in range(20):  # Ancien chemin : tout relire, ajouter, tout réécrire
+            with open(legacy_path) as file:
+                logs = json.load(file)
+            logs.append(entry)
+            with open(legacy_path, "w") as file:
+                json.dump(logs, file, indent=4)
+        results["legacy_us_per_error"] = (time.perf_counter() - start) / 20 * 1e6
+        start = time.perf_counter()
+        with open(legacy_path) as file:
+            json.load(file)[-10:]
+        results["legacy_recent_ms"] = (time.perf_counter() - start) * 1e3
+
+        sink = ErrorLogSink(os.path.join(directory, "error_logs.jsonl"), max_bytes=8 * 1024 * 1024, max_queue=storm)
+        sink.write_batch([entry] * existing_errors)
+        start = time.perf_counter()
+        for _ in range(storm):
+            sink.submit(entry)
+        results["submit_us_per_error"] = (time.perf_counter() - start) / storm * 1e6
+        start = time.perf_counter()
+        sink.flush(timeout=60.0)
+        results["drain_seconds"] = time.perf_counter() - start
+        start = time.perf_counter()
+        recent = sink.recent(10)
+        results["recent_ms"] = (time.perf_counter() - start) * 1e3
+        results["rotated_files"] = len([name for name in os.listdir(directory) if name.startswith("error_logs.jsonl.")
+                                        and not name.endswith(".lock")])
+        results["dropped"] = sink.dropped
+        if len(recent) != 10:
+            raise AssertionError(f"{len(recent)} erreurs récentes lues au lieu de 10")
+    return results
+
 # -----------------------------
 # UTILISATION DU LOGGER D'ERREURS
 # -----------------------------
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        r = benchmark_error_sink()
+        print(f"Ancien log : {r['legacy_us_per_error']:.0f} µs/erreur, dernières erreurs en {r['legacy_recent_ms']:.1f} ms | "
+              f"JSONL : submit {r['submit_us_per_error']:.2f} µs/erreur, file vidée en {r['drain_seconds']:.2f} s, "
+              f"dernières erreurs en {r['recent_ms']:.2f} ms ({r['rotated_files']} rotations, {r['dropped']} abandons)")
+        sys.exit(0)
+
     # Configuration du logger d'erreurs
     error_logger = setup_error_logger()
 
@@ -95,4 +361,4 @@ if __name__ == "__main__":
         error_message = str(e)
         error_logger.error(error_message)
         log_error_to_json(error_message, details="Erreur simulée pour démonstration")
-        send_error_alert_to_prometheus(error_message)
\ No newline at end of file
+        send_error_alert_to_prometheus(error_message)
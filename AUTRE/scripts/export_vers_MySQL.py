@@ -1,106 +1,176 @@
+import os
+import sys
 import time
 import sqlite3
-import pyodbc
+import tempfile
 from helpers import log_info, log_error, connect_db, connect_sql_server  # Fonctions centralisées dans helpers.py
+from trade_writer import TRADE_COLUMNS, TEXT_COLUMNS, trade_row, trade_table_ddl
+
+try:
+    import psycopg2.extras
+except ImportError:  # psycopg2 n'est requis que pour une cible PostgreSQL
+    psycopg2 = None
 
 DB_PATH = "/data/tradeV3.sqlite"
 EXPORT_INTERVAL = 1800  # Intervalle d'exportation en secondes (30 minutes)
+EXPORT_TABLE = "export_vers_MySQL_trades_Binance"
+STATE_TABLE = "export_state"  # Marque haute (dernier rowid SQLite exporté) par table exportée
+CHUNK_SIZE = 5000  # Lignes lues par fetchmany et écrites par transaction
+
+# Types des colonnes exportées selon la base cible
+COLUMN_TYPES = {
+    "mssql": {"text": "VARCHAR(255)", "long_text": "NVARCHAR(MAX)", "real": "FLOAT", "rowid": "BIGINT"},
+    "postgresql": {"text": "VARCHAR(255)", "long_text": "TEXT", "real": "DOUBLE PRECISION", "rowid": "BIGINT"},
+    "sqlite": {"text": "TEXT", "long_text": "TEXT", "real": "REAL", "rowid": "INTEGER"},
+}
+LONG_TEXT_COLUMNS = {"pair_sequence", "execution_prices", "quantities"}
+PLACEHOLDERS = {"mssql": "?", "postgresql": "%s", "sqlite": "?"}
+
+# -----------------------------
+# SCHÉMA CIBLE ET MARQUE HAUTE
+# -----------------------------
+
+def _table_exists(cursor, dialect, table):
+    if dialect == "mssql":
+        cursor.execute("SELECT OBJECT_ID(?, 'U')", (table,))
+        return cursor.fetchone()[0] is not None
+    if dialect == "postgresql":
+        cursor.execute("SELECT to_regclass(%s)", (table.lower(),))
+        return cursor.fetchone()[0] is not None
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,))
+    return cursor.fetchone() is not None
+
+def _has_column(cursor, dialect, table, column):
+    if dialect == "mssql":
+        cursor.execute("SELECT COL_LENGTH(?, ?)", (table, column))
+        return cursor.fetchone()[0] is not None
+    if dialect == "postgresql":
+        cursor.execute("SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = %s",
+                       (table.lower(), column))
+        return cursor.fetchone() is not None
+    cursor.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in cursor.fetchall())
+
+def _create_export_table(cursor, dialect):
+    types = COLUMN_TYPES[dialect]
+    columns = ", ".join(
+        f"{name} {types['long_text'] if name in LONG_TEXT_COLUMNS else types['text'] if name in TEXT_COLUMNS else types['real']}"
+        for name in TRADE_COLUMNS
+    )
+    cursor.execute(f"CREATE TABLE {EXPORT_TABLE} (source_rowid {types['rowid']} NOT NULL, {columns})")
+    cursor.execute(f"CREATE UNIQUE INDEX idx_{EXPORT_TABLE}_source_rowid ON {EXPORT_TABLE} (source_rowid)")
+
+def ensure_export_schema(conn, dialect="mssql"):
+    """
+    Crée la table exportée (avec source_rowid indexé) et la table d'état si elles n'existent pas.
+
+    Une table de l'ancien export (id IDENTITY, timestamp, sans source_rowid) est recréée une seule fois
+    au nouveau format et la marque haute remise à zéro : l'export suivant recopie tout l'historique.
+    L'ancien export supprimait et reconstruisait déjà cette table à chaque passage depuis SQLite,
+    elle ne contient donc aucune donnée qui ne soit pas dans la base source.
+    """
+    types = COLUMN_TYPES[dialect]
+    cursor = conn.cursor()
+    migrated = False
+    if not _table_exists(cursor, dialect, EXPORT_TABLE):
+        _create_export_table(cursor, dialect)
+        log_info(f"Table '{EXPORT_TABLE}' créée sur la cible {dialect}.")
+    elif not _has_column(cursor, dialect, EXPORT_TABLE, "source_rowid"):
+        cursor.execute(f"DROP TABLE {EXPORT_TABLE}")
+        _create_export_table(cursor, dialect)
+        migrated = True
+        log_info(f"Table '{EXPORT_TABLE}' de l'ancien export recréée avec source_rowid sur la cible {dialect}.")
+    if not _table_exists(cursor, dialect, STATE_TABLE):
+        cursor.execute(f"CREATE TABLE {STATE_TABLE} (table_name VARCHAR(100) PRIMARY KEY, high_water {types['rowid']} NOT NULL)")
+    elif migrated:
+        cursor.execute(f"DELETE FROM {STATE_TABLE} WHERE table_name = {PLACEHOLDERS[dialect]}", (EXPORT_TABLE,))
+    conn.commit()
+    cursor.close()
+
+def read_high_water(conn, dialect="mssql"):
+    """Dernier rowid SQLite exporté (0 au premier export)."""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT high_water FROM {STATE_TABLE} WHERE table_name = {PLACEHOLDERS[dialect]}", (EXPORT_TABLE,))
+    row = cursor.fetchone()
+    cursor.close()
+    return row[0] if row else 0
+
+def _write_high_water(cursor, dialect, high_water):
+    mark = PLACEHOLDERS[dialect]
+    cursor.execute(f"UPDATE {STATE_TABLE} SET high_water = {mark} WHERE table_name = {mark}", (high_water, EXPORT_TABLE))
+    if cursor.rowcount == 0:
+        cursor.execute(f"INSERT INTO {STATE_TABLE} (table_name, high_water) VALUES ({mark}, {mark})", (EXPORT_TABLE, high_water))
+
+# -----------------------------
+# EXPORT INCRÉMENTAL
+# -----------------------------
+
+def _insert_chunk(cursor, dialect, rows):
+    columns = ("source_rowid",) + TRADE_COLUMNS
+    if dialect == "postgresql" and psycopg2 is not None:
+        # COPY implicite : une seule requête VALUES (...), (...) par page
+        psycopg2.extras.execute_values(cursor, f"INSERT INTO {EXPORT_TABLE} ({', '.join(columns)}) VALUES %s", rows,
+                                       page_size=len(rows))
+        return
+    placeholders = ", ".join([PLACEHOLDERS[dialect]] * len(columns))
+    cursor.executemany(f"INSERT INTO {EXPORT_TABLE} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+
+def export_new_rows(sqlite_conn, target_conn, dialect="mssql", chunk_size=CHUNK_SIZE):
+    """
+    Exporte les lignes de trades dont le rowid dépasse la marque haute de la cible.
 
-# Fonction pour exporter les données de SQLite vers SQL Server
-def export_to_sql_server():
+    Chaque lot est écrit dans une transaction qui supprime d'abord la plage de rowid du lot puis
+    l'insère et avance la marque haute : rejouer un lot interrompu ne crée jamais de doublon.
+
+    :return: Nombre de lignes exportées.
+    """
+    ensure_export_schema(target_conn, dialect)
+    high_water = read_high_water(target_conn, dialect)
+    source = sqlite_conn.cursor()
+    source.execute(f"SELECT rowid, * FROM trades WHERE rowid > ? ORDER BY rowid", (high_water,))
+    source_columns = [description[0] for description in source.description]
+    positions = [source_columns.index(name) if name in source_columns else None for name in TRADE_COLUMNS]
+
+    cursor = target_conn.cursor()
+    if hasattr(cursor, "fast_executemany"):
+        cursor.fast_executemany = True  # pyodbc : paramètres envoyés en tableau plutôt que ligne par ligne
+    exported = 0
+    mark = PLACEHOLDERS[dialect]
+    while True:
+        chunk = source.fetchmany(chunk_size)
+        if not chunk:
+            break
+        rows = [(row[0],) + tuple(row[p] if p is not None else None for p in positions) for row in chunk]
+        first_rowid, last_rowid = rows[0][0], rows[-1][0]
+        try:
+            cursor.execute(f"DELETE FROM {EXPORT_TABLE} WHERE source_rowid BETWEEN {mark} AND {mark}", (first_rowid, last_rowid))
+            _insert_chunk(cursor, dialect, rows)
+            _write_high_water(cursor, dialect, last_rowid)
+            target_conn.commit()
+        except Exception:
+            target_conn.rollback()
+            raise
+        exported += len(rows)
+    cursor.close()
+    source.close()
+    return exported
+
+# Fonction pour exporter les nouvelles données de SQLite vers SQL Server
+def export_to_sql_server(source_path=DB_PATH, target_conn=None, dialect="mssql", chunk_size=CHUNK_SIZE):
     try:
-        # Connexion à la base SQLite
-        sqlite_conn = connect_db(DB_PATH)
-        sqlite_cursor = sqlite_conn.cursor()
-
-        # Connexion à SQL Server
-        conn = connect_sql_server()
-        cursor = conn.cursor()
-
-        # Supprimer la table existante avant de recréer
-        drop_table_query = """
-        IF OBJECT_ID('export_vers_MySQL_trades_Binance', 'U') IS NOT NULL
-        DROP TABLE export_vers_MySQL_trades_Binance
-        """
-        cursor.execute(drop_table_query)
-        conn.commit()
-        log_info("Table SQL Server 'export_vers_MySQL_trades_Binance' supprimée si elle existait.")
-
-        # Création de la table SQL Server
-        create_table_query = """
-        CREATE TABLE export_vers_MySQL_trades_Binance (
-            id INT IDENTITY(1,1) PRIMARY KEY,
-            execution_id VARCHAR(50),
-            loop_id VARCHAR(50),
-            pair_sequence TEXT,
-            execution_prices TEXT,
-            quantities TEXT,
-            initial_investment FLOAT,
-            final_return FLOAT,
-            net_profit FLOAT,
-            instance_id VARCHAR(50),
-            side VARCHAR(10),
-            exchange VARCHAR(50),
-            pair VARCHAR(50),
-            base_currency VARCHAR(50),
-            stake_currency VARCHAR(50),
-            is_open TINYINT,
-            fee_open FLOAT,
-            fee_open_cost FLOAT,
-            fee_open_currency VARCHAR(10),
-            fee_close FLOAT,
-            fee_close_cost FLOAT,
-            fee_close_currency VARCHAR(10),
-            open_rate FLOAT,
-            open_trade_value FLOAT,
-            close_rate FLOAT,
-            realized_profit FLOAT,
-            close_profit FLOAT,
-            close_profit_abs FLOAT,
-            stake_amount FLOAT,
-            amount FLOAT,
-            open_date DATETIME,
-            close_date DATETIME,
-            stop_loss FLOAT,
-            exit_reason VARCHAR(50),
-            strategy VARCHAR(50),
-            timeframe INT,
-            trading_mode VARCHAR(10),
-            amount_precision FLOAT,
-            price_precision FLOAT,
-            final_balance FLOAT,
-            timestamp DATETIME DEFAULT GETDATE()
-        );
-        """
-        cursor.execute(create_table_query)
-        conn.commit()
-        log_info("Table SQL Server 'export_vers_MySQL_trades_Binance' créée avec succès.")
-
-        # Récupérer les données de SQLite
-        sqlite_cursor.execute("SELECT * FROM trades")
-        rows = sqlite_cursor.fetchall()
-        columns = [desc[0] for desc in sqlite_cursor.description]
-
-        # Préparation de l'insertion dans SQL Server
-        insert_query = f"""
-        INSERT INTO export_vers_MySQL_trades_Binance ({', '.join(columns)})
-        VALUES ({', '.join(['?'] * len(columns))})
-        """
-
-        # Insertion des données dans SQL Server
-        for row in rows:
-            cursor.execute(insert_query, row)
-        conn.commit()
-        log_info(f"{len(rows)} lignes exportées de SQLite vers SQL Server avec succès.")
-
-        # Fermer les connexions
-        sqlite_cursor.close()
+        start = time.perf_counter()
+        sqlite_conn = connect_db(source_path)
+        conn = target_conn or connect_sql_server()
+        exported = export_new_rows(sqlite_conn, conn, dialect, chunk_size)
+        log_info(f"{exported} nouvelles lignes exportées de SQLite vers {dialect} en {time.perf_counter() - start:.2f} s.")
+
         sqlite_conn.close()
-        cursor.close()
-        conn.close()
-        log_info("Connexions SQLite et SQL Server fermées.")
+        if target_conn is None:
+            conn.close()
+        return exported
     except Exception as e:
         log_error(f"Erreur lors de l'exportation des données vers SQL Server : {e}")
+        return 0
 
 # Fonction principale pour exécuter l'export toutes les 30 minutes
 def main():
@@ -113,5 +183,64 @@ def main():
             log_error(f"Erreur inattendue dans le processus d'exportation : {e}")
         time.sleep(EXPORT_INTERVAL)
 
+# -----------------------------
+# BENCHMARK CONTRE UNE CIBLE SQLITE LOCALE (FACULTATIF)
+# -----------------------------
+
+def _seed_trades(conn, start, count):
+    rows = [trade_row({"execution_id": f"exec_{i}", "loop_id": f"loop_{i % 50}", "pair": "BTCUSDT", "side": "BUY",
+                       "pair_sequence": ["BTCUSDT", "ETHBTC", "ETHUSDT"], "open_rate": 40000.0 + i % 100,
+                       "amount": 0.001, "open_date": "2024-01-01T00:00:00Z"}) for i in range(start, start + count)]
+    conn.executemany(f"INSERT INTO trades ({', '.join(TRADE_COLUMNS)}) VALUES ({', '.join('?' * len(TRADE_COLUMNS))})", rows)
+    conn.commit()
+
+def _legacy_export(sqlite_conn, target_conn):
+    """Ancien export : suppression de la table puis réinsertion ligne par ligne de tout l'historique."""
+    target_conn.execute(f"DROP TABLE IF EXISTS {EXPORT_TABLE}_legacy")
+    target_conn.execute(f"CREATE TABLE {EXPORT_TABLE}_legacy ({', '.join(TRADE_COLUMNS)})")
+    insert = f"INSERT INTO {EXPORT_TABLE}_legacy VALUES ({', '.join('?' * len(TRADE_COLUMNS))})"
+    for row in sqlite_conn.execute(f"SELECT {', '.join(TRADE_COLUMNS)} FROM trades"):
+        target_conn.execute(insert, row)
+    target_conn.commit()
+
+def benchmark_incremental_export(history=(50000, 200000, 500000), new_rows=2000):
+    """Durée d'un export de new_rows lignes selon la taille de l'historique : ancien export contre incrémental."""
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        source = sqlite3.connect(os.path.join(directory, "tradeV3.sqlite"))
+        source.execute(trade_table_ddl())
+        target = sqlite3.connect(os.path.join(directory, "target.sqlite"))
+        seeded = 0
+        for size in history:
+            _seed_trades(source, seeded, size - seeded)
+            seeded = size
+            export_new_rows(source, target, "sqlite")  # Rattrapage de l'historique
+            _seed_trades(source, seeded, new_rows)
+            seeded += new_rows
+
+            start = time.perf_counter()
+            _legacy_export(source, target)
+            legacy_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            exported = export_new_rows(source, target, "sqlite")
+            incremental_seconds = time.perf_counter() - start
+            results.append({"history": seeded, "exported": exported, "legacy_seconds": legacy_seconds,
+                            "incremental_seconds": incremental_seconds})
+
+        # Idempotence : rejouer un export depuis une marque haute plus ancienne ne crée aucun doublon
+        cursor = target.cursor()
+        _write_high_water(cursor, "sqlite", seeded - 3 * new_rows)
+        target.commit()
+        export_new_rows(source, target, "sqlite")
+        total, distinct = target.execute(f"SELECT COUNT(*), COUNT(DISTINCT source_rowid) FROM {EXPORT_TABLE}").fetchone()
+        if total != distinct or total != seeded:
+            raise AssertionError(f"Export non idempotent : {total} lignes, {distinct} distinctes, {seeded} attendues")
+    return results
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        for result in benchmark_incremental_export():
+            print(f"Historique {result['history']:>7} | {result['exported']} nouvelles lignes | "
+                  f"ancien export {result['legacy_seconds']:.2f} s | incrémental {result['incremental_seconds']:.3f} s")
+    else:
+        main()
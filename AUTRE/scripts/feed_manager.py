@@ -0,0 +1,203 @@
+import json
+import time
+import random
+import asyncio
+import threading
+import websockets
+from typing import Callable, Iterable, List, Optional
+from urllib.parse import parse_qs, urlparse
+from helpers import log_info, log_error, exchange_stream_url
+from order_book_store import OrderBookStore
+from frame_decoder import DepthRecord, get_decoder
+from instrumentation import span
+
+# -----------------------------
+# GESTIONNAIRE DE FLUX WEBSOCKET MULTIPLEXÉS
+# -----------------------------
+
+STREAM_BASE_URL = exchange_stream_url()  # BINANCE_WS_URL (ou BINANCE_BASE_URL) pour viser l'échange simulé
+MAX_STREAMS_PER_CONNECTION = 200  # Binance accepte jusqu'à 1024 flux par connexion combinée
+RECONNECT_DELAY_SECONDS = 1.0
+MAX_RECONNECT_DELAY_SECONDS = 30.0
+
+class FeedManager:
+    """
+    Ouvre un petit nombre de connexions « combined stream » (/stream?streams=a@depth5/b@depth5/...)
+    sur une seule boucle asyncio et répartit les trames décodées dans l'OrderBookStore.
+
+    Remplace le modèle « un WebSocketApp et un thread par symbole » : N symboles tiennent dans
+    N / streams_per_connection connexions, toutes servies par un unique thread.
+    """
+
+    def __init__(self, symbols: Iterable[str], store: OrderBookStore, base_url: str = STREAM_BASE_URL,
+                 streams_per_connection: int = MAX_STREAMS_PER_CONNECTION, stream_suffix: str = "@depth5",
+                 on_update: Optional[Callable[[str], None]] = None, decoder=None, local_books=None, recorder=None):
+        self.symbols = sorted(set(symbols))
+        self.store = store
+        self.base_url = base_url.rstrip("/")
+        self.streams_per_connection = streams_per_connection
+        self.stream_suffix = stream_suffix
+        self.on_update = on_update
+        self.decoder = decoder or get_decoder()  # msgspec / orjson si installés, sinon json
+        self.local_books = local_books  # LocalOrderBookManager pour les flux diff @depth
+        self.recorder = recorder  # MarketRecorder optionnel : trames brutes horodatées à la réception
+        self.frames_processed = 0
+        self.started_at: Optional[float] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        self._thread: Optional[threading.Thread] = None
+
+    def connection_urls(self) -> List[str]:
+        """URLs des connexions combinées, chacune portant au plus streams_per_connection flux."""
+        streams = [f"{symbol.lower()}{self.stream_suffix}" for symbol in self.symbols]
+        return [
+            f"{self.base_url}/stream?streams=" + "/".join(streams[i:i + self.streams_per_connection])
+            for i in range(0, len(streams), self.streams_per_connection)
+        ]
+
+    def dispatch(self, message) -> Optional[str]:
+        """Décode une trame combinée {"stream", "data"} et met à jour le carnet du symbole."""
+        with span("decode"):
+            record = self.decoder.decode(message)
+        if not isinstance(record, DepthRecord) or not record.symbol:
+            return None
+        self.frames_processed += 1
+        with span("book_update"):
+            if record.is_diff:
+                # Diff @depth : le carnet local publie lui-même ses meilleurs niveaux dans le store
+                if self.local_books is None or not self.local_books.on_diff(record):
+                    return None
+            else:
+                self.store.update(record.symbol, record.bids, record.asks)
+        if self.on_update is not None:
+            self.on_update(record.symbol)
+        return record.symbol
+
+    async def _run_connection(self, url: str) -> None:
+        delay = RECONNECT_DELAY_SECONDS
+        while True:
+            try:
+                async with websockets.connect(url, max_size=None) as connection:
+                    log_info(f"Connexion combinée ouverte : {url[:120]}")
+                    delay = RECONNECT_DELAY_SECONDS
+                    async for message in connection:
+                        if self.recorder is not None:
+                            self.recorder.record(message, time.time_ns())
+                        try:
+                            self.dispatch(message)
+                        except Exception as e:
+                            log_error(f"Trame WebSocket invalide : {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log_error(f"Erreur WebSocket : {e}")
+            log_info(f"Reconnexion dans {delay:.1f} s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY_SECONDS)
+
+    async def run(self) -> None:
+        """Lance toutes les connexions combinées sur la boucle asyncio courante."""
+        self._loop = asyncio.get_running_loop()
+        self.started_at = time.perf_counter()
+        self._tasks = [asyncio.create_task(self._run_connection(url)) for url in self.connection_urls()]
+        log_info(f"{len(self.symbols)} symboles répartis sur {len(self._tasks)} connexions combinées")
+        try:
+            await asyncio.gather(*self._tasks)
+        except asyncio.CancelledError:
+            pass
+
+    def start_in_thread(self) -> threading.Thread:
+        """Démarre le gestionnaire dans un thread dédié, sans bloquer l'appelant."""
+        self._thread = threading.Thread(target=asyncio.run, args=(self.run(),), name="feed_manager", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self) -> None:
+        """Ferme toutes les connexions, arrête la boucle asyncio du gestionnaire puis l'enregistreur."""
+        if self._loop is not None:
+            try:
+                # Une seule annulation groupée : la première tâche annulée termine gather() et ferme la boucle
+                self._loop.call_soon_threadsafe(self._cancel_tasks)
+            except RuntimeError:
+                pass  # Boucle déjà fermée : plus rien à annuler
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self.recorder is not None:
+            self.recorder.close()  # Termine le segment gzip en cours : sans cela sa fin est illisible
+
+    def _cancel_tasks(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+    def frames_per_second(self) -> float:
+        if not self.started_at:
+            return 0.0
+        return self.frames_processed / max(time.perf_counter() - self.started_at, 1e-9)
+
+# -----------------------------
+# SERVEUR DE REJEU LOCAL (TESTS ET BENCHMARK)
+# -----------------------------
+
+async def serve_recorded_frames(frames: List[str], host: str = "127.0.0.1", port: int = 0, repeat: int = 1):
+    """
+    Serveur WebSocket local qui rejoue des trames combinées enregistrées vers chaque client,
+    en ne gardant que les flux demandés dans ?streams=. Retourne le serveur démarré.
+    """
+    async def handler(connection, path=None):
+        path = path or getattr(connection, "path", None) or connection.request.path
+        requested = set(parse_qs(urlparse(path).query).get("streams", [""])[0].split("/"))
+        selected = [frame for frame in frames if json.loads(frame).get("stream") in requested]
+        for _ in range(repeat):
+            for frame in selected:
+                await connection.send(frame)
+        await connection.close()
+
+    return await websockets.serve(handler, host, port, max_size=None)
+
+def synthetic_depth_frames(symbol_count: int, seed: int = 5) -> List[str]:
+    """Trames combinées @depth5 synthétiques, une par symbole."""
+    rng = random.Random(seed)
+    frames = []
+    for i in range(symbol_count):
+        symbol = f"SYM{i:04d}USDT"
+        mid = rng.uniform(0.01, 50000)
+        frames.append(json.dumps({
+            "stream": f"{symbol.lower()}@depth5",
+            "data": {
+                "lastUpdateId": i,
+                "bids": [[f"{mid * (1 - 0.0001 * (k + 1)):.8f}", f"{rng.uniform(0.1, 50):.8f}"] for k in range(5)],
+                "asks": [[f"{mid * (1 + 0.0001 * (k + 1)):.8f}", f"{rng.uniform(0.1, 50):.8f}"] for k in range(5)],
+            },
+        }))
+    return frames
+
+async def benchmark_feed_manager(symbol_count: int = 2000, repeat: int = 20) -> dict:
+    """Mesure le débit de trames traitées par seconde contre le serveur de rejeu local."""
+    frames = synthetic_depth_frames(symbol_count)
+    server = await serve_recorded_frames(frames, repeat=repeat)
+    port = server.sockets[0].getsockname()[1]
+    store = OrderBookStore(capacity=symbol_count)
+    manager = FeedManager([f"SYM{i:04d}USDT" for i in range(symbol_count)], store, base_url=f"ws://127.0.0.1:{port}")
+    expected = symbol_count * repeat
+
+    runner = asyncio.create_task(manager.run())
+    while manager.frames_processed < expected:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - manager.started_at
+    runner.cancel()
+    server.close()
+    await server.wait_closed()
+    return {
+        "symbols": symbol_count,
+        "connections": len(manager.connection_urls()),
+        "threads": threading.active_count(),
+        "frames": manager.frames_processed,
+        "frames_per_second": manager.frames_processed / elapsed,
+    }
+
+if __name__ == "__main__":
+    results = asyncio.run(benchmark_feed_manager())
+    print(
+        f"{results['symbols']} symboles | {results['connections']} connexions | {results['threads']} threads | "
+        f"{results['frames']} trames | {results['frames_per_second']:.0f} trames/s"
+    )
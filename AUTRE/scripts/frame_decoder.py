@@ -0,0 +1,193 @@
+import sys
+import json
+import time
+import random
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # orjson est optionnel : repli sur la bibliothèque standard
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # msgspec est optionnel : repli sur orjson ou la bibliothèque standard
+    msgspec = None
+
+# -----------------------------
+# ENREGISTREMENTS TYPÉS
+# -----------------------------
+
+class DepthRecord(NamedTuple):
+    """Mise à jour de profondeur : instantané @depth5 ou diff @depth (niveaux [prix, quantité] bruts)."""
+    symbol: str
+    first_update_id: int
+    last_update_id: int
+    bids: list
+    asks: list
+    is_diff: bool = False
+
+class TickerRecord(NamedTuple):
+    """Ticker 24h : uniquement les champs lus par le moteur."""
+    symbol: str
+    last_price: float
+    best_bid: float
+    best_ask: float
+    volume: float
+    quote_volume: float
+
+Record = Union[DepthRecord, TickerRecord]
+
+def _symbol_from_stream(stream: str) -> str:
+    return stream.split("@", 1)[0].upper()
+
+def _record_from_dict(payload: Dict[str, Any], stream: str = "") -> Optional[Record]:
+    event = payload.get("e")
+    if event == "depthUpdate":
+        return DepthRecord(payload["s"], payload["U"], payload["u"], payload["b"], payload["a"], True)
+    if event == "24hrTicker":
+        return TickerRecord(payload["s"], float(payload["c"]), float(payload["b"]), float(payload["a"]),
+                            float(payload["v"]), float(payload["q"]))
+    if "bids" in payload:
+        last_update_id = payload.get("lastUpdateId", 0)
+        symbol = payload.get("s") or _symbol_from_stream(stream)
+        return DepthRecord(symbol, last_update_id, last_update_id, payload["bids"], payload.get("asks", []))
+    return None
+
+# -----------------------------
+# DÉCODEURS
+# -----------------------------
+
+class JsonFrameDecoder:
+    """Décodeur de référence basé sur json de la bibliothèque standard."""
+    name = "json"
+
+    def __init__(self):
+        self._loads = json.loads
+
+    def decode(self, message: Union[str, bytes]) -> Optional[Record]:
+        frame = self._loads(message)
+        if "data" in frame:
+            return _record_from_dict(frame["data"], frame.get("stream", ""))
+        return _record_from_dict(frame)
+
+class OrjsonFrameDecoder(JsonFrameDecoder):
+    """Même logique que JsonFrameDecoder, avec l'analyseur orjson."""
+    name = "orjson"
+
+    def __init__(self):
+        self._loads = orjson.loads
+
+if msgspec is not None:
+    class _MsgspecPayload(msgspec.Struct):
+        e: str = ""
+        s: str = ""
+        U: int = 0
+        u: int = 0
+        lastUpdateId: int = 0
+        bids: Optional[list] = None  # None : champ absent (un carnet vide [] reste un instantané valide)
+        asks: Optional[list] = None
+        b: Union[list, str] = ""  # Niveaux bids (depthUpdate) ou meilleur bid (24hrTicker)
+        a: Union[list, str] = ""  # Niveaux asks (depthUpdate) ou meilleur ask (24hrTicker)
+        c: str = ""
+        v: str = ""
+        q: str = ""
+
+    class _MsgspecFrame(_MsgspecPayload):
+        stream: str = ""
+        data: Optional[_MsgspecPayload] = None
+
+class MsgspecFrameDecoder:
+    """Décodage direct en structures msgspec typées ; les champs non lus par le moteur sont ignorés."""
+    name = "msgspec"
+
+    def __init__(self):
+        self._decoder = msgspec.json.Decoder(_MsgspecFrame)
+
+    def decode(self, message: Union[str, bytes]) -> Optional[Record]:
+        frame = self._decoder.decode(message)
+        payload = frame.data if frame.data is not None else frame
+        if payload.e == "depthUpdate":
+            return DepthRecord(payload.s, payload.U, payload.u, payload.b, payload.a, True)
+        if payload.e == "24hrTicker":
+            return TickerRecord(payload.s, float(payload.c), float(payload.b), float(payload.a),
+                                float(payload.v), float(payload.q))
+        if payload.bids is not None:
+            # Présence du champ, comme "bids" in payload des décodeurs json/orjson
+            symbol = payload.s or _symbol_from_stream(frame.stream)
+            asks = payload.asks if payload.asks is not None else []
+            return DepthRecord(symbol, payload.lastUpdateId, payload.lastUpdateId, payload.bids, asks)
+        return None
+
+def available_decoders() -> List[str]:
+    """Noms des décodeurs utilisables, du plus rapide au plus lent."""
+    names = []
+    if msgspec is not None:
+        names.append("msgspec")
+    if orjson is not None:
+        names.append("orjson")
+    names.append("json")
+    return names
+
+def get_decoder(name: Optional[str] = None):
+    """Retourne le décodeur demandé, ou le plus rapide disponible si name est None."""
+    name = name or available_decoders()[0]
+    if name == "msgspec" and msgspec is not None:
+        return MsgspecFrameDecoder()
+    if name == "orjson" and orjson is not None:
+        return OrjsonFrameDecoder()
+    if name == "json":
+        return JsonFrameDecoder()
+    raise ValueError(f"Décodeur indisponible : {name}")
+
+_default_decoder = get_decoder()
+
+def decode_frame(message: Union[str, bytes]) -> Optional[Record]:
+    """Décode une trame WebSocket Binance avec le décodeur par défaut."""
+    return _default_decoder.decode(message)
+
+# -----------------------------
+# MICRO-BENCHMARK DES DÉCODEURS (FACULTATIF)
+# -----------------------------
+
+def synthetic_frame_corpus(frame_count: int = 50000, seed: int = 11) -> List[bytes]:
+    """Corpus mêlant trames combinées @depth5, diffs @depth et tickers 24h."""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(frame_count):
+        symbol = f"SYM{rng.randrange(2000):04d}USDT"
+        mid = rng.uniform(0.01, 50000)
+        levels = lambda sign: [[f"{mid * (1 + sign * 0.0001 * (k + 1)):.8f}", f"{rng.uniform(0.1, 50):.8f}"] for k in range(5)]
+        kind = i % 3
+        if kind == 0:
+            frame = {"stream": f"{symbol.lower()}@depth5", "data": {"lastUpdateId": i, "bids": levels(-1), "asks": levels(1)}}
+        elif kind == 1:
+            frame = {"stream": f"{symbol.lower()}@depth", "data": {"e": "depthUpdate", "E": i, "s": symbol, "U": i, "u": i + 2,
+                                                                   "b": levels(-1), "a": levels(1)}}
+        else:
+            frame = {"stream": f"{symbol.lower()}@ticker", "data": {"e": "24hrTicker", "E": i, "s": symbol, "p": "0.1", "P": "0.2",
+                                                                    "c": f"{mid:.8f}", "b": f"{mid * 0.999:.8f}", "a": f"{mid * 1.001:.8f}",
+                                                                    "v": "1234.5", "q": "98765.4", "o": "1", "h": "2", "l": "0.5"}}
+        corpus.append(json.dumps(frame).encode())
+    return corpus
+
+def benchmark_decoders(corpus: List[bytes]) -> Dict[str, float]:
+    """Trames décodées par seconde (sur un cœur) pour chaque décodeur disponible."""
+    results = {}
+    for name in available_decoders():
+        decoder = get_decoder(name)
+        start = time.perf_counter()
+        for message in corpus:
+            decoder.decode(message)
+        results[name] = len(corpus) / (time.perf_counter() - start)
+    return results
+
+if __name__ == "__main__":
+    # Corpus enregistré optionnel : un fichier de trames brutes, une par ligne
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as corpus_file:
+            frames = [line.rstrip(b"\n") for line in corpus_file if line.strip()]
+    else:
+        frames = synthetic_frame_corpus()
+    for decoder_name, frames_per_second in benchmark_decoders(frames).items():
+        print(f"{decoder_name:>8} : {frames_per_second:>10.0f} trames/s par cœur")
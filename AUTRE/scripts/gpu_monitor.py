@@ -1,5 +1,6 @@
 import time
-from helpers import get_gpu_metrics, push_prometheus_metric, log_action
+from helpers import get_gpu_metrics, log_action
+from metrics_push import MONITOR_FLUSH_CYCLES, get_metric_batcher
 
 PROMETHEUS_PUSHGATEWAY_URL = "http://localhost:9091/metrics/job/gpu_monitor"
 
@@ -11,15 +12,17 @@ def monitor_gpu(interval: int = 10):
         interval (int): Intervalle de temps en secondes entre deux collectes de métriques.
     """
     log_action("Lancement du GPU Monitor")
+    # Les quatre jauges partent ensemble, en un seul POST toutes les MONITOR_FLUSH_CYCLES collectes
+    batcher = get_metric_batcher(PROMETHEUS_PUSHGATEWAY_URL, interval * MONITOR_FLUSH_CYCLES)
     while True:
         try:
             metrics = get_gpu_metrics()
             if metrics:
                 # Pousser les métriques GPU vers Prometheus
-                push_prometheus_metric("gpu_utilization", metrics["gpu_utilization"], PROMETHEUS_PUSHGATEWAY_URL)
-                push_prometheus_metric("gpu_memory_used", metrics["memory_used"], PROMETHEUS_PUSHGATEWAY_URL)
-                push_prometheus_metric("gpu_power_draw", metrics["power_draw"], PROMETHEUS_PUSHGATEWAY_URL)
-                push_prometheus_metric("gpu_temperature", metrics["temperature"], PROMETHEUS_PUSHGATEWAY_URL)
+                batcher.set("gpu_utilization", metrics["gpu_utilization"])
+                batcher.set("gpu_memory_used", metrics["memory_used"])
+                batcher.set("gpu_power_draw", metrics["power_draw"])
+                batcher.set("gpu_temperature", metrics["temperature"])
                 log_action("Métriques GPU collectées et envoyées à Prometheus")
             else:
                 log_action("Pas de métriques GPU disponibles")
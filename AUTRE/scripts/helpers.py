@@ -7,17 +7,31 @@ import requests
 import subprocess
 import time
 from datetime import datetime
-from typing import Any, Dict, List
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+from http_client import get_http_client
+from order_signing import sign_query
+from log_pipeline import get_logger
+from metrics_push import get_metric_batcher
+from rate_limiter import REQUEST_WEIGHT_PER_MINUTE, RateLimiter
+
+try:
+    import pyodbc
+except ImportError:  # pyodbc n'est requis que pour l'export vers SQL Server
+    pyodbc = None
+
+try:
+    import pymysql
+except ImportError:  # pymysql n'est requis que pour le rapport de métriques lu depuis MySQL
+    pymysql = None
 
 # -----------------------------
 # CONFIGURATION DU LOGGER
 # -----------------------------
 
-logger = logging.getLogger("helpers")
-logger.setLevel(logging.INFO)
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-logger.addHandler(console_handler)
+# File de journalisation partagée (log_pipeline.py) : l'écriture se fait dans un thread dédié
+logger = get_logger("helpers")
 
 # -----------------------------
 # GESTION DES FICHIERS JSON ET YAML
@@ -92,20 +106,144 @@ def save_yaml(data: Any, file_path: str) -> None:
     except Exception as e:
         logger.error(f"Erreur lors de la sauvegarde dans {file_path} : {e}")
 
+# -----------------------------
+# URLS DE L'ÉCHANGE (RÉEL OU SIMULÉ)
+# -----------------------------
+
+DEFAULT_BINANCE_BASE_URL = "https://api.binance.com"
+DEFAULT_BINANCE_WS_URL = "wss://stream.binance.com:9443"
+
+def exchange_base_url(config: Optional[Dict[str, Any]] = None) -> str:
+    """
+    URL de base REST de l'échange : variable d'environnement BINANCE_BASE_URL, sinon clé
+    base_url de la configuration, sinon l'API Binance réelle.
+
+    :param config: Section settings de la configuration (optionnelle).
+    :return: URL sans barre oblique finale.
+    """
+    url = os.environ.get("BINANCE_BASE_URL") or (config or {}).get("base_url") or DEFAULT_BINANCE_BASE_URL
+    return url.rstrip("/")
+
+def exchange_stream_url(config: Optional[Dict[str, Any]] = None) -> str:
+    """
+    URL de base des flux WebSocket : BINANCE_WS_URL, sinon clé stream_url de la configuration,
+    sinon dérivée de l'URL REST quand celle-ci est surchargée (http -> ws, https -> wss).
+
+    :param config: Section settings de la configuration (optionnelle).
+    :return: URL sans barre oblique finale.
+    """
+    url = os.environ.get("BINANCE_WS_URL") or (config or {}).get("stream_url")
+    if not url:
+        base_url = exchange_base_url(config)
+        if base_url == DEFAULT_BINANCE_BASE_URL:
+            url = DEFAULT_BINANCE_WS_URL
+        else:
+            parts = urlsplit(base_url)
+            url = urlunsplit(("wss" if parts.scheme == "https" else "ws", parts.netloc, "", "", ""))
+    return url.rstrip("/")
+
+def rebase_stream_url(url: str, config: Optional[Dict[str, Any]] = None) -> str:
+    """Remplace l'hôte d'une URL WebSocket configurée par celui de exchange_stream_url() s'il est surchargé."""
+    stream_url = exchange_stream_url(config)
+    if stream_url == DEFAULT_BINANCE_WS_URL:
+        return url
+    parts, origin = urlsplit(url), urlsplit(stream_url)
+    return urlunsplit((origin.scheme, origin.netloc, parts.path, parts.query, parts.fragment))
+
 # -----------------------------
 # FONCTIONS POUR LA BASE SQLITE
 # -----------------------------
 
-def connect_sqlite(db_path: str) -> sqlite3.Connection:
-    """Établit une connexion avec une base SQLite."""
+# Profil de performance partagé par tous les scripts qui ouvrent tradeV3.sqlite
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",        # Lecteurs et écrivain ne se bloquent plus mutuellement
+    "synchronous": "NORMAL",      # En WAL : durable au checkpoint, plus de fsync à chaque commit
+    "cache_size": -65536,         # 64 Mo de cache de pages par connexion
+    "mmap_size": 268435456,       # 256 Mo lus par projection mémoire
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,         # Attente maximale d'un verrou (ms) avant « database is locked »
+}
+SQLITE_STATEMENT_CACHE = 256  # Requêtes préparées conservées par connexion
+SQLITE_INDEXES = {
+    "trades": ("open_date", "pair", "loop_id", "instance_id"),
+}
+
+def apply_sqlite_pragmas(conn: sqlite3.Connection, pragmas: Optional[Dict[str, Any]] = None) -> None:
+    """Applique les pragmas du profil de performance à une connexion."""
+    for name, value in (pragmas or SQLITE_PRAGMAS).items():
+        conn.execute(f"PRAGMA {name}={value}")
+
+def ensure_sqlite_indexes(conn: sqlite3.Connection, indexes: Optional[Dict[str, Tuple[str, ...]]] = None) -> None:
+    """Crée les index manquants sur les tables existantes (sans effet si la table n'existe pas encore)."""
+    for table, columns in (indexes or SQLITE_INDEXES).items():
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone() is None:
+            continue
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for column in columns:
+            if column in existing:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column})")
+    conn.commit()
+
+def connect_sqlite(db_path: str, tuned: bool = True) -> sqlite3.Connection:
+    """
+    Établit une connexion avec une base SQLite.
+
+    :param db_path: Chemin de la base.
+    :param tuned: Applique le profil de performance (WAL, pragmas, index) ; False pour les réglages par défaut.
+    :return: Connexion avec un cache de requêtes préparées de SQLITE_STATEMENT_CACHE entrées.
+    """
     try:
-        conn = sqlite3.connect(db_path)
+        conn = sqlite3.connect(db_path, timeout=SQLITE_PRAGMAS["busy_timeout"] / 1000,
+                               cached_statements=SQLITE_STATEMENT_CACHE)
+        if tuned:
+            apply_sqlite_pragmas(conn)
+            ensure_sqlite_indexes(conn)
         logger.info(f"Connexion SQLite établie avec succès : {db_path}")
         return conn
     except sqlite3.Error as e:
         logger.error(f"Erreur de connexion SQLite : {e}")
         raise
 
+connect_db = connect_sqlite  # Nom utilisé par export_vers_MySQL et inactive_loops_management
+
+def connect_sql_server(connection_string: Optional[str] = None):
+    """
+    Établit une connexion ODBC avec la base SQL Server cible de l'export.
+
+    :param connection_string: Chaîne ODBC ; par défaut la variable d'environnement SQL_SERVER_CONNECTION_STRING.
+    """
+    if pyodbc is None:
+        raise ImportError("pyodbc est requis pour se connecter à SQL Server")
+    connection_string = connection_string or os.environ["SQL_SERVER_CONNECTION_STRING"]
+    try:
+        conn = pyodbc.connect(connection_string)
+        logger.info("Connexion SQL Server établie avec succès")
+        return conn
+    except pyodbc.Error as e:
+        logger.error(f"Erreur de connexion SQL Server : {e}")
+        raise
+
+def connect_mysql(host: str, user: str, password: str, database: str, port: int = 3306):
+    """
+    Établit une connexion MySQL (pymysql) pour le rapport de métriques.
+
+    :return: Connexion DB-API, ou None si le serveur refuse la connexion.
+    """
+    if pymysql is None:
+        raise ImportError("pymysql est requis pour se connecter à MySQL")
+    try:
+        conn = pymysql.connect(host=host, user=user, password=password, database=database, port=port)
+        logger.info(f"Connexion MySQL établie avec succès : {host}/{database}")
+        return conn
+    except pymysql.MySQLError as e:
+        logger.error(f"Erreur de connexion MySQL : {e}")
+        return None
+
+@lru_cache(maxsize=128)
+def insert_statement(table: str, columns: Tuple[str, ...]) -> str:
+    """Texte INSERT mis en cache : un texte identique réutilise la requête préparée de la connexion."""
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})"
+
 
 def execute_sql_query(conn: sqlite3.Connection, query: str, params: tuple = ()) -> List[tuple]:
     """Exécute une requête SQL et retourne les résultats."""
@@ -125,9 +263,7 @@ def save_to_sqlite(conn: sqlite3.Connection, table: str, data: List[Dict[str, An
         if not data:
             logger.warning("Aucune donnée à insérer dans la table SQLite.")
             return
-        columns = ', '.join(data[0].keys())
-        placeholders = ', '.join(['?'] * len(data[0]))
-        query = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
+        query = insert_statement(table, tuple(data[0].keys()))
         cursor = conn.cursor()
         cursor.executemany(query, [tuple(row.values()) for row in data])
         conn.commit()
@@ -149,17 +285,23 @@ def clean_sqlite_table(conn: sqlite3.Connection, table: str, older_than_days: in
 # -----------------------------
 
 def push_prometheus_metric(metric_name: str, value: float, prometheus_url: str) -> None:
-    """Pousse une métrique vers le Pushgateway de Prometheus."""
+    """
+    Met à jour une jauge pour le Pushgateway de Prometheus.
+    La valeur rejoint le registre local de prometheus_url (metrics_push.py), envoyé en un seul POST par intervalle.
+    """
     try:
-        payload = f"{metric_name} {value}\n"
-        response = requests.post(prometheus_url, data=payload)
-        if response.status_code == 200:
-            logger.info(f"Métrique {metric_name} poussée avec succès.")
-        else:
-            logger.error(f"Échec de l'envoi de {metric_name} : {response.status_code}")
+        get_metric_batcher(prometheus_url).set(metric_name, value)
     except Exception as e:
         logger.error(f"Erreur lors de l'envoi de métriques à Prometheus : {e}")
 
+# Job des métriques d'arbitrage ; ARBITRAGE_PUSHGATEWAY_URL="" les désactive (tests, exécutions hors ligne)
+ARBITRAGE_PUSHGATEWAY_URL = os.getenv("ARBITRAGE_PUSHGATEWAY_URL", "http://localhost:9091/metrics/job/arbitrage")
+
+def update_metrics(metric_name: str, value: float) -> None:
+    """Met à jour une métrique des scripts d'arbitrage (boucles trouvées, profit par boucle...) dans le job arbitrage."""
+    if ARBITRAGE_PUSHGATEWAY_URL:
+        push_prometheus_metric(metric_name, value, ARBITRAGE_PUSHGATEWAY_URL)
+
 
 # -----------------------------
 # FONCTIONS POUR LES FICHIERS TRANSVERSAUX
@@ -260,7 +402,7 @@ def get_digital_ocean_metrics(api_token: str) -> Dict[str, Any]:
     headers = {"Authorization": f"Bearer {api_token}"}
     url = "https://api.digitalocean.com/v2/monitoring/metrics/droplet"
     try:
-        response = requests.get(url, headers=headers)
+        response = get_http_client().get(url, headers=headers)
         response.raise_for_status()
         return response.json()
     except Exception as e:
@@ -271,27 +413,34 @@ def get_digital_ocean_metrics(api_token: str) -> Dict[str, Any]:
 # EXTENSIONS POUR LES LOGS
 # -----------------------------
 
-def log_info(message: str, details: str = "") -> None:
+# Les arguments supplémentaires sont interpolés en %-style dans le thread d'écriture,
+# et seulement si le niveau est actif : log_info("Trade %s exécuté", symbol).
+
+def log_info(message: str, *args: Any, details: str = "") -> None:
     """Enregistre un message d'information dans les logs."""
-    logger.info(f"INFO : {message} - Détails : {details}")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(message, *args, extra={"details": details})
 
-def log_error(message: str, details: str = "") -> None:
+def log_error(message: str, *args: Any, details: str = "") -> None:
     """Enregistre un message d'erreur dans les logs."""
-    logger.error(f"ERREUR : {message} - Détails : {details}")
+    if logger.isEnabledFor(logging.ERROR):
+        logger.error(message, *args, extra={"details": details})
 
-def log_warning(message: str, details: str = "") -> None:
+def log_warning(message: str, *args: Any, details: str = "") -> None:
     """Enregistre un message d'avertissement dans les logs."""
-    logger.warning(f"AVERTISSEMENT : {message} - Détails : {details}")
+    if logger.isEnabledFor(logging.WARNING):
+        logger.warning(message, *args, extra={"details": details})
 
-def log_debug(message: str, details: str = "") -> None:
+def log_debug(message: str, *args: Any, details: str = "") -> None:
     """Enregistre un message de débogage dans les logs."""
-    logger.debug(f"DEBUG : {message} - Détails : {details}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(message, *args, extra={"details": details})
     
 # -----------------------------
 # FONCTIONS POUR LE RAPPORT FISCAL BINANCE
 # -----------------------------
 
-BINANCE_TAX_API_URL = "https://api.binance.com/api/v3/tax/report"  # URL fictive pour illustration
+BINANCE_TAX_API_PATH = "/api/v3/tax/report"  # Chemin fictif pour illustration
 
 def fetch_tax_report(api_key: str, secret_key: str, year: int) -> Dict[str, Any]:
     """Récupère le rapport fiscal depuis l'API Binance pour une année donnée."""
@@ -302,7 +451,8 @@ def fetch_tax_report(api_key: str, secret_key: str, year: int) -> Dict[str, Any]
         "year": year
     }
     try:
-        response = requests.get(BINANCE_TAX_API_URL, headers=headers, params=params)
+        response = get_http_client().get(f"{exchange_base_url()}{BINANCE_TAX_API_PATH}", headers=headers, params=params)
+        record_api_response(api_key, response)
         response.raise_for_status()
         logger.info(f"Rapport fiscal récupéré avec succès pour l'année {year}.")
         return response.json()
@@ -331,66 +481,69 @@ def calculate_flat_tax(data: Dict[str, Any], flat_tax_rate: float = 0.30) -> flo
         
         
 # -----------------------------
-# VALIDATION DES CLÉS API ET GESTION DES LIMITES DE TAUX
+# SIGNATURE DES REQUÊTES BINANCE
 # -----------------------------
 
-# Structure pour suivre les utilisations des clés API
-API_USAGE_TRACKER = {}
+def generate_signature(query_string: str, secret_key: str) -> str:
+    """
+    Signe une query string Binance en HMAC-SHA256.
+    L'objet HMAC de chaque clé secrète est initialisé une seule fois puis copié à chaque appel.
 
-def initialize_api_tracker(api_keys: List[str], reset_interval: int = 60) -> None:
+    :param query_string: Paramètres encodés de la requête.
+    :param secret_key: Clé secrète associée à la clé API.
+    :return: Signature hexadécimale.
     """
-    Initialise le tracker des clés API pour surveiller les limites d'utilisation.
-    Chaque clé API est associée à un compteur de requêtes.
+    return sign_query(query_string, secret_key)
+
+# -----------------------------
+# VALIDATION DES CLÉS API ET GESTION DES LIMITES DE POIDS
+# -----------------------------
+
+# Seaux à jetons par clé API, pondérés par endpoint et resynchronisés sur les en-têtes Binance (rate_limiter.py)
+API_USAGE_TRACKER = RateLimiter()
+
+def initialize_api_tracker(api_keys: List[str], weight_per_minute: int = REQUEST_WEIGHT_PER_MINUTE) -> None:
+    """
+    Enregistre les clés API dans le limiteur partagé ; chaque clé dispose d'un seau de poids.
 
     :param api_keys: Liste des clés API à initialiser.
-    :param reset_interval: Intervalle de réinitialisation en secondes (par défaut : 60 secondes).
+    :param weight_per_minute: Poids autorisé par minute et par clé (6000 par défaut, limite Binance).
     """
+    global API_USAGE_TRACKER
+    if weight_per_minute != API_USAGE_TRACKER.weight_per_minute:
+        API_USAGE_TRACKER = RateLimiter(weight_per_minute=weight_per_minute)
     for key in api_keys:
-        API_USAGE_TRACKER[key] = {"requests": 0, "last_reset": time.time()}
-    logger.info(f"Tracker des clés API initialisé avec un intervalle de réinitialisation de {reset_interval} secondes.")
+        API_USAGE_TRACKER.add_key(key)
+    logger.info("Limiteur des clés API initialisé : %s clés, %s de poids par minute", len(api_keys), weight_per_minute)
 
-def validate_api_key(api_key: str, max_requests: int = 1200, reset_interval: int = 60) -> bool:
+def validate_api_key(api_key: str, weight: int = 1) -> bool:
     """
-    Vérifie si une clé API peut encore être utilisée dans les limites autorisées.
+    Vérifie si une clé API peut encore envoyer une requête du poids donné, et le débite le cas échéant.
 
     :param api_key: La clé API à vérifier.
-    :param max_requests: Nombre maximum de requêtes autorisées par intervalle.
-    :param reset_interval: Intervalle de réinitialisation en secondes.
+    :param weight: Poids de la requête (voir rate_limiter.request_weight).
     :return: True si la clé API peut être utilisée, False sinon.
     """
-    if api_key not in API_USAGE_TRACKER:
-        logger.error(f"Clé API inconnue : {api_key}. Assurez-vous qu'elle est enregistrée dans le tracker.")
+    if api_key not in API_USAGE_TRACKER.buckets:
+        logger.error("Clé API inconnue : %s. Assurez-vous qu'elle est enregistrée dans le tracker.", api_key)
         return False
-
-    usage_data = API_USAGE_TRACKER[api_key]
-    current_time = time.time()
-
-    # Réinitialiser le compteur si l'intervalle est dépassé
-    if current_time - usage_data["last_reset"] > reset_interval:
-        API_USAGE_TRACKER[api_key] = {"requests": 0, "last_reset": current_time}
-        logger.info(f"Réinitialisation du compteur pour la clé API : {api_key}")
-
-    # Vérifier si la clé API dépasse les limites
-    if usage_data["requests"] < max_requests:
-        API_USAGE_TRACKER[api_key]["requests"] += 1
-        logger.debug(f"Clé API {api_key} validée : {usage_data['requests']} requêtes utilisées.")
-        return True
-    else:
-        logger.warning(f"Clé API {api_key} a atteint la limite de {max_requests} requêtes.")
+    if API_USAGE_TRACKER.try_acquire(weight, api_key) is None:
+        logger.warning("Clé API %s : budget de poids insuffisant pour une requête de poids %s.", api_key, weight)
         return False
+    return True
 
-def get_available_api_key(max_requests: int = 1200, reset_interval: int = 60) -> str:
+def get_available_api_key(weight: int = 1) -> Optional[str]:
     """
-    Renvoie une clé API disponible qui respecte les limites d'utilisation.
+    Renvoie la clé API qui dispose du plus grand budget restant, après l'avoir débitée de weight.
 
-    :param max_requests: Nombre maximum de requêtes autorisées par intervalle.
-    :param reset_interval: Intervalle de réinitialisation en secondes.
+    :param weight: Poids de la requête à envoyer.
     :return: Une clé API valide ou None si aucune n'est disponible.
     """
-    for api_key, usage_data in API_USAGE_TRACKER.items():
-        if validate_api_key(api_key, max_requests, reset_interval):
-            logger.info(f"Clé API disponible trouvée : {api_key}")
-            return api_key
-
-    logger.error("Aucune clé API disponible dans les limites actuelles.")
-    return None
\ No newline at end of file
+    api_key = API_USAGE_TRACKER.try_acquire(weight) if API_USAGE_TRACKER.buckets else None
+    if api_key is None:
+        logger.error("Aucune clé API disponible dans les limites actuelles.")
+    return api_key
+
+def record_api_response(api_key: str, response: requests.Response) -> None:
+    """Resynchronise le budget de la clé sur X-MBX-USED-WEIGHT-1M et applique Retry-After (429/418)."""
+    API_USAGE_TRACKER.update_from_response(api_key, response.status_code, response.headers)
\ No newline at end of file
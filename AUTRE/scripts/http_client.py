@@ -0,0 +1,195 @@
+import os
+import ssl
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import subprocess
+import requests
+from collections import defaultdict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from prometheus_client import Histogram
+
+# -----------------------------
+# CLIENT HTTP PARTAGÉ (SESSIONS KEEP-ALIVE)
+# -----------------------------
+
+DEFAULT_POOL_CONNECTIONS = 8  # Nombre d'hôtes dont les pools sont conservés
+DEFAULT_POOL_MAXSIZE = 16  # Connexions keep-alive par hôte
+DEFAULT_TIMEOUT = (3.05, 10)  # (connexion, lecture) en secondes
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+http_request_latency = Histogram(
+    "http_request_latency_seconds", "Latence des requêtes REST par hôte et endpoint",
+    ["host", "endpoint", "method"], buckets=LATENCY_BUCKETS,
+)
+
+class EndpointLatency:
+    """Statistiques locales de latence d'un endpoint (en complément de l'histogramme Prometheus)."""
+
+    __slots__ = ("count", "total_seconds", "max_seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.count if self.count else 0.0
+
+class HttpClient:
+    """
+    Client HTTP synchrone partagé : une requests.Session par hôte avec un pool de connexions
+    keep-alive, des timeouts par défaut et un histogramme de latence par endpoint.
+    """
+
+    def __init__(self, pool_connections: int = DEFAULT_POOL_CONNECTIONS, pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 timeout: Any = DEFAULT_TIMEOUT, max_retries: int = 0, verify: Any = True):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.verify = verify
+        self.latencies: Dict[Tuple[str, str], EndpointLatency] = defaultdict(EndpointLatency)
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def session(self, url: str) -> requests.Session:
+        """Retourne la session (et donc le pool de connexions) associée à l'hôte de l'URL."""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        session = self._sessions.get(origin)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(origin)
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize,
+                                          max_retries=self.max_retries)
+                    session.mount(f"{parts.scheme}://", adapter)
+                    self._sessions[origin] = session
+        return session
+
+    def request(self, method: str, url: str, endpoint: Optional[str] = None, **kwargs) -> requests.Response:
+        """Exécute une requête sur la session de l'hôte et enregistre sa latence."""
+        kwargs.setdefault("timeout", self.timeout)
+        kwargs.setdefault("verify", self.verify)  # Par requête : Session.verify est écrasé par REQUESTS_CA_BUNDLE
+        parts = urlsplit(url)
+        endpoint = endpoint or parts.path or "/"
+        start = time.perf_counter()
+        try:
+            return self.session(url).request(method, url, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_request_latency.labels(parts.netloc, endpoint, method).observe(elapsed)
+            self.latencies[(method, endpoint)].observe(elapsed)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+_http_client: Optional[HttpClient] = None
+_http_client_lock = threading.Lock()
+
+def get_http_client() -> HttpClient:
+    """Retourne le client HTTP partagé du processus (créé à la première utilisation)."""
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = HttpClient(
+                    pool_maxsize=int(os.environ.get("HTTP_POOL_MAXSIZE", DEFAULT_POOL_MAXSIZE)),
+                )
+    return _http_client
+
+# -----------------------------
+# BENCHMARK CONTRE UN STUB HTTPS LOCAL (FACULTATIF)
+# -----------------------------
+
+def _self_signed_context(directory: str) -> Optional[ssl.SSLContext]:
+    """Crée un certificat auto-signé avec openssl s'il est disponible."""
+    if shutil.which("openssl") is None:
+        return None
+    cert, key = os.path.join(directory, "stub.crt"), os.path.join(directory, "stub.key")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", cert,
+                    "-days", "1", "-subj", "/CN=127.0.0.1"], check=True, capture_output=True)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return context
+
+def benchmark_http_client(requests_count: int = 300) -> Dict[str, float]:
+    """Compare la latence moyenne d'un requests.get isolé et du client partagé sur un stub local."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            payload = b'{"serverTime": 0}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    with tempfile.TemporaryDirectory() as directory:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        context = _self_signed_context(directory)
+        scheme = "http"
+        if context is not None:
+            server.socket = context.wrap_socket(server.socket, server_side=True)
+            scheme = "https"
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"{scheme}://127.0.0.1:{server.server_address[1]}/api/v3/time"
+
+        import urllib3
+        urllib3.disable_warnings()
+        start = time.perf_counter()
+        for _ in range(requests_count):
+            requests.get(url, verify=False, timeout=DEFAULT_TIMEOUT)
+        unpooled = (time.perf_counter() - start) / requests_count
+
+        client = HttpClient(verify=False)
+        start = time.perf_counter()
+        for _ in range(requests_count):
+            client.get(url)
+        pooled = (time.perf_counter() - start) / requests_count
+        client.close()
+        server.shutdown()
+
+    return {"scheme": scheme, "unpooled_seconds": unpooled, "pooled_seconds": pooled}
+
+if __name__ == "__main__":
+    results = benchmark_http_client(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
+    print(
+        f"Stub {results['scheme'].upper()} | requests.get isolé : {results['unpooled_seconds'] * 1e3:.2f} ms | "
+        f"client partagé : {results['pooled_seconds'] * 1e3:.2f} ms | "
+        f"gain : {(results['unpooled_seconds'] - results['pooled_seconds']) * 1e3:.2f} ms par requête"
+    )
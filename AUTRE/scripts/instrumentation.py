@@ -0,0 +1,153 @@
+import os
+import sys
+import time
+import functools
+from typing import Callable, Optional
+from prometheus_client import Histogram, start_http_server
+from log_pipeline import get_logger
+
+# -----------------------------
+# CHRONOMÉTRAGE DU CHEMIN CRITIQUE (TRAME -> CARNET -> BOUCLES -> ORDRE -> SAUVEGARDE)
+# -----------------------------
+
+# Interrupteur global : INSTRUMENTATION=1 active les mesures ; désactivées, un span coûte un test de booléen
+_enabled = os.getenv("INSTRUMENTATION", "0").lower() in ("1", "true", "on", "yes")
+DEFAULT_METRICS_PORT = 9200  # Job "arbitrage_metrics" de config/prometheus.yaml
+
+STAGES = ("decode", "book_update", "reprice", "sign", "place_order", "save")
+
+# Seaux en microsecondes pour les étapes locales, prolongés jusqu'à la seconde pour l'aller-retour REST
+STAGE_BUCKETS = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0,
+)
+
+stage_latency = Histogram(
+    "hot_path_stage_seconds", "Durée des étapes du chemin critique (décodage, carnet, boucles, signature, ordre, sauvegarde)",
+    ["stage"], buckets=STAGE_BUCKETS,
+)
+_observers = {stage: stage_latency.labels(stage).observe for stage in STAGES}
+
+logger = get_logger("instrumentation")
+
+def enabled() -> bool:
+    return _enabled
+
+def set_enabled(value: bool) -> None:
+    """Active ou coupe toutes les mesures à chaud (les spans déjà ouverts se terminent normalement)."""
+    global _enabled
+    _enabled = bool(value)
+
+class _Span:
+    __slots__ = ("observe", "start")
+
+    def __init__(self, observe: Callable[[float], None]):
+        self.observe = observe
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.observe(time.perf_counter() - self.start)
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+_NOOP = _NoopSpan()
+
+def span(stage: str):
+    """
+    Chronomètre un bloc sur l'horloge monotone : with span("decode"): ...
+
+    Interrupteur coupé, retourne un contexte vide partagé (aucune allocation, aucune mesure).
+    """
+    return _Span(_observers[stage]) if _enabled else _NOOP
+
+def record(stage: str, seconds: float) -> None:
+    """Ajoute une durée déjà mesurée ailleurs (accusé d'ordre du dispatcher, par exemple)."""
+    if _enabled:
+        _observers[stage](seconds)
+
+def timed(stage: str) -> Callable:
+    """Décorateur équivalent à span(stage) autour de tout l'appel de la fonction."""
+    observe = _observers[stage]
+
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def serve_metrics(port: Optional[int] = None) -> bool:
+    """
+    Expose le registre Prometheus du processus (histogrammes des étapes, latences HTTP, dispatch, writer).
+    Ne fait rien si l'interrupteur est coupé ; le port vient de INSTRUMENTATION_PORT sinon.
+    """
+    if not _enabled:
+        return False
+    port = port or int(os.getenv("INSTRUMENTATION_PORT", DEFAULT_METRICS_PORT))
+    try:
+        start_http_server(port)
+    except OSError as e:
+        logger.error("Port %s indisponible pour les métriques du chemin critique : %s", port, e)
+        return False
+    logger.info("Métriques du chemin critique exposées sur le port %s", port)
+    return True
+
+# -----------------------------
+# COÛT D'UN SPAN (FACULTATIF)
+# -----------------------------
+
+def benchmark_span_overhead(iterations: int = 1_000_000) -> dict:
+    """Coût moyen d'un span par rapport à une boucle vide, interrupteur coupé puis activé."""
+    previous = _enabled
+    results = {}
+
+    @timed("decode")
+    def decorated():
+        return None
+
+    def undecorated():
+        return None
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        pass
+    empty = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(iterations):
+        undecorated()
+    plain_call = time.perf_counter() - start
+
+    for label, state in (("off", False), ("on", True)):
+        set_enabled(state)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            with span("decode"):
+                pass
+        results[f"span_{label}_ns"] = (time.perf_counter() - start - empty) / iterations * 1e9
+        start = time.perf_counter()
+        for _ in range(iterations):
+            decorated()
+        results[f"timed_{label}_ns"] = (time.perf_counter() - start - plain_call) / iterations * 1e9
+    set_enabled(previous)
+    return results
+
+if __name__ == "__main__":
+    r = benchmark_span_overhead(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
+    print(f"Span : coupé {r['span_off_ns']:.0f} ns | activé {r['span_on_ns']:.0f} ns -- "
+          f"décorateur : coupé {r['timed_off_ns']:.0f} ns | activé {r['timed_on_ns']:.0f} ns")
@@ -0,0 +1,277 @@
+import time
+import random
+import bisect
+import requests
+import threading
+from collections import defaultdict
+from concurrent.futures import Executor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from helpers import log_info, log_warning, log_error, exchange_base_url, get_available_api_key, record_api_response
+from frame_decoder import DepthRecord
+from http_client import get_http_client
+from rate_limiter import request_weight
+
+# -----------------------------
+# CARNET D'ORDRES LOCAL (SNAPSHOT REST + DIFFS @depth)
+# -----------------------------
+
+REST_BASE_URL = exchange_base_url()  # BINANCE_BASE_URL pour viser l'échange simulé
+SNAPSHOT_DEPTH_LIMIT = 1000
+RESYNC_BACKOFF_SECONDS = 1.0  # Attente après un snapshot en échec, doublée à chaque nouvel échec
+RESYNC_BACKOFF_MAX_SECONDS = 60.0
+MAX_BUFFERED_DIFFS = 1000  # Diffs gardés par symbole en attente de snapshot (les plus anciens sont écartés)
+
+class LocalOrderBook:
+    """
+    Carnet complet d'un symbole maintenu à partir d'un snapshot /api/v3/depth et des diffs @depth.
+
+    Les prix sont gardés dans des listes triées (bisect) : bids stockés en prix négatifs pour que
+    le meilleur niveau soit toujours en tête, asks en prix croissants.
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.last_update_id = 0
+        self.synced = False
+        self._bid_keys: List[float] = []
+        self._bid_quantities: List[float] = []
+        self._ask_keys: List[float] = []
+        self._ask_quantities: List[float] = []
+
+    @staticmethod
+    def _apply_levels(keys: List[float], quantities: List[float], levels: Sequence[Sequence], sign: float) -> None:
+        for price, quantity in levels:
+            key, quantity = sign * float(price), float(quantity)
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                if quantity == 0:
+                    del keys[i], quantities[i]
+                else:
+                    quantities[i] = quantity
+            elif quantity != 0:
+                keys.insert(i, key)
+                quantities.insert(i, quantity)
+
+    def load_snapshot(self, snapshot: Dict) -> None:
+        """Remplace le carnet par un snapshot REST {lastUpdateId, bids, asks}."""
+        self._bid_keys, self._bid_quantities = [], []
+        self._ask_keys, self._ask_quantities = [], []
+        self._apply_levels(self._bid_keys, self._bid_quantities, snapshot["bids"], -1.0)
+        self._apply_levels(self._ask_keys, self._ask_quantities, snapshot["asks"], 1.0)
+        self.last_update_id = snapshot["lastUpdateId"]
+
+    def apply_diff(self, record: DepthRecord) -> bool:
+        """
+        Applique un diff @depth selon le séquencement lastUpdateId de Binance.
+
+        :return: False si un trou de séquence est détecté (le carnet doit être resynchronisé).
+        """
+        if record.last_update_id <= self.last_update_id:
+            return True  # Diff déjà couvert par le snapshot ou par un diff précédent
+        if record.first_update_id > self.last_update_id + 1:
+            return False
+        self._apply_levels(self._bid_keys, self._bid_quantities, record.bids, -1.0)
+        self._apply_levels(self._ask_keys, self._ask_quantities, record.asks, 1.0)
+        self.last_update_id = record.last_update_id
+        return True
+
+    def top(self, levels: int = 5) -> Tuple[List[List[float]], List[List[float]]]:
+        """Retourne les meilleurs niveaux (bids, asks) au format [[prix, quantité], ...]."""
+        bids = [[-key, quantity] for key, quantity in zip(self._bid_keys[:levels], self._bid_quantities[:levels])]
+        asks = [[key, quantity] for key, quantity in zip(self._ask_keys[:levels], self._ask_quantities[:levels])]
+        return bids, asks
+
+    def best_bid(self) -> Optional[float]:
+        return -self._bid_keys[0] if self._bid_keys else None
+
+    def best_ask(self) -> Optional[float]:
+        return self._ask_keys[0] if self._ask_keys else None
+
+def fetch_depth_snapshot(symbol: str, limit: int = SNAPSHOT_DEPTH_LIMIT) -> Optional[Dict]:
+    """
+    Récupère un snapshot de profondeur via l'API REST Binance, par le client HTTP partagé.
+
+    Le poids de la requête est débité sur le limiteur partagé des clés API (helpers) et la réponse
+    le resynchronise ; sans budget disponible, aucune requête n'est envoyée et None est retourné.
+    """
+    params = {"symbol": symbol, "limit": limit}
+    api_key = get_available_api_key(request_weight("/api/v3/depth", params))
+    if api_key is None:
+        return None
+    try:
+        response = get_http_client().get(f"{REST_BASE_URL}/api/v3/depth", params=params,
+                                         headers={"X-MBX-APIKEY": api_key}, endpoint="/api/v3/depth")
+        record_api_response(api_key, response)
+        response.raise_for_status()
+        return response.json()
+    except requests.RequestException as e:
+        log_error(f"Erreur lors de la récupération du snapshot de {symbol} : {e}")
+        return None
+
+class LocalOrderBookManager:
+    """
+    Maintient les carnets locaux de plusieurs symboles et les resynchronise automatiquement.
+
+    Les diffs reçus pendant une resynchronisation sont mis en tampon puis rejoués sur le snapshot.
+    Sans executor, le snapshot est récupéré de manière synchrone (rejeu déterministe) ; avec un
+    executor, la récupération se fait en arrière-plan sans bloquer le flux WebSocket, et on_update
+    est appelé une fois le carnet resynchronisé. Après un snapshot en échec, le symbole attend un
+    délai croissant (backoff exponentiel) avant une nouvelle requête REST.
+    """
+
+    def __init__(self, snapshot_fetcher: Callable[[str, int], Optional[Dict]] = fetch_depth_snapshot,
+                 store=None, publish_levels: int = 5, depth_limit: int = SNAPSHOT_DEPTH_LIMIT,
+                 executor: Optional[Executor] = None, on_update: Optional[Callable[[str], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.snapshot_fetcher = snapshot_fetcher
+        self.store = store  # OrderBookStore optionnel, alimenté avec les meilleurs niveaux
+        self.publish_levels = publish_levels
+        self.depth_limit = depth_limit
+        self.executor = executor
+        self.on_update = on_update
+        self.clock = clock
+        self.books: Dict[str, LocalOrderBook] = {}
+        self.resync_count = 0
+        self._buffers: Dict[str, List[DepthRecord]] = defaultdict(list)
+        self._resyncing = set()
+        self._failures: Dict[str, int] = {}  # Snapshots consécutifs en échec par symbole
+        self._retry_at: Dict[str, float] = {}
+        self._lock = threading.RLock()  # Le rappel de l'executor peut s'exécuter dans le thread appelant
+
+    def _publish(self, book: LocalOrderBook) -> None:
+        if self.store is not None:
+            bids, asks = book.top(self.publish_levels)
+            self.store.update(book.symbol, bids, asks)
+
+    def _request_resync(self, symbol: str) -> None:
+        if symbol in self._resyncing or self.clock() < self._retry_at.get(symbol, 0.0):
+            return
+        self._resyncing.add(symbol)
+        self.resync_count += 1
+        if self.executor is None:
+            self._complete_resync(symbol, self.snapshot_fetcher(symbol, self.depth_limit), locked=True)
+        else:
+            future = self.executor.submit(self.snapshot_fetcher, symbol, self.depth_limit)
+            future.add_done_callback(lambda done: self._on_snapshot_fetched(symbol, done))
+
+    def _on_snapshot_fetched(self, symbol: str, done) -> None:
+        """Rappel de l'executor : un échec de récupération ne doit pas lever dans le rappel."""
+        try:
+            snapshot = done.result()
+        except Exception as e:
+            log_error(f"Échec de la récupération du snapshot de {symbol} : {e}")
+            snapshot = None
+        if self._complete_resync(symbol, snapshot) and self.on_update is not None:
+            self.on_update(symbol)  # Le flux n'a pas vu ce carnet redevenir valide : les boucles sont réévaluées
+
+    def _complete_resync(self, symbol: str, snapshot: Optional[Dict], locked: bool = False) -> bool:
+        """Charge le snapshot et rejoue les diffs en tampon ; True si le carnet est synchronisé."""
+        if not locked:
+            with self._lock:
+                return self._complete_resync(symbol, snapshot, locked=True)
+        self._resyncing.discard(symbol)
+        if snapshot is None:
+            # Nouvelle tentative au premier diff après le délai, pour ne pas épuiser le poids REST
+            failures = self._failures[symbol] = self._failures.get(symbol, 0) + 1
+            delay = min(RESYNC_BACKOFF_SECONDS * 2 ** (failures - 1), RESYNC_BACKOFF_MAX_SECONDS)
+            self._retry_at[symbol] = self.clock() + delay
+            log_warning(f"Snapshot de {symbol} indisponible ({failures} échecs), nouvel essai dans {delay:.1f} s")
+            return False
+        self._failures.pop(symbol, None)
+        self._retry_at.pop(symbol, None)
+        book = self.books[symbol]
+        book.load_snapshot(snapshot)
+        pending = self._buffers.pop(symbol, [])
+        for position, record in enumerate(pending):
+            if not book.apply_diff(record):
+                # Snapshot plus ancien que les diffs en tampon : on garde les diffs restants et on recommence
+                log_warning(f"Snapshot de {symbol} trop ancien ({book.last_update_id}), nouvelle resynchronisation")
+                self._buffers[symbol] = pending[position:]
+                return False
+        book.synced = True
+        log_info(f"Carnet local de {symbol} synchronisé à l'update {book.last_update_id}")
+        self._publish(book)
+        return True
+
+    def on_diff(self, record: DepthRecord) -> bool:
+        """
+        Traite un diff @depth.
+
+        :return: True si le carnet du symbole est synchronisé et a été mis à jour.
+        """
+        with self._lock:
+            book = self.books.get(record.symbol)
+            if book is None:
+                book = self.books[record.symbol] = LocalOrderBook(record.symbol)
+            if not book.synced:
+                buffer = self._buffers[record.symbol]
+                buffer.append(record)
+                if len(buffer) > MAX_BUFFERED_DIFFS:
+                    del buffer[:len(buffer) - MAX_BUFFERED_DIFFS]
+                self._request_resync(record.symbol)
+                return book.synced
+            if not book.apply_diff(record):
+                log_warning(f"Trou de séquence sur {record.symbol} : update {record.first_update_id} "
+                            f"attendu {book.last_update_id + 1}, resynchronisation")
+                book.synced = False
+                self._buffers[record.symbol] = [record]
+                self._request_resync(record.symbol)
+                return book.synced
+            self._publish(book)
+            return True
+
+# -----------------------------
+# REJEU D'UN SCÉNARIO AVEC TROUS INJECTÉS (FACULTATIF)
+# -----------------------------
+
+def _reference_book_levels(book: Dict[float, float], descending: bool) -> List[List[str]]:
+    return [[repr(price), repr(quantity)] for price, quantity in sorted(book.items(), reverse=descending)]
+
+def replay_fixture_with_gaps(diff_count: int = 2000, gap_every: int = 400, seed: int = 13) -> Dict[str, int]:
+    """
+    Génère un flux de diffs et des snapshots cohérents, supprime un diff tous les gap_every pour
+    simuler des pertes, et vérifie que le carnet local retrouve exactement l'état de référence.
+    """
+    rng = random.Random(seed)
+    symbol = "BTCUSDT"
+    truth_bids = {round(100 - 0.01 * i, 2): 1.0 for i in range(1, 50)}
+    truth_asks = {round(100 + 0.01 * i, 2): 1.0 for i in range(1, 50)}
+    history = []  # (update_id, snapshot de vérité après cet update)
+    diffs = []
+    update_id = 1000
+    for n in range(diff_count):
+        bids = [[repr(round(100 - 0.01 * rng.randint(1, 60), 2)), repr(rng.choice([0.0, rng.uniform(0.1, 5)]))] for _ in range(3)]
+        asks = [[repr(round(100 + 0.01 * rng.randint(1, 60), 2)), repr(rng.choice([0.0, rng.uniform(0.1, 5)]))] for _ in range(3)]
+        first_id, update_id = update_id + 1, update_id + rng.randint(1, 3)
+        for side, levels in ((truth_bids, bids), (truth_asks, asks)):
+            for price, quantity in levels:
+                if float(quantity) == 0:
+                    side.pop(float(price), None)
+                else:
+                    side[float(price)] = float(quantity)
+        history.append((update_id, {"lastUpdateId": update_id,
+                                    "bids": _reference_book_levels(truth_bids, True),
+                                    "asks": _reference_book_levels(truth_asks, False)}))
+        if n % gap_every != gap_every - 1:  # Diff perdu : trou de séquence injecté
+            diffs.append(DepthRecord(symbol, first_id, update_id, bids, asks, True))
+
+    delivered = {"count": 0}
+    def snapshot_fetcher(requested_symbol, limit):
+        # Le snapshot reflète l'état au dernier diff diffusé (le serveur est légèrement en avance)
+        position = min(delivered["count"] + 1, len(history) - 1)
+        return history[position][1]
+
+    manager = LocalOrderBookManager(snapshot_fetcher)
+    for record in diffs:
+        delivered["count"] = next(i for i, (uid, _) in enumerate(history) if uid == record.last_update_id)
+        manager.on_diff(record)
+
+    book = manager.books[symbol]
+    expected = next(snapshot for uid, snapshot in history if uid == book.last_update_id)
+    bids, asks = book.top(len(expected["bids"]) + len(expected["asks"]))
+    if bids != [[float(p), float(q)] for p, q in expected["bids"]] or asks != [[float(p), float(q)] for p, q in expected["asks"]]:
+        raise AssertionError("Le carnet local diverge de la référence")
+    return {"diffs": len(diffs), "resyncs": manager.resync_count, "last_update_id": book.last_update_id}
+
+if __name__ == "__main__":
+    print(replay_fixture_with_gaps())
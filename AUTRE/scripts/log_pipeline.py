@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+try:
+    from prometheus_client import Counter
+except ImportError:  # Le compteur Prometheus est facultatif : dropped_records() reste disponible
+    Counter = None
+
+# -----------------------------
+# JOURNALISATION NON BLOQUANTE PAR FILE (QUEUEHANDLER / QUEUELISTENER)
+# -----------------------------
+
+ROOT_LOGGER = "smooth_trade"
+DEFAULT_QUEUE_SIZE = 10000
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+log_records_dropped = Counter("log_records_dropped_total", "Enregistrements de log abandonnés (file pleine)") if Counter else None
+
+class JsonFormatter(logging.Formatter):
+    """Un objet JSON par ligne : horodatage, niveau, logger, message, détails et exception éventuels."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="microseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        details = getattr(record, "details", None)
+        if details:
+            payload["details"] = details
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exception"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Format texte historique de helpers, suivi de « - Détails : ... » quand des détails sont fournis."""
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        details = getattr(record, "details", None)
+        return f"{text} - Détails : {details}" if details else text
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler qui n'attend jamais : si la file est pleine, l'enregistrement est abandonné et compté.
+
+    Contrairement au QueueHandler standard, le message n'est pas mis en forme dans le thread appelant :
+    le %-formatage (getMessage) et la sérialisation JSON ont lieu dans le thread du QueueListener.
+    Les arguments doivent donc être des valeurs qui ne seront plus modifiées après l'appel.
+    """
+
+    def __init__(self, log_queue: "queue.Queue"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            # La pile doit être capturée tant que l'exception est vivante
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            if log_records_dropped is not None:
+                log_records_dropped.inc()
+
+class DrainingQueueListener(QueueListener):
+    """QueueListener dont l'arrêt attend une place dans la file pleine au lieu d'échouer."""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+class PipelineLogger(logging.Logger):
+    """
+    Logger de la hiérarchie smooth_trade : pas de recherche de l'appelant (remontée de pile),
+    inutile au format JSON et coûteuse à chaque appel dans la boucle de trading.
+    """
+
+    def findCaller(self, stack_info: bool = False, stacklevel: int = 1):
+        return "(unknown file)", 0, "(unknown function)", None
+
+_pipeline_lock = threading.Lock()
+_queue_handler: Optional[DroppingQueueHandler] = None
+_listener: Optional[DrainingQueueListener] = None
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """Analyse LOG_LEVELS="arbitrage_execution=WARNING,order_dispatch=DEBUG" en {module: niveau}."""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        if level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def configure_log_levels(levels: Dict[str, str]) -> None:
+    """Applique des niveaux par module (sans préfixe smooth_trade), par exemple depuis config.yaml."""
+    for name, level in (levels or {}).items():
+        get_logger(name).setLevel(str(level).upper())
+
+def setup_log_pipeline(level: Optional[str] = None, log_format: Optional[str] = None,
+                       queue_size: Optional[int] = None, stream=None) -> DroppingQueueHandler:
+    """
+    Installe (une seule fois) la file de journalisation sur le logger racine smooth_trade.
+
+    :param level: Niveau par défaut (variable LOG_LEVEL, INFO sinon).
+    :param log_format: "json" ou "text" (variable LOG_FORMAT, json sinon).
+    :param queue_size: Taille de la file (variable LOG_QUEUE_SIZE) ; au-delà, les enregistrements sont abandonnés.
+    :param stream: Flux de sortie du QueueListener (stderr par défaut).
+    :return: Le QueueHandler, dont l'attribut dropped compte les abandons.
+    """
+    global _queue_handler, _listener
+    with _pipeline_lock:
+        if _queue_handler is not None:
+            return _queue_handler
+        log_queue: "queue.Queue" = queue.Queue(int(queue_size or os.getenv("LOG_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)))
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JsonFormatter() if (log_format or os.getenv("LOG_FORMAT", "json")) == "json" else TextFormatter())
+        _queue_handler = DroppingQueueHandler(log_queue)
+        _listener = DrainingQueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_log_pipeline)
+
+        root = _pipeline_logger_locked(ROOT_LOGGER)
+        root.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+        root.addHandler(_queue_handler)
+        root.propagate = False
+    configure_log_levels(parse_levels(os.getenv("LOG_LEVELS", "")))
+    return _queue_handler
+
+def shutdown_log_pipeline() -> None:
+    """Vide la file puis arrête le thread d'écriture (appelé automatiquement à la sortie)."""
+    global _queue_handler, _listener
+    with _pipeline_lock:
+        if _listener is not None:
+            _listener.stop()
+            logging.getLogger(ROOT_LOGGER).removeHandler(_queue_handler)
+        _queue_handler, _listener = None, None
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Logger d'un module, branché sur la file partagée.
+
+    Le niveau se règle sans modifier le code : LOG_LEVELS="arbitrage_execution=WARNING" coupe les
+    logs INFO par trade de ce seul module. Utiliser le %-formatage paresseux :
+    logger.info("Trade exécuté : %s", symbol) ne construit la chaîne que si le niveau est actif.
+    """
+    setup_log_pipeline()
+    return _pipeline_logger(f"{ROOT_LOGGER}.{name}")
+
+def _pipeline_logger(name: str) -> logging.Logger:
+    with _pipeline_lock:
+        return _pipeline_logger_locked(name)
+
+def _pipeline_logger_locked(name: str) -> logging.Logger:
+    manager = logging.Logger.manager
+    existing = manager.loggerDict.get(name)
+    if isinstance(existing, logging.Logger):
+        return existing
+    previous = manager.loggerClass
+    manager.setLoggerClass(PipelineLogger)
+    try:
+        return logging.getLogger(name)
+    finally:
+        manager.loggerClass = previous
+
+def dropped_records() -> int:
+    """Nombre d'enregistrements abandonnés depuis le démarrage du processus."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
@@ -0,0 +1,208 @@
+import time
+import random
+import numpy as np
+from typing import Dict, List, Sequence, Tuple
+from arbitrage_loops import calculate_profit, pair_symbol
+
+# -----------------------------
+# MOTEUR VECTORISÉ DE VALORISATION DES BOUCLES
+# -----------------------------
+
+# Sens de chaque jambe d'une boucle triangulaire, aligné sur calculate_profit :
+# 1 = achat au prix ask (division), 0 = vente au prix bid (multiplication)
+LOOP_DIRECTIONS = (1, 0, 0)
+
+class LoopPricingEngine:
+    """
+    Valorise toutes les boucles d'arbitrage en une seule expression NumPy.
+
+    La topologie est figée dans des tableaux d'entiers (jambe i -> colonne du symbole, plus un sens
+    par jambe) et les meilleurs bid/ask sont stockés dans des tableaux float64 contigus indexés par
+    colonne. calculate_profit reste l'implémentation scalaire de référence.
+    """
+
+    def __init__(self, arbitrage_loops: Sequence[Tuple[Dict, Dict, Dict]]):
+        self.loops = list(arbitrage_loops)
+        self.symbol_columns: Dict[str, int] = {}
+        for loop in self.loops:
+            for pair in loop:
+                self.symbol_columns.setdefault(pair_symbol(pair), len(self.symbol_columns))
+
+        self.legs = np.empty((len(self.loops), 3), dtype=np.intp)
+        for loop_id, loop in enumerate(self.loops):
+            self.legs[loop_id] = [self.symbol_columns[pair_symbol(pair)] for pair in loop]
+        self.directions = np.tile(np.array(LOOP_DIRECTIONS, dtype=bool), (len(self.loops), 1))
+
+        self.bids = np.full(len(self.symbol_columns), np.nan, dtype=np.float64)
+        self.asks = np.full(len(self.symbol_columns), np.nan, dtype=np.float64)
+        for loop in self.loops:
+            for pair in loop:
+                column = self.symbol_columns[pair_symbol(pair)]
+                self.bids[column] = pair.get("bid", pair["price"])
+                self.asks[column] = pair.get("ask", pair["price"])
+
+    def update_price(self, symbol: str, bid: float, ask: float) -> None:
+        """Met à jour le meilleur bid/ask d'un symbole suivi."""
+        column = self.symbol_columns.get(symbol)
+        if column is not None:
+            self.bids[column] = bid
+            self.asks[column] = ask
+
+    def compute_profits(self, trading_fee: float = 0.0) -> np.ndarray:
+        """Calcule le rendement net de frais de toutes les boucles (même formule que calculate_profit)."""
+        factors = np.where(self.directions, 1.0 / self.asks[self.legs], self.bids[self.legs])
+        return factors[:, 0] * factors[:, 1] * factors[:, 2] * (1 - trading_fee) ** 3 - 1
+
+    def top(self, k: int = 10, trading_fee: float = 0.0) -> List[Tuple[Tuple[Dict, Dict, Dict], float]]:
+        """Retourne les k boucles les plus rentables sous forme de (boucle, profit)."""
+        profits = self.compute_profits(trading_fee)
+        k = min(k, len(profits))
+        if k == 0:
+            return []
+        best = np.argpartition(-profits, k - 1)[:k]
+        best = best[np.argsort(-profits[best], kind="stable")]
+        return [(self.loops[loop_id], float(profits[loop_id])) for loop_id in best]
+
+# -----------------------------
+# TAILLE EXÉCUTABLE SELON LA PROFONDEUR DU CARNET
+# -----------------------------
+
+class DepthLoopSizer:
+    """
+    Calcule la taille d'une boucle qui maximise son profit en parcourant tous les niveaux
+    de profondeur (@depth5) de chaque jambe, et le profit attendu à cette taille (prix moyens pondérés).
+
+    Chaque jambe est une fonction linéaire par morceaux (montant entrant -> montant sortant) définie
+    par les cumuls du carnet ; la boucle est leur composition, évaluée sur ses points de rupture.
+    Les tableaux sont préalloués : aucun dictionnaire n'est créé par niveau.
+    """
+
+    def __init__(self, levels: int = 5):
+        self.levels = levels
+        self.books = np.zeros((3, levels, 2), dtype=np.float64)  # (jambe, niveau, [prix, quantité])
+        self.directions = np.array(LOOP_DIRECTIONS, dtype=bool)
+        self.level_counts = [0, 0, 0]
+        self._in_cum = np.zeros((3, levels + 1), dtype=np.float64)
+        self._out_cum = np.zeros((3, levels + 1), dtype=np.float64)
+        self._level_values = np.zeros(levels, dtype=np.float64)
+
+    def load_leg(self, leg: int, levels: Sequence[Sequence], is_buy: bool) -> None:
+        """
+        Charge les niveaux d'une jambe : les asks pour un achat, les bids pour une vente.
+
+        :param levels: Niveaux [prix, quantité] au format Binance (chaînes ou nombres) ou vue d'OrderBookStore.
+        """
+        count = min(len(levels), self.levels)
+        if count:
+            self.books[leg, :count] = levels[:count]
+        self.level_counts[leg] = count
+        self.directions[leg] = is_buy
+
+    def load_order_books(self, order_books: Sequence[Tuple[Sequence, Sequence]], sides: Sequence[str]) -> None:
+        """Charge les trois jambes depuis leurs carnets (bids, asks) et les sens BUY/SELL de la boucle."""
+        for leg, ((bids, asks), side) in enumerate(zip(order_books, sides)):
+            is_buy = side == "BUY"
+            self.load_leg(leg, asks if is_buy else bids, is_buy)
+
+    def _build_leg(self, leg: int, trading_fee: float) -> Tuple[np.ndarray, np.ndarray]:
+        count = self.level_counts[leg]
+        prices, quantities = self.books[leg, :count, 0], self.books[leg, :count, 1]
+        in_cum, out_cum = self._in_cum[leg, :count + 1], self._out_cum[leg, :count + 1]
+        values = self._level_values[:count]
+        np.multiply(prices, quantities, out=values)
+        if self.directions[leg]:
+            # Achat : on dépense de la devise de cotation (prix × quantité) pour recevoir la base
+            np.cumsum(values, out=in_cum[1:])
+            np.cumsum(quantities, out=out_cum[1:])
+        else:
+            # Vente : on cède la base pour recevoir la devise de cotation
+            np.cumsum(quantities, out=in_cum[1:])
+            np.cumsum(values, out=out_cum[1:])
+        out_cum *= 1 - trading_fee
+        return in_cum, out_cum
+
+    def size(self, trading_fee: float = 0.0, min_return: float = 0.0) -> Tuple[float, float]:
+        """
+        Calcule la taille notionnelle (en devise d'entrée de la première jambe) qui maximise le profit :
+        les segments entre points de rupture sont ajoutés tant que leur rendement marginal dépasse
+        min_return. Au-delà, chaque unité supplémentaire coûte plus qu'elle ne rapporte ; la taille
+        où le rendement moyen retombe à min_return serait, avec min_return=0, le point mort.
+
+        :return: (taille notionnelle, profit attendu à cette taille), (0.0, 0.0) si la boucle n'est pas rentable.
+        """
+        if 0 in self.level_counts:
+            return 0.0, 0.0
+        legs = [self._build_leg(leg, trading_fee) for leg in range(3)]
+        (in0, out0), (in1, out1), (in2, out2) = legs
+
+        # Points de rupture de chaque jambe ramenés dans l'espace du montant initial
+        leg1_breaks = np.interp(in1, out0, in0)
+        leg2_breaks = np.interp(np.interp(in2, out1, in1), out0, in0)
+        capacity = min(in0[-1], leg1_breaks[-1], leg2_breaks[-1])
+        grid = np.concatenate((in0, leg1_breaks, leg2_breaks))
+        grid = np.unique(np.append(grid[grid < capacity], capacity))
+        if len(grid) < 2:
+            return 0.0, 0.0
+
+        # Montant final linéaire entre deux points de rupture : rendement marginal constant par segment
+        returned = np.interp(np.interp(np.interp(grid, in0, out0), in1, out1), in2, out2)
+        marginal = np.diff(returned) / np.diff(grid)
+        losing = np.flatnonzero(marginal <= 1 + min_return)
+        end = len(marginal) if len(losing) == 0 else losing[0]
+        if end == 0:
+            return 0.0, 0.0
+        notional = float(grid[end])
+        return notional, float(returned[end] - notional)
+
+# -----------------------------
+# VÉRIFICATION ET BENCHMARK (FACULTATIF)
+# -----------------------------
+
+def check_against_reference(arbitrage_loops, trading_fee: float = 0.001, tolerance: float = 1e-12) -> float:
+    """
+    Vérifie que le moteur vectorisé et calculate_profit donnent les mêmes rendements.
+
+    :return: Écart absolu maximal observé.
+    """
+    engine = LoopPricingEngine(arbitrage_loops)
+    vectorized = engine.compute_profits(trading_fee)
+    reference = np.array([calculate_profit(loop, trading_fee) for loop in arbitrage_loops], dtype=np.float64)
+    max_error = float(np.max(np.abs(vectorized - reference))) if len(reference) else 0.0
+    if max_error > tolerance:
+        raise AssertionError(f"Écart {max_error} supérieur à la tolérance {tolerance}")
+    return max_error
+
+if __name__ == "__main__":
+    from synthetic_market import generate_synthetic_market
+    from arbitrage_loops import find_arbitrage_loops
+
+    rng = random.Random(7)
+    pairs = generate_synthetic_market(2000)
+    for pair in pairs:
+        pair["bid"] = pair["price"] * rng.uniform(0.995, 1.0)
+        pair["ask"] = pair["price"] * rng.uniform(1.0, 1.005)
+    loops = find_arbitrage_loops(pairs)
+
+    print(f"Écart maximal moteur vectorisé / calculate_profit : {check_against_reference(loops):.3e}")
+
+    engine = LoopPricingEngine(loops)
+    start = time.perf_counter()
+    engine.compute_profits(0.001)
+    vectorized_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    [calculate_profit(loop, 0.001) for loop in loops]
+    scalar_seconds = time.perf_counter() - start
+    print(f"{len(loops)} boucles | vectorisé : {vectorized_seconds * 1e3:.3f} ms | scalaire : {scalar_seconds * 1e3:.3f} ms")
+
+    sizer = DepthLoopSizer()
+    books = [
+        ([[f"{99 - i}", "0.5"] for i in range(5)], [[f"{100 + i}", "0.5"] for i in range(5)]),
+        ([[f"{0.0102 - i * 1e-4}", "40"] for i in range(5)], [[f"{0.0101 + i * 1e-4}", "40"] for i in range(5)]),
+        ([[f"{9950 - i * 20}", "1"] for i in range(5)], [[f"{9900 + i}", "1"] for i in range(5)]),
+    ]
+    start = time.perf_counter()
+    for _ in range(1000):
+        sizer.load_order_books(books, ("BUY", "SELL", "SELL"))
+        notional, expected_profit = sizer.size(trading_fee=0.0005)
+    sizing_seconds = (time.perf_counter() - start) / 1000
+    print(f"Taille exécutable : {notional:.4f} | profit attendu : {expected_profit:.6f} | {sizing_seconds * 1e6:.1f} µs par évaluation")
@@ -0,0 +1,262 @@
+import os
+import sys
+import gzip
+import json
+import time
+import struct
+import random
+import tempfile
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+from helpers import log_info, log_warning
+from arbitrage_loops import LoopRepricer, find_arbitrage_loops
+from frame_decoder import DepthRecord, get_decoder
+from local_order_book import LocalOrderBook
+from order_book_store import OrderBookStore
+
+# -----------------------------
+# ENREGISTREMENT DES TRAMES BRUTES EN SEGMENTS COMPRESSÉS
+# -----------------------------
+
+RECORD_HEADER = struct.Struct("<QI")  # Horodatage de réception (ns depuis l'époque), taille de la trame
+SEGMENT_BYTES = 256 * 1024 * 1024  # Rotation après 256 Mo de trames (non compressées)
+SEGMENT_SECONDS = 3600  # Rotation au moins toutes les heures
+SEGMENT_SUFFIX = ".seg.gz"
+
+class MarketRecorder:
+    """
+    Écrit les trames WebSocket brutes, telles que reçues, dans des segments gzip en ajout seul.
+    Chaque enregistrement est [horodatage ns (8 octets) | taille (4 octets) | trame], ce qui permet
+    de relire un segment interrompu jusqu'au dernier enregistrement complet.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = SEGMENT_BYTES, segment_seconds: float = SEGMENT_SECONDS,
+                 compresslevel: int = 1):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.compresslevel = compresslevel  # Niveau 1 : la compression ne doit pas ralentir le flux
+        self.frames_recorded = 0
+        self._file = None
+        self._segment_path: Optional[str] = None
+        self._segment_written = 0
+        self._segment_opened_at = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _open_segment(self, received_ns: int) -> None:
+        self._close_segment()
+        self._segment_path = os.path.join(self.directory, f"frames-{received_ns:020d}{SEGMENT_SUFFIX}")
+        self._file = gzip.open(self._segment_path, "ab", compresslevel=self.compresslevel)
+        self._segment_written = 0
+        self._segment_opened_at = time.monotonic()
+        log_info(f"Nouveau segment d'enregistrement : {self._segment_path}")
+
+    def _close_segment(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def record(self, message: Union[str, bytes], received_ns: Optional[int] = None) -> None:
+        """Ajoute une trame au segment courant (rotation par taille ou par durée)."""
+        if received_ns is None:
+            received_ns = time.time_ns()
+        payload = message.encode() if isinstance(message, str) else message
+        with self._lock:
+            if (self._file is None or self._segment_written >= self.segment_bytes
+                    or time.monotonic() - self._segment_opened_at >= self.segment_seconds):
+                self._open_segment(received_ns)
+            self._file.write(RECORD_HEADER.pack(received_ns, len(payload)))
+            self._file.write(payload)
+            self._segment_written += RECORD_HEADER.size + len(payload)
+            self.frames_recorded += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_segment()
+
+def segment_paths(directory: str) -> List[str]:
+    """Segments d'un répertoire dans l'ordre chronologique (le nom porte l'horodatage d'ouverture)."""
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX))
+
+def iter_segment(path: str) -> Iterator[Tuple[int, bytes]]:
+    """Relit un segment ; un enregistrement final tronqué (arrêt brutal) est ignoré."""
+    try:
+        with gzip.open(path, "rb") as segment:
+            while True:
+                header = segment.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return
+                received_ns, size = RECORD_HEADER.unpack(header)
+                payload = segment.read(size)
+                if len(payload) < size:
+                    return
+                yield received_ns, payload
+    except (EOFError, gzip.BadGzipFile) as e:
+        log_warning(f"Segment {path} interrompu : {e}")
+
+def iter_recording(directory: str) -> Iterator[Tuple[int, bytes]]:
+    for path in segment_paths(directory):
+        yield from iter_segment(path)
+
+# -----------------------------
+# REJEU DANS LE MOTEUR D'ARBITRAGE
+# -----------------------------
+
+REPLAY_STAGES = ("decode", "book", "reprice", "evaluate")
+
+class MarketReplayer:
+    """
+    Rejoue un enregistrement dans le moteur : décodage, carnets (OrderBookStore / carnets locaux pour
+    les diffs), réévaluation incrémentale des boucles (LoopRepricer) puis détection des opportunités.
+
+    speed=None rejoue aussi vite que possible ; speed=1.0 respecte le rythme d'origine, 10.0 accélère 10x.
+    on_opportunity(boucle, profit net, horodatage ns) est appelé à chaque boucle qui devient rentable.
+    """
+
+    def __init__(self, pairs: List[Dict], trading_fee: float = 0.001, min_profit: float = 0.001,
+                 speed: Optional[float] = None, decoder=None,
+                 on_opportunity: Optional[Callable[[list, float, int], None]] = None):
+        self.trading_fee = trading_fee
+        self.min_profit = min_profit
+        self.speed = speed
+        self.decoder = decoder or get_decoder()
+        self.on_opportunity = on_opportunity
+        self.repricer = LoopRepricer(find_arbitrage_loops(pairs), trading_fee=trading_fee)  # Profits nets des frais
+        self.store = OrderBookStore(capacity=max(16, len(pairs)))
+        self.local_books: Dict[str, LocalOrderBook] = {}
+        self.stage_ns = dict.fromkeys(REPLAY_STAGES, 0)
+        self.events = 0
+        self.opportunities = 0
+        self.best_opportunities: Dict[int, float] = {}
+        self._profitable = set()
+
+    def _apply_diff(self, record: DepthRecord) -> None:
+        book = self.local_books.get(record.symbol)
+        if book is None:
+            book = self.local_books[record.symbol] = LocalOrderBook(record.symbol)
+            book.last_update_id = record.first_update_id - 1  # Pas de snapshot : le premier diff sert de base
+        if not book.apply_diff(record):
+            book.last_update_id = record.first_update_id - 1  # Trou dans l'enregistrement : on poursuit
+            book.apply_diff(record)
+        bids, asks = book.top(self.store.levels)
+        self.store.update(record.symbol, bids, asks)
+
+    def process(self, message: bytes, received_ns: int) -> None:
+        t0 = time.perf_counter_ns()
+        record = self.decoder.decode(message)
+        t1 = time.perf_counter_ns()
+        self.stage_ns["decode"] += t1 - t0
+        self.events += 1
+        if not isinstance(record, DepthRecord) or not record.symbol:
+            return
+        if record.is_diff:
+            self._apply_diff(record)
+        else:
+            self.store.update(record.symbol, record.bids, record.asks)
+        t2 = time.perf_counter_ns()
+        self.stage_ns["book"] += t2 - t1
+
+        bid, ask = self.store.best_bid(record.symbol), self.store.best_ask(record.symbol)
+        loop_ids = self.repricer.update_price(record.symbol, bid, ask) if bid and ask else ()
+        t3 = time.perf_counter_ns()
+        self.stage_ns["reprice"] += t3 - t2
+
+        for loop_id in loop_ids:
+            net_profit = self.repricer.profits[loop_id]
+            if net_profit >= self.min_profit:
+                if loop_id not in self._profitable:  # Front montant : une opportunité par ouverture
+                    self._profitable.add(loop_id)
+                    self.opportunities += 1
+                    self.best_opportunities[loop_id] = max(net_profit, self.best_opportunities.get(loop_id, net_profit))
+                    if self.on_opportunity is not None:
+                        self.on_opportunity(self.repricer.loops[loop_id], net_profit, received_ns)
+            else:
+                self._profitable.discard(loop_id)
+        self.stage_ns["evaluate"] += time.perf_counter_ns() - t3
+
+    def replay(self, frames) -> Dict:
+        """Rejoue un itérable de (horodatage ns, trame) et retourne le rapport."""
+        start = time.perf_counter()
+        first_ns = None
+        for received_ns, message in frames:
+            if self.speed:
+                first_ns = first_ns or received_ns
+                delay = (received_ns - first_ns) / 1e9 / self.speed - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            self.process(message, received_ns)
+        return self.report(time.perf_counter() - start)
+
+    def report(self, elapsed_seconds: float) -> Dict:
+        stage_seconds = {stage: ns / 1e9 for stage, ns in self.stage_ns.items()}
+        top = sorted(self.best_opportunities.items(), key=lambda item: -item[1])[:5]
+        return {
+            "events": self.events,
+            "elapsed_seconds": elapsed_seconds,
+            "events_per_second": self.events / elapsed_seconds if elapsed_seconds else 0.0,
+            "stage_seconds": stage_seconds,
+            "opportunities": self.opportunities,
+            "top_loops": [([pair["symbol"] for pair in self.repricer.loops[loop_id]], profit) for loop_id, profit in top],
+        }
+
+def load_pairs(path: str) -> List[Dict]:
+    """Paires {symbol, base, quote, price} du marché enregistré (JSON, ex. extrait de /exchangeInfo)."""
+    with open(path, "r") as pairs_file:
+        return json.load(pairs_file)
+
+# -----------------------------
+# ENREGISTREMENT SYNTHÉTIQUE ET REJEU (FACULTATIF)
+# -----------------------------
+
+def record_synthetic_session(directory: str, symbol_count: int = 300, frame_count: int = 200000,
+                             seed: int = 21) -> List[Dict]:
+    """
+    Enregistre une séance synthétique (snapshots @depth5 et diffs @depth) à un rythme simulé de
+    1000 trames/s. Les prix restent proches de la parité pour que seuls quelques écarts franchissent
+    le seuil de profit, comme sur un marché réel. Retourne les paires du marché.
+    """
+    from synthetic_market import generate_synthetic_market
+    from mock_exchange import SimulatedBook
+
+    rng = random.Random(seed)
+    pairs = generate_synthetic_market(symbol_count, seed)
+    for pair in pairs:
+        pair["price"] = 1 + rng.gauss(0, 0.002)
+    books = [SimulatedBook(pair["symbol"], pair["price"], rng) for pair in pairs]
+
+    recorder = MarketRecorder(directory, segment_bytes=16 * 1024 * 1024)
+    received_ns = time.time_ns()
+    for book in books:
+        recorder.record(json.dumps({"stream": f"{book.symbol.lower()}@depth5", "data": book.snapshot(5)}), received_ns)
+    for i in range(frame_count):
+        book = books[rng.randrange(len(books))]
+        received_ns += 1_000_000
+        if i % 4:
+            frame = {"stream": f"{book.symbol.lower()}@depth", "data": book.mutate()}
+        else:
+            frame = {"stream": f"{book.symbol.lower()}@depth5", "data": book.snapshot(5)}
+        recorder.record(json.dumps(frame), received_ns)
+    recorder.close()
+    return pairs
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        # python market_recorder.py <répertoire> <paires.json> [vitesse] [min_profit]
+        replayer = MarketReplayer(load_pairs(sys.argv[2]), speed=float(sys.argv[3]) if len(sys.argv) > 3 else None,
+                                  min_profit=float(sys.argv[4]) if len(sys.argv) > 4 else 0.001)
+        results = replayer.replay(iter_recording(sys.argv[1]))
+    else:
+        with tempfile.TemporaryDirectory() as recording:
+            start = time.perf_counter()
+            market = record_synthetic_session(recording)
+            print(f"Enregistrement : {time.perf_counter() - start:.2f} s | "
+                  f"{sum(os.path.getsize(path) for path in segment_paths(recording)) / 1e6:.1f} Mo sur disque")
+            results = MarketReplayer(market).replay(iter_recording(recording))
+
+    print(f"{results['events']} trames en {results['elapsed_seconds']:.2f} s : {results['events_per_second']:.0f} trames/s")
+    for stage, seconds in results["stage_seconds"].items():
+        print(f"{stage:>9} : {seconds:.3f} s ({seconds / results['elapsed_seconds']:.0%})")
+    print(f"Opportunités détectées : {results['opportunities']}")
+    for symbols, profit in results["top_loops"]:
+        print(f"  {' -> '.join(symbols)} : {profit:.5f}")
@@ -0,0 +1,235 @@
+import re
+import sys
+import time
+import atexit
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from prometheus_client import CollectorRegistry, Counter, Gauge, generate_latest, CONTENT_TYPE_LATEST
+from http_client import get_http_client
+from log_pipeline import get_logger
+
+# -----------------------------
+# ENVOI GROUPÉ DES MÉTRIQUES VERS LE PUSHGATEWAY
+# -----------------------------
+
+DEFAULT_PUSH_INTERVAL = 10.0  # Secondes entre deux envois groupés
+MONITOR_FLUSH_CYCLES = 3  # Collectes des moniteurs (GPU, Digital Ocean) regroupées par envoi : 600 -> 40 POST sur 60 cycles
+_INVALID_NAME = re.compile(r"[^a-zA-Z0-9_:]")
+
+logger = get_logger("metrics_push")
+
+def metric_name(name: str) -> str:
+    """Nom Prometheus valide (caractères hors [a-zA-Z0-9_:] remplacés par _)."""
+    name = _INVALID_NAME.sub("_", name)
+    return f"_{name}" if name[:1].isdigit() else name
+
+class MetricBatcher:
+    """
+    Registre local de jauges et de compteurs, envoyé d'un bloc au Pushgateway.
+
+    set() et inc() ne font que mettre à jour le CollectorRegistry du processus ; flush() sérialise
+    tout le registre (generate_latest) et l'envoie en un seul POST, par la session HTTP partagée
+    (http_client). start() lance l'envoi périodique toutes les interval secondes ; un dernier
+    envoi a lieu à l'arrêt du processus.
+    """
+
+    def __init__(self, push_url: str, interval: float = DEFAULT_PUSH_INTERVAL, http_client=None):
+        self.push_url = push_url
+        self.interval = interval
+        self.registry = CollectorRegistry()
+        self.pushes = 0
+        self.failures = 0
+        self._http = http_client
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _metric(self, kind, name: str, labelnames: Tuple[str, ...]):
+        name = metric_name(name)
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = kind(name, name, labelnames, registry=self.registry)
+                    self._metrics[name] = metric
+        return metric
+
+    def set(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        """Met à jour une jauge (valeur non numérique ignorée)."""
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            logger.warning("Valeur non numérique ignorée pour %s : %r", name, value)
+            return
+        self._update(Gauge, name, labels).set(value)
+
+    def inc(self, name: str, amount: float = 1.0, labels: Optional[Dict[str, str]] = None) -> None:
+        """Incrémente un compteur (exposé sous le nom <name>_total)."""
+        self._update(Counter, name, labels).inc(amount)
+
+    def _update(self, kind, name: str, labels: Optional[Dict[str, str]]):
+        metric = self._metric(kind, name, tuple(sorted(labels or {})))
+        if self._thread is None:
+            self.start()
+        self._dirty = True
+        return metric.labels(**labels) if labels else metric
+
+    def flush(self) -> bool:
+        """Envoie tout le registre en un POST ; False si le Pushgateway a répondu en erreur."""
+        if not self._dirty:
+            return True
+        self._dirty = False
+        payload = generate_latest(self.registry)
+        try:
+            response = (self._http or get_http_client()).post(self.push_url, data=payload,
+                                                              headers={"Content-Type": CONTENT_TYPE_LATEST})
+            self.pushes += 1
+            if response.status_code not in (200, 202):
+                self.failures += 1
+                self._dirty = True  # Valeurs non enregistrées par le Pushgateway : nouvel essai au prochain intervalle
+                logger.error("Pushgateway %s : statut %s", self.push_url, response.status_code)
+                return False
+            return True
+        except Exception as e:
+            self.failures += 1
+            self._dirty = True  # Nouvel essai au prochain intervalle
+            logger.error("Envoi des métriques vers %s impossible : %s", self.push_url, e)
+            return False
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="metric_batcher", daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def stop(self) -> None:
+        """Arrête l'envoi périodique et pousse les dernières valeurs."""
+        self._stop.set()
+        self.flush()
+
+_batchers: Dict[str, MetricBatcher] = {}
+_batchers_lock = threading.Lock()
+
+def get_metric_batcher(push_url: str, interval: Optional[float] = None) -> MetricBatcher:
+    """
+    Batcher partagé par URL de Pushgateway (job et groupement compris dans l'URL).
+
+    :param interval: Période d'envoi ; None garde celle du batcher existant (DEFAULT_PUSH_INTERVAL à la création).
+        Un intervalle différent de celui d'un batcher déjà créé le remplace, avec un avertissement :
+        le thread d'envoi l'applique dès l'attente suivante.
+    """
+    batcher = _batchers.get(push_url)
+    if batcher is None:
+        with _batchers_lock:
+            batcher = _batchers.get(push_url)
+            if batcher is None:
+                batcher = _batchers[push_url] = MetricBatcher(push_url, interval or DEFAULT_PUSH_INTERVAL)
+                return batcher
+    if interval is not None and interval != batcher.interval:
+        logger.warning("Batcher %s : intervalle d'envoi %s s remplacé par %s s", push_url, batcher.interval, interval)
+        batcher.interval = interval
+    return batcher
+
+# -----------------------------
+# PUSHGATEWAY SIMULÉ ET COMPARAISON (FACULTATIF)
+# -----------------------------
+
+class StubPushgateway:
+    """Pushgateway local qui compte les requêtes reçues et garde le dernier corps par job."""
+
+    def __init__(self, port: int = 0):
+        stub = self
+        self.requests = 0
+        self.bytes = 0
+        self.bodies: Dict[str, bytes] = {}
+
+        class Handler(BaseHTTPRequestHandler):
+            disable_nagle_algorithm = True
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.requests += 1
+                stub.bytes += len(body)
+                stub.bodies[self.path] = body
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+def _sample_cycle(cycle: int) -> Tuple[Dict[str, float], Dict[str, float]]:
+    gpu = {"gpu_utilization": 70 + cycle % 20, "gpu_memory_used": 4096 + cycle, "gpu_power_draw": 180.5,
+           "gpu_temperature": 65 + cycle % 5}
+    droplet = {f"droplet_{name}": float(cycle + i) for i, name in
+               enumerate(("cpu", "memory", "disk_read", "disk_write", "network_in", "network_out"))}
+    return gpu, droplet
+
+def benchmark_metric_push(cycles: int = 60, cycles_per_flush: int = 1) -> Dict[str, Dict[str, float]]:
+    """
+    Requêtes HTTP envoyées par gpu_monitor (4 jauges) et digital_ocean_monitor (6 jauges) :
+    un POST par valeur contre un POST groupé par job toutes les cycles_per_flush collectes.
+    """
+    results = {}
+    with StubPushgateway() as stub:
+        start = time.perf_counter()
+        for cycle in range(cycles):
+            gpu, droplet = _sample_cycle(cycle)
+            for job, values in (("gpu_monitor", gpu), ("digital_ocean_monitor", droplet)):
+                for name, value in values.items():
+                    get_http_client().post(f"{stub.url}/metrics/job/{job}", data=f"{name} {value}\n")
+        results["per_value"] = {"requests": stub.requests, "bytes": stub.bytes, "seconds": time.perf_counter() - start}
+
+        stub.requests = stub.bytes = 0
+        batchers = {job: MetricBatcher(f"{stub.url}/metrics/job/{job}", interval=3600)
+                    for job in ("gpu_monitor", "digital_ocean_monitor")}
+        start = time.perf_counter()
+        for cycle in range(cycles):
+            gpu, droplet = _sample_cycle(cycle)
+            for name, value in gpu.items():
+                batchers["gpu_monitor"].set(name, value)
+            for name, value in droplet.items():
+                batchers["digital_ocean_monitor"].set(name, value)
+            if (cycle + 1) % cycles_per_flush == 0:
+                for batcher in batchers.values():
+                    batcher.flush()
+        for batcher in batchers.values():
+            batcher.stop()
+        results["batched"] = {"requests": stub.requests, "bytes": stub.bytes, "seconds": time.perf_counter() - start}
+        body = stub.bodies["/metrics/job/gpu_monitor"].decode()
+        if "gpu_temperature" not in body or "gpu_utilization" not in body:
+            raise AssertionError("Le Pushgateway simulé n'a pas reçu toutes les jauges GPU")
+    return results
+
+if __name__ == "__main__":
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    for cycles_per_flush in (1, MONITOR_FLUSH_CYCLES):
+        r = benchmark_metric_push(cycles, cycles_per_flush)
+        print(f"{cycles} collectes, envoi groupé toutes les {cycles_per_flush} collectes : "
+              f"un POST par valeur {r['per_value']['requests']} requêtes ({r['per_value']['seconds']:.2f} s) | "
+              f"groupé {r['batched']['requests']} requêtes ({r['batched']['seconds']:.2f} s)")
@@ -1,13 +1,91 @@
+import math
 import pandas as pd
 import requests
+from dataclasses import dataclass
 from datetime import datetime
-from helpers import connect_mysql, load_config
-from setup_logging import log_info
-from error_logging import log_error
-from arbitrage_instance_metrics import update_metrics
+from helpers import connect_mysql, load_config, log_info, log_error, update_metrics
+from columnar_store import scan_batches
 
 # Configuration du fichier pour Prometheus Pushgateway
 PROMETHEUS_PUSHGATEWAY_URL = 'http://localhost:9091/metrics/job/metrics_generation'
+DEFAULT_CHUNKSIZE = 100000  # Lignes lues par lot : la mémoire du rapport ne dépend plus de l'historique
+
+# Seules les colonnes utiles aux agrégats sont lues
+AGGREGATE_QUERY = "SELECT price, quantity FROM trades"
+PUSHDOWN_QUERY = """
+SELECT
+    COUNT(*),
+    COUNT(price),
+    SUM(price),
+    SUM(quantity),
+    MAX(price),
+    MIN(price)
+FROM trades
+"""
+
+# -----------------------------
+# AGRÉGATS CUMULATIFS FUSIONNABLES
+# -----------------------------
+
+@dataclass
+class RunningAggregates:
+    """
+    Agrégats du rapport accumulés lot par lot.
+
+    Chaque lot (DataFrame ou ligne agrégée par SQL) est replié avec update() ; deux agrégats
+    calculés séparément (par lot, par partition, par base) se combinent avec merge().
+    """
+    count: int = 0
+    price_count: int = 0
+    price_sum: float = 0.0
+    quantity_sum: float = 0.0
+    price_max: float = math.nan
+    price_min: float = math.nan
+
+    @classmethod
+    def from_frame(cls, df):
+        aggregates = cls()
+        aggregates.update(df)
+        return aggregates
+
+    @classmethod
+    def from_row(cls, row):
+        """Construit les agrégats depuis la ligne (COUNT(*), COUNT(price), SUM, SUM, MAX, MIN) de PUSHDOWN_QUERY."""
+        count, price_count, price_sum, quantity_sum, price_max, price_min = row
+        return cls(int(count or 0), int(price_count or 0), float(price_sum or 0.0), float(quantity_sum or 0.0),
+                   math.nan if price_max is None else float(price_max), math.nan if price_min is None else float(price_min))
+
+    def update(self, df):
+        prices = df['price']
+        present = int(prices.count())
+        self.merge(RunningAggregates(
+            count=len(df),
+            price_count=present,
+            price_sum=float(prices.sum()),
+            quantity_sum=float(df['quantity'].sum()),
+            price_max=float(prices.max()) if present else math.nan,
+            price_min=float(prices.min()) if present else math.nan,
+        ))
+
+    def merge(self, other):
+        self.count += other.count
+        self.price_count += other.price_count
+        self.price_sum += other.price_sum
+        self.quantity_sum += other.quantity_sum
+        if other.price_count:
+            self.price_max = other.price_max if math.isnan(self.price_max) else max(self.price_max, other.price_max)
+            self.price_min = other.price_min if math.isnan(self.price_min) else min(self.price_min, other.price_min)
+        return self
+
+    def to_metrics(self):
+        """Mêmes valeurs que len(), mean(), sum(), max() et min() sur le DataFrame complet."""
+        return {
+            'total_trades': self.count,
+            'average_trade_price': self.price_sum / self.price_count if self.price_count else math.nan,
+            'total_quantity': self.quantity_sum,
+            'max_trade_price': self.price_max,
+            'min_trade_price': self.price_min,
+        }
 
 # Extraction des données de la base MySQL pour les métriques
 def fetch_trading_data(conn):
@@ -28,18 +106,76 @@ def fetch_trading_data(conn):
         log_error(f"Erreur lors de la récupération des données MySQL : {e}")
         return pd.DataFrame()
 
-# Calcul des métriques sur les données
+# Curseur côté serveur : le pilote ne rapatrie que le lot demandé par fetchmany
+def _server_side_cursor(conn):
+    module = type(conn).__module__
+    if module.startswith("pymysql"):
+        import pymysql.cursors
+        return conn.cursor(pymysql.cursors.SSCursor)
+    if module.startswith("MySQLdb"):
+        import MySQLdb.cursors
+        return conn.cursor(MySQLdb.cursors.SSCursor)
+    if module.startswith("mysql.connector"):
+        return conn.cursor(buffered=False)
+    if module.startswith("psycopg2"):
+        return conn.cursor(name="metrics_report_stream")
+    return conn.cursor()  # sqlite3 et autres pilotes DB-API qui lisent déjà à la demande
+
+# Lecture de la requête par lots de chunksize lignes
+def iter_trading_chunks(conn, query=AGGREGATE_QUERY, chunksize=DEFAULT_CHUNKSIZE):
+    cursor = _server_side_cursor(conn)
+    try:
+        cursor.execute(query)
+        columns = [description[0] for description in cursor.description]
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            if not rows:
+                break
+            yield pd.DataFrame.from_records(rows, columns=columns)
+    finally:
+        cursor.close()
+
+# Agrégation en flux (ou directement en SQL si pushdown) sans jamais charger la table entière
+def aggregate_trading_data(conn, chunksize=DEFAULT_CHUNKSIZE, pushdown=False):
+    try:
+        if pushdown:
+            log_info("Calcul des agrégats de trading directement dans la base.")
+            cursor = conn.cursor()
+            cursor.execute(PUSHDOWN_QUERY)
+            aggregates = RunningAggregates.from_row(cursor.fetchone())
+            cursor.close()
+        else:
+            log_info(f"Agrégation des données de trading par lots de {chunksize} lignes.")
+            aggregates = RunningAggregates()
+            for chunk in iter_trading_chunks(conn, AGGREGATE_QUERY, chunksize):
+                aggregates.update(chunk)
+        log_info(f"{aggregates.count} lignes agrégées pour le calcul des métriques.")
+        return aggregates
+    except Exception as e:
+        log_error(f"Erreur lors de l'agrégation des données MySQL : {e}")
+        return RunningAggregates()
+
+# Agrégation en flux des lots Parquet (colonnes price et quantity uniquement)
+def aggregate_trading_data_columnar(root, start_date=None, end_date=None, chunksize=DEFAULT_CHUNKSIZE):
+    try:
+        log_info(f"Agrégation des exécutions du stockage colonnaire {root}.")
+        aggregates = RunningAggregates()
+        for batch in scan_batches(root, columns=["price", "quantity"], start_date=start_date, end_date=end_date,
+                                  batch_rows=chunksize):
+            aggregates.update(batch.to_pandas())
+        log_info(f"{aggregates.count} lignes agrégées pour le calcul des métriques.")
+        return aggregates
+    except Exception as e:
+        log_error(f"Erreur lors de la lecture du stockage colonnaire : {e}")
+        return RunningAggregates()
+
+# Calcul des métriques sur les données (DataFrame complet ou agrégats déjà accumulés)
 def calculate_metrics(df):
     try:
         log_info("Calcul des métriques en cours...")
-        metrics = {
-            'total_trades': len(df),
-            'average_trade_price': df['price'].mean(),
-            'total_quantity': df['quantity'].sum(),
-            'max_trade_price': df['price'].max(),
-            'min_trade_price': df['price'].min(),
-            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+        aggregates = df if isinstance(df, RunningAggregates) else RunningAggregates.from_frame(df)
+        metrics = aggregates.to_metrics()
+        metrics['timestamp'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         log_info("Métriques calculées avec succès.")
         update_metrics("metrics_calculated", 1)
         return metrics
@@ -97,6 +233,25 @@ def main():
     try:
         # Charger la configuration
         config = load_config()
+
+        report_config = config.get('metrics_report') or {}
+        chunksize = report_config.get('chunksize', DEFAULT_CHUNKSIZE)
+
+        # Stockage colonnaire configuré : pas de connexion MySQL, lecture des seules colonnes utiles
+        columnar_config = config.get('columnar_store') or {}
+        if columnar_config.get('path'):
+            aggregates = aggregate_trading_data_columnar(f"{columnar_config['path']}/executions",
+                                                         columnar_config.get('report_start_date'),
+                                                         columnar_config.get('report_end_date'), chunksize)
+            if not aggregates.count:
+                log_error("Aucune donnée récupérée pour le calcul des métriques.")
+                return
+            metrics = calculate_metrics(aggregates)
+            generate_csv_report(metrics)
+            send_metrics_to_grafana(metrics)
+            log_info("Rapport de métriques généré et envoyé avec succès.")
+            return
+
         mysql_config = config['mysql']
 
         # Connexion à MySQL
@@ -110,13 +265,13 @@ def main():
             log_error("Connexion à MySQL échouée.")
             return
 
-        # Récupérer et traiter les données
-        df = fetch_trading_data(conn)
-        if df.empty:
+        # Agréger les données par lots (ou dans MySQL) : mémoire constante quel que soit l'historique
+        aggregates = aggregate_trading_data(conn, chunksize, report_config.get('pushdown', False))
+        if not aggregates.count:
             log_error("Aucune donnée récupérée pour le calcul des métriques.")
             return
 
-        metrics = calculate_metrics(df)
+        metrics = calculate_metrics(aggregates)
 
         # Générer un rapport pour Power BI
         generate_csv_report(metrics)
@@ -0,0 +1,446 @@
+import sys
+import hmac
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from collections import defaultdict, deque
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional, Set
+from urllib.parse import parse_qsl
+from aiohttp import WSMsgType, web
+from synthetic_market import generate_synthetic_market
+
+# -----------------------------
+# ÉCHANGE BINANCE SIMULÉ (REST + FLUX COMBINÉS)
+# -----------------------------
+
+TICK_RATIO = 0.0001  # Écart relatif entre deux niveaux de prix
+BOOK_LEVELS = 50  # Niveaux maintenus de chaque côté du carnet simulé
+WEIGHT_PER_MINUTE = 6000  # Limite REQUEST_WEIGHT d'une IP, comme sur Binance
+ENDPOINT_WEIGHTS = {
+    "/api/v3/exchangeInfo": 20,
+    "/api/v3/order": 1,
+}
+STEP_SIZE = "0.00001000"  # Même pas de quantité pour tous les symboles simulés
+SYMBOL_FILTERS = [
+    {"filterType": "LOT_SIZE", "minQty": STEP_SIZE, "maxQty": "9000000.00000000", "stepSize": STEP_SIZE},
+    {"filterType": "NOTIONAL", "minNotional": "0.00000100", "applyMinToMarket": True,
+     "maxNotional": "9000000.00000000", "applyMaxToMarket": False, "avgPriceMins": 5},
+]
+
+def valid_lot_quantity(quantity: str) -> bool:
+    """Quantité décimale sans exposant, multiple de STEP_SIZE et au moins égale à minQty (filtre LOT_SIZE)."""
+    if not quantity or "e" in quantity.lower():
+        return False
+    try:
+        value = Decimal(quantity)
+    except InvalidOperation:
+        return False
+    return value >= Decimal(STEP_SIZE) and value % Decimal(STEP_SIZE) == 0
+
+def depth_weight(limit: int) -> int:
+    """Poids de /api/v3/depth selon la profondeur demandée (barème Binance)."""
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 25
+    if limit <= 1000:
+        return 50
+    return 250
+
+class SimulatedBook:
+    """Carnet d'un symbole : niveaux indexés par écart en ticks autour d'un prix central fixe."""
+
+    __slots__ = ("symbol", "mid", "bids", "asks", "update_id", "rng")
+
+    def __init__(self, symbol: str, mid: float, rng: random.Random):
+        self.symbol = symbol
+        self.mid = mid
+        self.rng = rng
+        self.bids = {k: rng.uniform(0.1, 50) for k in range(1, BOOK_LEVELS + 1)}
+        self.asks = {k: rng.uniform(0.1, 50) for k in range(1, BOOK_LEVELS + 1)}
+        self.update_id = rng.randint(1000, 100000)
+
+    def price(self, ticks: int, is_bid: bool) -> str:
+        return f"{self.mid * (1 - ticks * TICK_RATIO if is_bid else 1 + ticks * TICK_RATIO):.8f}"
+
+    def snapshot(self, limit: int) -> Dict:
+        return {
+            "lastUpdateId": self.update_id,
+            "bids": [[self.price(k, True), f"{self.bids[k]:.8f}"] for k in sorted(self.bids)[:limit]],
+            "asks": [[self.price(k, False), f"{self.asks[k]:.8f}"] for k in sorted(self.asks)[:limit]],
+        }
+
+    def mutate(self) -> Dict:
+        """Modifie quelques niveaux et retourne le diff @depth correspondant."""
+        first_id = self.update_id + 1
+        self.update_id += self.rng.randint(1, 3)
+        changes = {"b": [], "a": []}
+        for side, key, is_bid in ((self.bids, "b", True), (self.asks, "a", False)):
+            for _ in range(self.rng.randint(1, 3)):
+                ticks = self.rng.randint(1, BOOK_LEVELS)
+                quantity = 0.0 if self.rng.random() < 0.3 and len(side) > 5 else self.rng.uniform(0.1, 50)
+                if quantity:
+                    side[ticks] = quantity
+                else:
+                    side.pop(ticks, None)
+                changes[key].append([self.price(ticks, is_bid), f"{quantity:.8f}"])
+        return {"e": "depthUpdate", "E": int(time.time() * 1000), "s": self.symbol,
+                "U": first_id, "u": self.update_id, "b": changes["b"], "a": changes["a"]}
+
+class MockExchange:
+    """
+    Serveur aiohttp imitant les endpoints Binance utilisés par les scripts :
+    /api/v3/exchangeInfo, /api/v3/depth, /api/v3/ticker/24hr, POST /api/v3/order et /stream (WebSocket).
+
+    Les clients le visent via BINANCE_BASE_URL (et BINANCE_WS_URL, dérivée par défaut).
+    Latence, limite de poids par minute et injection de pannes sont configurables.
+    """
+
+    def __init__(self, pairs: Optional[List[Dict]] = None, symbol_count: int = 200, latency_seconds: float = 0.0,
+                 latency_jitter_seconds: float = 0.0, weight_per_minute: int = WEIGHT_PER_MINUTE,
+                 failure_rate: float = 0.0, stream_interval_seconds: float = 0.1,
+                 disconnect_after_frames: Optional[int] = None, recorded_frames: Optional[List[str]] = None,
+                 api_secrets: Optional[Dict[str, str]] = None, seed: int = 7):
+        self.pairs = pairs or generate_synthetic_market(symbol_count, seed)
+        self.rng = random.Random(seed)
+        self.books = {pair["symbol"]: SimulatedBook(pair["symbol"], pair["price"], self.rng) for pair in self.pairs}
+        self.latency_seconds = latency_seconds
+        self.latency_jitter_seconds = latency_jitter_seconds
+        self.weight_per_minute = weight_per_minute
+        self.failure_rate = failure_rate
+        self.stream_interval_seconds = stream_interval_seconds
+        self.disconnect_after_frames = disconnect_after_frames
+        self.recorded_frames = recorded_frames
+        self.api_secrets = api_secrets or {}  # Clé API -> clé secrète : signatures vérifiées si renseignée
+        self.request_counts: Dict[str, int] = defaultdict(int)
+        self.frames_sent = 0
+        self._weights: Dict[str, deque] = defaultdict(deque)  # IP -> [(instant, poids)]
+        self._injected: Dict[str, deque] = defaultdict(deque)  # Chemin -> codes HTTP à renvoyer
+        self._subscribers: Dict[str, Set] = defaultdict(set)  # Flux -> connexions WebSocket
+        self._order_ids = 0
+        self._runner: Optional[web.AppRunner] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self.port: Optional[int] = None
+
+    # -----------------------------
+    # INJECTION DE PANNES ET LIMITES
+    # -----------------------------
+
+    def inject_failures(self, path: str, count: int = 1, status: int = 503) -> None:
+        """Les count prochaines requêtes sur path reçoivent le code HTTP status."""
+        self._injected[path].extend([status] * count)
+
+    def _used_weight(self, client: str, weight: int) -> int:
+        window = self._weights[client]
+        now = time.monotonic()
+        while window and now - window[0][0] > 60:
+            window.popleft()
+        window.append((now, weight))
+        return sum(w for _, w in window)
+
+    def _request_weight(self, request: web.Request) -> int:
+        if request.path == "/api/v3/depth":
+            return depth_weight(int(request.query.get("limit", 100)))
+        if request.path == "/api/v3/ticker/24hr":
+            return 2 if "symbol" in request.query else 80
+        return ENDPOINT_WEIGHTS.get(request.path, 1)
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        if request.path == "/stream":
+            return await handler(request)
+        self.request_counts[request.path] += 1
+        delay = self.latency_seconds + self.rng.uniform(0, self.latency_jitter_seconds)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        used_weight = self._used_weight(request.remote or "", self._request_weight(request))
+        headers = {"X-MBX-USED-WEIGHT-1M": str(used_weight)}
+        if used_weight > self.weight_per_minute:
+            headers["Retry-After"] = "60"
+            return web.json_response({"code": -1003, "msg": "Too many requests."}, status=429, headers=headers)
+        injected = self._injected.get(request.path)
+        if injected:
+            return web.json_response({"code": -1001, "msg": "Injected failure."}, status=injected.popleft(), headers=headers)
+        if self.failure_rate and self.rng.random() < self.failure_rate:
+            return web.json_response({"code": -1001, "msg": "Internal error."}, status=503, headers=headers)
+        response = await handler(request)
+        response.headers.update(headers)
+        return response
+
+    # -----------------------------
+    # ENDPOINTS REST
+    # -----------------------------
+
+    async def exchange_info(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "timezone": "UTC",
+            "serverTime": int(time.time() * 1000),
+            "symbols": [{"symbol": pair["symbol"], "status": "TRADING", "baseAsset": pair["base"],
+                         "quoteAsset": pair["quote"], "filters": SYMBOL_FILTERS} for pair in self.pairs],
+        })
+
+    async def depth(self, request: web.Request) -> web.Response:
+        book = self.books.get(request.query.get("symbol", ""))
+        if book is None:
+            return web.json_response({"code": -1121, "msg": "Invalid symbol."}, status=400)
+        return web.json_response(book.snapshot(int(request.query.get("limit", 100))))
+
+    def _ticker(self, book: SimulatedBook) -> Dict:
+        best_bid, best_ask = min(book.bids), min(book.asks)
+        volume = sum(book.bids.values()) + sum(book.asks.values())
+        return {"symbol": book.symbol, "lastPrice": f"{book.mid:.8f}",
+                "bidPrice": book.price(best_bid, True), "askPrice": book.price(best_ask, False),
+                "volume": f"{volume:.8f}", "quoteVolume": f"{volume * book.mid:.8f}",
+                "count": book.update_id}
+
+    async def ticker_24hr(self, request: web.Request) -> web.Response:
+        symbol = request.query.get("symbol")
+        if symbol is not None:
+            if symbol not in self.books:
+                return web.json_response({"code": -1121, "msg": "Invalid symbol."}, status=400)
+            return web.json_response(self._ticker(self.books[symbol]))
+        return web.json_response([self._ticker(book) for book in self.books.values()])
+
+    async def order(self, request: web.Request) -> web.Response:
+        body = await request.text()
+        total_params = request.query_string + ("&" if request.query_string and body else "") + body
+        params = dict(parse_qsl(total_params))
+        api_key = request.headers.get("X-MBX-APIKEY")
+        if not api_key or "signature" not in params:
+            return web.json_response({"code": -2014, "msg": "API-key format invalid."}, status=401)
+        secret = self.api_secrets.get(api_key)
+        if secret is not None:
+            payload = total_params.rsplit("&signature=", 1)[0]
+            expected = hmac.new(secret.encode(), payload.encode(), hashlib.sha256).hexdigest()
+            if not hmac.compare_digest(expected, params["signature"]):
+                return web.json_response({"code": -1022, "msg": "Signature for this request is not valid."}, status=400)
+        book = self.books.get(params.get("symbol", ""))
+        if book is None:
+            return web.json_response({"code": -1121, "msg": "Invalid symbol."}, status=400)
+        side = params.get("side")
+        price = book.price(min(book.asks), False) if side == "BUY" else book.price(min(book.bids), True)
+        quantity = params.get("quantity", "0")
+        if not valid_lot_quantity(quantity):
+            return web.json_response({"code": -1013, "msg": "Filter failure: LOT_SIZE"}, status=400)
+        self._order_ids += 1
+        return web.json_response({
+            "symbol": book.symbol, "orderId": self._order_ids, "transactTime": int(time.time() * 1000),
+            "type": params.get("type", "MARKET"), "side": side, "status": "FILLED",
+            "origQty": quantity, "executedQty": quantity,
+            "fills": [{"price": price, "qty": quantity, "commission": "0", "commissionAsset": "BNB"}],
+        })
+
+    # -----------------------------
+    # FLUX WEBSOCKET COMBINÉS
+    # -----------------------------
+
+    async def stream(self, request: web.Request) -> web.WebSocketResponse:
+        connection = web.WebSocketResponse(max_msg_size=0)
+        await connection.prepare(request)
+        streams = [name for name in request.query.get("streams", "").split("/") if name]
+        if self.recorded_frames is not None:
+            await self._replay(connection, set(streams))
+            return connection
+        for name in streams:
+            self._subscribers[name].add(connection)
+        try:
+            async for message in connection:
+                if message.type in (WSMsgType.CLOSE, WSMsgType.ERROR):
+                    break
+        finally:
+            for name in streams:
+                self._subscribers[name].discard(connection)
+        return connection
+
+    async def _replay(self, connection: web.WebSocketResponse, streams: Set[str]) -> None:
+        for frame in self.recorded_frames:
+            if json.loads(frame).get("stream") in streams:
+                await connection.send_str(frame)
+                self.frames_sent += 1
+                if self.stream_interval_seconds:
+                    await asyncio.sleep(self.stream_interval_seconds)
+        await connection.close()
+
+    async def _publish(self, name: str, data: Dict, sent: Dict) -> None:
+        frame = json.dumps({"stream": name, "data": data})
+        for connection in list(self._subscribers.get(name, ())):
+            if connection.closed:
+                continue
+            await connection.send_str(frame)
+            self.frames_sent += 1
+            sent[connection] = sent.get(connection, 0) + 1
+            if self.disconnect_after_frames and sent[connection] >= self.disconnect_after_frames:
+                await connection.close()  # Panne injectée : le client doit se reconnecter
+
+    async def _stream_loop(self, app: web.Application) -> None:
+        sent: Dict = {}
+        while True:
+            await asyncio.sleep(self.stream_interval_seconds)
+            subscribed = {name.split("@", 1)[0].upper() for name, subs in self._subscribers.items() if subs}
+            for symbol in subscribed:
+                book = self.books.get(symbol)
+                if book is None:
+                    continue
+                diff = book.mutate()
+                lower = symbol.lower()
+                for name in (f"{lower}@depth", f"{lower}@depth@100ms"):
+                    await self._publish(name, diff, sent)
+                for levels in (5, 10, 20):
+                    if self._subscribers.get(f"{lower}@depth{levels}"):
+                        await self._publish(f"{lower}@depth{levels}", book.snapshot(levels), sent)
+
+    async def _start_stream_loop(self, app: web.Application) -> None:
+        app["stream_task"] = asyncio.create_task(self._stream_loop(app))
+
+    async def _stop_stream_loop(self, app: web.Application) -> None:
+        app["stream_task"].cancel()
+        for subscribers in self._subscribers.values():
+            for connection in list(subscribers):
+                await connection.close()
+
+    # -----------------------------
+    # DÉMARRAGE / ARRÊT
+    # -----------------------------
+
+    def application(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get("/api/v3/exchangeInfo", self.exchange_info)
+        app.router.add_get("/api/v3/depth", self.depth)
+        app.router.add_get("/api/v3/ticker/24hr", self.ticker_24hr)
+        app.router.add_post("/api/v3/order", self.order)
+        app.router.add_get("/stream", self.stream)
+        app.on_startup.append(self._start_stream_loop)
+        app.on_cleanup.append(self._stop_stream_loop)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Démarre le serveur sur la boucle courante et retourne son URL de base REST."""
+        self._runner = web.AppRunner(self.application())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def stream_url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}"
+
+    def start_in_thread(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Démarre le serveur dans un thread dédié (pour les clients synchrones) et retourne son URL."""
+        ready = threading.Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start(host, port))
+            ready.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.stop())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=serve, name="mock_exchange", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self.base_url
+
+    def stop_thread(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+# -----------------------------
+# PARCOURS DE BOUT EN BOUT CONTRE L'ÉCHANGE SIMULÉ (FACULTATIF)
+# -----------------------------
+
+def run_end_to_end(symbol_count: int = 300, latency_seconds: float = 0.005, stream_seconds: float = 3.0) -> Dict:
+    """
+    Exerce les clients du dépôt contre l'échange simulé : filtrage REST, carnets locaux sur flux diff,
+    envoi de boucles signées, limite de poids et reprise après panne injectée.
+    """
+    from http_client import HttpClient
+    from order_book_store import OrderBookStore
+    from feed_manager import FeedManager
+    from local_order_book import LocalOrderBookManager
+    from order_signing import OrderRequestBuilder
+    from order_dispatch import OrderDispatcher, prepare_loop_orders
+
+    exchange = MockExchange(symbol_count=symbol_count, latency_seconds=latency_seconds, stream_interval_seconds=0.01,
+                            weight_per_minute=2000, api_secrets={"key": "secret"})
+    base_url = exchange.start_in_thread()
+    client = HttpClient()
+    results = {}
+
+    # REST : liste des symboles, tickers groupés et carnets
+    start = time.perf_counter()
+    symbols = [s["symbol"] for s in client.get(f"{base_url}/api/v3/exchangeInfo").json()["symbols"]]
+    tickers = client.get(f"{base_url}/api/v3/ticker/24hr").json()
+    for symbol in symbols[:50]:
+        client.get(f"{base_url}/api/v3/depth", params={"symbol": symbol, "limit": 5}).raise_for_status()
+    results["rest_seconds"] = time.perf_counter() - start
+    results["tickers"] = len(tickers)
+
+    # Limite de poids : /depth?limit=1000 pèse 50, le budget de 2000 est vite épuisé
+    statuses = [client.get(f"{base_url}/api/v3/depth", params={"symbol": symbols[0], "limit": 1000}).status_code
+                for _ in range(40)]
+    results["rate_limited"] = statuses.count(429)
+
+    # Flux diff @depth et carnets locaux resynchronisés par snapshot REST ; une déconnexion injectée
+    exchange.disconnect_after_frames = 400
+    store = OrderBookStore(capacity=symbol_count)
+    fetcher = lambda symbol, limit: client.get(f"{base_url}/api/v3/depth",
+                                               params={"symbol": symbol, "limit": limit}).json()
+    exchange.weight_per_minute = WEIGHT_PER_MINUTE * 100
+    local_books = LocalOrderBookManager(fetcher, store=store)
+    manager = FeedManager(symbols[:100], store, base_url=exchange.stream_url, streams_per_connection=50,
+                          stream_suffix="@depth@100ms", local_books=local_books)
+    manager.start_in_thread()
+    time.sleep(stream_seconds)
+    manager.stop()
+    results["frames"] = manager.frames_processed
+    results["synced_books"] = sum(book.synced for book in local_books.books.values())
+    results["resyncs"] = local_books.resync_count
+
+    # Ordres signés (signature vérifiée par l'échange) envoyés en parallèle, dont un échec injecté
+    builder = OrderRequestBuilder("key", "secret", base_url)
+    dispatcher = OrderDispatcher("concurrent", client, pre_held_inventory=True)  # L'échange simulé ne tient pas de soldes
+    legs = [{"symbol": symbol, "side": side, "quantity": 0.01} for symbol, side in zip(symbols[:3], ("BUY", "BUY", "SELL"))]
+    traces = [dispatcher.dispatch(prepare_loop_orders(builder, legs), legs) for _ in range(20)]
+    exchange.inject_failures("/api/v3/order", 1, 503)
+    failed = dispatcher.dispatch(prepare_loop_orders(builder, legs), legs)
+    results["unwound_legs"] = sum(trace.filled for trace in dispatcher.unwind(builder, failed))
+    dispatcher.close()
+    results["loops_filled"] = sum(trace.succeeded for trace in traces)
+    results["loop_ms"] = sum(trace.completion_seconds for trace in traces) / len(traces) * 1e3
+    results["injected_failure_seen"] = not failed.succeeded
+
+    client.close()
+    exchange.stop_thread()
+    return results
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        # Serveur autonome : BINANCE_BASE_URL=http://127.0.0.1:<port> pour y brancher les scripts
+        exchange = MockExchange(symbol_count=int(sys.argv[3]) if len(sys.argv) > 3 else 200)
+        print(f"Échange simulé sur {exchange.start_in_thread(port=int(sys.argv[2]) if len(sys.argv) > 2 else 0)}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            exchange.stop_thread()
+    else:
+        for name, value in run_end_to_end().items():
+            print(f"{name:>22} : {value}")
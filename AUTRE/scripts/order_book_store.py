@@ -0,0 +1,190 @@
+import json
+import time
+import random
+import tracemalloc
+import numpy as np
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+# -----------------------------
+# CACHE COMPACT DES CARNETS D'ORDRES
+# -----------------------------
+
+class OrderBookStore:
+    """
+    Cache des carnets d'ordres stocké dans des tableaux NumPy préalloués.
+
+    Chaque message de profondeur est converti une seule fois en float64 dans les tableaux
+    bids/asks de forme (symboles × niveaux × [prix, quantité]) ; un index symbole -> ligne
+    et un numéro de séquence croissant par symbole complètent la structure. Les lectures
+    renvoient des vues sans copie. Les vues restent valides tant que la capacité n'est pas
+    agrandie (ajout de symboles au-delà de la capacité initiale).
+    """
+
+    def __init__(self, levels: int = 5, capacity: int = 2048):
+        self.levels = levels
+        self.symbol_rows: Dict[str, int] = {}
+        self.bids = np.zeros((capacity, levels, 2), dtype=np.float64)
+        self.asks = np.zeros((capacity, levels, 2), dtype=np.float64)
+        self.level_counts = np.zeros((capacity, 2), dtype=np.int32)  # (bids, asks) valides par symbole
+        self.sequence = np.zeros(capacity, dtype=np.uint64)
+        self._row_stride = levels * 2
+        self._refresh_views()
+
+    def _refresh_views(self) -> None:
+        # Vues mémoire plates sur les mêmes tampons : lecture scalaire sans créer de scalaire NumPy
+        self._bid_view = memoryview(self.bids).cast("B").cast("d")
+        self._ask_view = memoryview(self.asks).cast("B").cast("d")
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.symbol_rows
+
+    def __len__(self) -> int:
+        return len(self.symbol_rows)
+
+    def _grow(self) -> None:
+        capacity = len(self.sequence) * 2
+        for name in ("bids", "asks", "level_counts", "sequence"):
+            current = getattr(self, name)
+            grown = np.zeros((capacity,) + current.shape[1:], dtype=current.dtype)
+            grown[:len(current)] = current
+            setattr(self, name, grown)
+        self._refresh_views()
+
+    def row(self, symbol: str) -> int:
+        """Retourne la ligne d'un symbole, en l'enregistrant si nécessaire."""
+        row = self.symbol_rows.get(symbol)
+        if row is None:
+            row = len(self.symbol_rows)
+            if row == len(self.sequence):
+                self._grow()
+            self.symbol_rows[symbol] = row
+        return row
+
+    def update(self, symbol: str, bids: Sequence[Sequence[Any]], asks: Sequence[Sequence[Any]]) -> int:
+        """
+        Enregistre les niveaux d'un symbole (format Binance [[prix, quantité], ...], chaînes acceptées).
+
+        :return: Numéro de séquence de la mise à jour pour ce symbole.
+        """
+        row = self.row(symbol)
+        bid_count, ask_count = min(len(bids), self.levels), min(len(asks), self.levels)
+        if bid_count:
+            self.bids[row, :bid_count] = bids[:bid_count]
+        if ask_count:
+            self.asks[row, :ask_count] = asks[:ask_count]
+        self.bids[row, bid_count:] = 0.0
+        self.asks[row, ask_count:] = 0.0
+        self.level_counts[row] = (bid_count, ask_count)
+        self.sequence[row] += 1
+        return int(self.sequence[row])
+
+    def update_from_message(self, data: Dict[str, Any], symbol: Optional[str] = None) -> Optional[str]:
+        """Enregistre un message de profondeur décodé ; retourne le symbole mis à jour ou None."""
+        symbol = symbol or data.get("s")
+        if not symbol:
+            return None
+        self.update(symbol, data.get("bids", data.get("b", ())), data.get("asks", data.get("a", ())))
+        return symbol
+
+    def book(self, symbol: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Retourne les vues (bids, asks) des niveaux valides d'un symbole, ou None s'il est inconnu."""
+        row = self.symbol_rows.get(symbol)
+        if row is None:
+            return None
+        bid_count, ask_count = self.level_counts[row]
+        return self.bids[row, :bid_count], self.asks[row, :ask_count]
+
+    def best_bid(self, symbol: str) -> Optional[float]:
+        row = self.symbol_rows.get(symbol)
+        return None if row is None else self._bid_view[row * self._row_stride]
+
+    def best_ask(self, symbol: str) -> Optional[float]:
+        row = self.symbol_rows.get(symbol)
+        return None if row is None else self._ask_view[row * self._row_stride]
+
+    def best_bids(self) -> np.ndarray:
+        """Vue des meilleurs bids de tous les symboles, dans l'ordre de symbol_rows."""
+        return self.bids[:len(self.symbol_rows), 0, 0]
+
+    def best_asks(self) -> np.ndarray:
+        """Vue des meilleurs asks de tous les symboles, dans l'ordre de symbol_rows."""
+        return self.asks[:len(self.symbol_rows), 0, 0]
+
+    def update_sequence(self, symbol: str) -> int:
+        """Numéro de séquence de la dernière mise à jour d'un symbole (0 si jamais mis à jour)."""
+        row = self.symbol_rows.get(symbol)
+        return 0 if row is None else int(self.sequence[row])
+
+# -----------------------------
+# BENCHMARK CONTRE LE CACHE DICT (FACULTATIF)
+# -----------------------------
+
+def _synthetic_depth_messages(symbol_count: int, seed: int = 3) -> list:
+    rng = random.Random(seed)
+    messages = []
+    for i in range(symbol_count):
+        mid = rng.uniform(0.001, 50000)
+        messages.append(json.dumps({
+            "s": f"SYM{i:04d}USDT",
+            "lastUpdateId": rng.randint(1, 10 ** 9),
+            "bids": [[f"{mid * (1 - 0.0001 * (k + 1)):.8f}", f"{rng.uniform(0.1, 50):.8f}"] for k in range(5)],
+            "asks": [[f"{mid * (1 + 0.0001 * (k + 1)):.8f}", f"{rng.uniform(0.1, 50):.8f}"] for k in range(5)],
+        }))
+    return messages
+
+def benchmark_order_book_store(symbol_count: int = 2000, reads: int = 200000) -> Dict[str, float]:
+    """Compare la mémoire et la latence de lecture du best bid/ask entre le cache dict et OrderBookStore."""
+    messages = _synthetic_depth_messages(symbol_count)
+    symbols = [f"SYM{i:04d}USDT" for i in range(symbol_count)]
+    read_symbols = [symbols[i % symbol_count] for i in range(reads)]
+
+    tracemalloc.start()
+    dict_cache = {}
+    for message in messages:
+        data = json.loads(message)
+        dict_cache[data["s"]] = data
+    dict_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    store = OrderBookStore(capacity=symbol_count)
+    for message in messages:
+        store.update_from_message(json.loads(message))
+    store_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for symbol in read_symbols:
+        order_book = dict_cache[symbol]
+        float(order_book["bids"][0][0])
+        float(order_book["asks"][0][0])
+    dict_read = (time.perf_counter() - start) / reads
+
+    start = time.perf_counter()
+    for symbol in read_symbols:
+        store.best_bid(symbol)
+        store.best_ask(symbol)
+    store_read = (time.perf_counter() - start) / reads
+
+    start = time.perf_counter()
+    for _ in range(reads // symbol_count):
+        store.best_bids()
+        store.best_asks()
+    store_vector_read = (time.perf_counter() - start) / reads
+
+    return {
+        "dict_memory_bytes": dict_memory,
+        "store_memory_bytes": store_memory,
+        "dict_read_seconds": dict_read,
+        "store_read_seconds": store_read,
+        "store_vector_read_seconds": store_vector_read,
+    }
+
+if __name__ == "__main__":
+    results = benchmark_order_book_store()
+    print(f"Mémoire cache dict : {results['dict_memory_bytes'] / 1024:.0f} Kio | OrderBookStore : {results['store_memory_bytes'] / 1024:.0f} Kio")
+    print(
+        f"Lecture best bid/ask — dict : {results['dict_read_seconds'] * 1e9:.0f} ns | "
+        f"OrderBookStore : {results['store_read_seconds'] * 1e9:.0f} ns | "
+        f"vue vectorielle : {results['store_vector_read_seconds'] * 1e9:.1f} ns par symbole"
+    )
@@ -0,0 +1,280 @@
+import sys
+import json
+import time
+import threading
+from dataclasses import asdict, dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+from prometheus_client import Histogram
+from decimal import Decimal, InvalidOperation
+from helpers import log_error, log_warning, record_api_response
+from http_client import HttpClient, get_http_client
+from order_signing import OrderRequestBuilder, SignedOrder
+from instrumentation import record
+
+# -----------------------------
+# ENVOI DES TROIS JAMBES D'UNE BOUCLE
+# -----------------------------
+
+DISPATCH_POLICIES = ("sequential", "concurrent", "pipelined")
+PARALLEL_POLICIES = ("concurrent", "pipelined")  # N'attendent pas l'actif acheté par la jambe précédente
+OPPOSITE_SIDE = {"BUY": "SELL", "SELL": "BUY"}
+DEFAULT_STAGGER_SECONDS = 0.002  # Décalage entre deux envois en mode pipelined
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+loop_completion_latency = Histogram(
+    "loop_completion_latency_seconds", "Durée entre le premier envoi et le dernier accusé d'une boucle",
+    ["policy"], buckets=LATENCY_BUCKETS,
+)
+leg_ack_latency = Histogram(
+    "order_leg_ack_latency_seconds", "Durée entre l'envoi et l'accusé de réception d'une jambe",
+    ["policy", "leg"], buckets=LATENCY_BUCKETS,
+)
+
+@dataclass
+class LegTrace:
+    """Trace d'une jambe : horodatages perf_counter_ns de préparation, envoi, accusé et exécution."""
+    leg: int
+    symbol: str
+    side: str
+    quantity: float
+    prepared_ns: int
+    sent_ns: Optional[int] = None
+    ack_ns: Optional[int] = None
+    fill_ns: Optional[int] = None
+    status_code: Optional[int] = None
+    order_status: Optional[str] = None
+    order_id: Optional[int] = None
+    transact_time_ms: Optional[int] = None
+    executed_quantity: Optional[str] = None  # executedQty de l'échange (actif de base), exact au pas LOT_SIZE
+    error: Optional[str] = None
+
+    @property
+    def ack_seconds(self) -> Optional[float]:
+        if self.sent_ns is None or self.ack_ns is None:
+            return None
+        return (self.ack_ns - self.sent_ns) / 1e9
+
+    @property
+    def filled(self) -> bool:
+        return self.fill_ns is not None
+
+    @property
+    def executed(self) -> bool:
+        """Vrai si au moins une partie de la jambe a été exécutée (FILLED, PARTIALLY_FILLED, EXPIRED partiel)."""
+        try:
+            return Decimal(self.executed_quantity or "0") > 0
+        except InvalidOperation:
+            return False
+
+@dataclass
+class LoopTrace:
+    """Trace structurée d'une boucle : politique d'envoi et trace de chacune des jambes."""
+    policy: str
+    started_ns: int
+    legs: List[LegTrace] = field(default_factory=list)
+    completed_ns: Optional[int] = None
+    unwind: List[LegTrace] = field(default_factory=list)  # Ordres inverses envoyés après une boucle incomplète
+
+    @property
+    def completion_seconds(self) -> Optional[float]:
+        sent = [leg.sent_ns for leg in self.legs if leg.sent_ns is not None]
+        acked = [leg.ack_ns for leg in self.legs if leg.ack_ns is not None]
+        if not sent or len(acked) != len(self.legs):
+            return None
+        return (max(acked) - min(sent)) / 1e9
+
+    @property
+    def succeeded(self) -> bool:
+        return bool(self.legs) and all(leg.filled for leg in self.legs)
+
+    @property
+    def exposed_legs(self) -> List[LegTrace]:
+        """Jambes exécutées, même partiellement, d'une boucle incomplète : positions ouvertes à dénouer."""
+        if self.succeeded:
+            return []
+        return [leg for leg in self.legs if leg.executed]
+
+    def to_dict(self) -> Dict[str, Any]:
+        trace = asdict(self)
+        trace["completion_seconds"] = self.completion_seconds
+        return trace
+
+class OrderDispatcher:
+    """
+    Envoie les ordres déjà signés d'une boucle selon une politique :
+    - sequential : chaque jambe attend l'exécution de la précédente (comportement historique, par défaut) ;
+    - concurrent : les trois jambes partent en même temps ;
+    - pipelined : les jambes partent à stagger_seconds d'intervalle sans attendre les accusés.
+
+    concurrent et pipelined vendent des actifs que la jambe précédente n'a pas encore achetés : ils
+    exigent pre_held_inventory=True, c'est-à-dire des soldes déjà détenus dans chaque actif de la boucle.
+    """
+
+    def __init__(self, policy: str = "sequential", http_client: Optional[HttpClient] = None,
+                 stagger_seconds: float = DEFAULT_STAGGER_SECONDS, max_workers: int = 3,
+                 pre_held_inventory: bool = False):
+        if policy not in DISPATCH_POLICIES:
+            raise ValueError(f"Politique d'envoi inconnue : {policy}")
+        if policy in PARALLEL_POLICIES and not pre_held_inventory:
+            raise ValueError(f"La politique {policy} exige un inventaire pré-détenu (pre_held_inventory)")
+        self.policy = policy
+        self.http_client = http_client or get_http_client()
+        self.stagger_seconds = stagger_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="order_dispatch")
+
+    def _send(self, order: SignedOrder, trace: LegTrace) -> LegTrace:
+        trace.sent_ns = time.perf_counter_ns()
+        try:
+            response = self.http_client.post(order.url, headers=order.headers, endpoint="/api/v3/order")
+            trace.ack_ns = time.perf_counter_ns()
+            record("place_order", (trace.ack_ns - trace.sent_ns) / 1e9)
+            trace.status_code = response.status_code
+            record_api_response(order.headers["X-MBX-APIKEY"], response)  # Poids consommé, Retry-After (429/418)
+            body = response.json() if response.content else {}
+            if response.status_code == 200:
+                trace.order_id = body.get("orderId")
+                trace.order_status = body.get("status")
+                trace.transact_time_ms = body.get("transactTime")
+                trace.executed_quantity = body.get("executedQty")
+                if trace.order_status == "FILLED":
+                    trace.fill_ns = trace.ack_ns  # Ordre MARKET : l'exécution est connue dès l'accusé
+            else:
+                trace.error = str(body.get("msg", response.text))
+        except Exception as e:
+            trace.ack_ns = trace.ack_ns or time.perf_counter_ns()
+            trace.error = str(e)
+        if trace.error is not None:
+            log_error(f"Échec de la jambe {trace.leg} ({trace.symbol} {trace.side}) : {trace.error}")
+        return trace
+
+    def dispatch(self, orders: Sequence[SignedOrder], legs: Sequence[Dict[str, Any]]) -> LoopTrace:
+        """
+        Envoie des ordres préparés à l'avance et retourne la trace de la boucle.
+
+        :param orders: Requêtes signées, une par jambe, dans l'ordre de la boucle.
+        :param legs: Jambes correspondantes ({"symbol", "side", "quantity"}) pour la trace.
+        """
+        prepared_ns = time.perf_counter_ns()
+        loop_trace = LoopTrace(self.policy, prepared_ns, [
+            LegTrace(i, leg["symbol"], leg["side"], leg["quantity"], prepared_ns) for i, leg in enumerate(legs)
+        ])
+        if self.policy == "sequential":
+            for order, trace in zip(orders, loop_trace.legs):
+                self._send(order, trace)
+                if not trace.filled:
+                    break  # Échec ou exécution partielle : ne pas engager les jambes suivantes sur une boucle rompue
+        else:
+            futures = []
+            for i, (order, trace) in enumerate(zip(orders, loop_trace.legs)):
+                if i and self.policy == "pipelined":
+                    time.sleep(self.stagger_seconds)
+                futures.append(self._executor.submit(self._send, order, trace))
+            for future in futures:
+                future.result()
+        loop_trace.completed_ns = time.perf_counter_ns()
+        self._observe(loop_trace)
+        return loop_trace
+
+    def unwind(self, builder: OrderRequestBuilder, loop_trace: LoopTrace) -> List[LegTrace]:
+        """
+        Dénoue une boucle incomplète : chaque jambe exécutée, même partiellement, est inversée pour la
+        quantité réellement exécutée, de la dernière à la première, pour revenir à l'actif de départ.
+        Les ordres inverses partent l'un après l'autre ; un échec est journalisé et n'arrête pas les suivants.
+        """
+        exposed = loop_trace.exposed_legs
+        if not exposed:
+            return []
+        for trace in exposed:
+            log_warning(f"Boucle incomplète : jambe {trace.leg} ({trace.symbol} {trace.side}) exécutée pour "
+                        f"{trace.executed_quantity} sur {trace.quantity} (statut {trace.order_status}), dénouement")
+        legs = [{"symbol": trace.symbol, "side": OPPOSITE_SIDE[trace.side], "quantity": trace.executed_quantity}
+                for trace in reversed(exposed)]
+        prepared_ns = time.perf_counter_ns()
+        for order, leg in zip(prepare_loop_orders(builder, legs), legs):
+            trace = LegTrace(len(loop_trace.legs) + len(loop_trace.unwind), leg["symbol"], leg["side"],
+                             leg["quantity"], prepared_ns)
+            loop_trace.unwind.append(self._send(order, trace))
+            if not trace.filled:
+                log_error(f"Dénouement incomplet de {trace.symbol} : position ouverte de {leg['quantity']} à traiter")
+        return loop_trace.unwind
+
+    def _observe(self, loop_trace: LoopTrace) -> None:
+        for trace in loop_trace.legs:
+            if trace.ack_seconds is not None:
+                leg_ack_latency.labels(self.policy, str(trace.leg)).observe(trace.ack_seconds)
+        if loop_trace.completion_seconds is not None:
+            loop_completion_latency.labels(self.policy).observe(loop_trace.completion_seconds)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+def prepare_loop_orders(builder: OrderRequestBuilder, legs: Sequence[Dict[str, Any]]) -> List[SignedOrder]:
+    """Signe toutes les jambes avant le premier envoi (même horodatage pour la boucle)."""
+    timestamp = int(time.time() * 1000)
+    return [
+        builder.build(leg["symbol"], leg["side"], leg["quantity"], leg.get("type", "MARKET"), leg.get("price"), timestamp)
+        for leg in legs
+    ]
+
+# -----------------------------
+# COMPARAISON DES POLITIQUES CONTRE UN STUB LOCAL (FACULTATIF)
+# -----------------------------
+
+def run_order_stub(latency_seconds: float):
+    """Serveur HTTP local qui accuse chaque POST /api/v3/order comme FILLED après une latence fixe."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class OrderHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+        order_ids = iter(range(1, 10 ** 9))
+        lock = threading.Lock()
+
+        def do_POST(self):
+            time.sleep(latency_seconds)
+            with self.lock:
+                order_id = next(self.order_ids)
+            payload = json.dumps({"orderId": order_id, "status": "FILLED",
+                                  "transactTime": int(time.time() * 1000)}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OrderHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def benchmark_dispatch_policies(latency_seconds: float = 0.02, loops: int = 30) -> Dict[str, float]:
+    """Latence moyenne de complétion d'une boucle pour chaque politique, contre le stub local."""
+    server = run_order_stub(latency_seconds)
+    builder = OrderRequestBuilder("key", "secret", f"http://127.0.0.1:{server.server_address[1]}")
+    legs = [{"symbol": "BTCUSDT", "side": "BUY", "quantity": 0.0015},
+            {"symbol": "ETHBTC", "side": "BUY", "quantity": 0.042},
+            {"symbol": "ETHUSDT", "side": "SELL", "quantity": 0.042}]
+    client = HttpClient()
+    results = {}
+    for policy in DISPATCH_POLICIES:
+        dispatcher = OrderDispatcher(policy, client, pre_held_inventory=True)  # Le stub ne tient pas de soldes
+        dispatcher.dispatch(prepare_loop_orders(builder, legs), legs)  # Préchauffage des connexions
+        total = 0.0
+        for _ in range(loops):
+            trace = dispatcher.dispatch(prepare_loop_orders(builder, legs), legs)
+            if not trace.succeeded:
+                raise AssertionError(f"Boucle non exécutée : {trace.to_dict()}")
+            total += trace.completion_seconds
+        results[policy] = total / loops
+        dispatcher.close()
+    client.close()
+    server.shutdown()
+    return results
+
+if __name__ == "__main__":
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.02
+    for policy_name, seconds in benchmark_dispatch_policies(latency).items():
+        print(f"{policy_name:>10} : {seconds * 1e3:.2f} ms par boucle (latence stub {latency * 1e3:.0f} ms)")
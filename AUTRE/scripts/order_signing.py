@@ -0,0 +1,197 @@
+import sys
+import hmac
+import time
+import hashlib
+import threading
+from decimal import ROUND_DOWN, Decimal
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from instrumentation import span
+
+# -----------------------------
+# SIGNATURE HMAC-SHA256 AVEC CLÉ PRÉCALCULÉE
+# -----------------------------
+
+_keyed_hmacs: Dict[str, "hmac.HMAC"] = {}
+_keyed_hmacs_lock = threading.Lock()
+
+def keyed_hmac(secret_key: str) -> "hmac.HMAC":
+    """
+    Retourne l'objet HMAC-SHA256 déjà initialisé avec la clé secrète (créé une seule fois par clé).
+    Les blocs ipad/opad sont calculés à la création : chaque signature n'en fait qu'une copie.
+    """
+    base = _keyed_hmacs.get(secret_key)
+    if base is None:
+        with _keyed_hmacs_lock:
+            base = _keyed_hmacs.get(secret_key)
+            if base is None:
+                base = _keyed_hmacs[secret_key] = hmac.new(secret_key.encode(), digestmod=hashlib.sha256)
+    return base
+
+def sign_query(query_string: str, secret_key: str) -> str:
+    """Signe une chaîne de requête Binance en copiant le HMAC préinitialisé de la clé."""
+    with span("sign"):
+        signer = keyed_hmac(secret_key).copy()
+        signer.update(query_string.encode())
+        return signer.hexdigest()
+
+# -----------------------------
+# CONSTRUCTEUR DE REQUÊTES D'ORDRE
+# -----------------------------
+
+class SignedOrder(NamedTuple):
+    """Requête d'ordre prête à l'envoi : l'URL porte déjà la query string signée."""
+    url: str
+    query_string: str
+    signature: str
+    headers: Dict[str, str]
+
+class OrderRequestBuilder:
+    """
+    Prépare les requêtes POST /api/v3/order signées pour un couple (clé API, clé secrète).
+
+    La partie fixe de la query string (symbol, side, type) est mise en cache par triplet ;
+    seuls la quantité, l'horodatage et éventuellement le prix sont ajoutés à chaque ordre.
+    L'ordre des paramètres est celui de l'ancien place_order, donc les signatures sont identiques.
+    """
+
+    def __init__(self, api_key: str, secret_key: str, base_url: str = "https://api.binance.com"):
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.endpoint = f"{base_url.rstrip('/')}/api/v3/order"
+        self.headers = {"X-MBX-APIKEY": api_key}
+        self._hmac = keyed_hmac(secret_key)
+        self._templates: Dict[Tuple[str, str, str], str] = {}
+
+    def template(self, symbol: str, side: str, order_type: str = "MARKET") -> str:
+        """Préfixe fixe de la query string pour un triplet (symbole, sens, type)."""
+        key = (symbol, side, order_type)
+        prefix = self._templates.get(key)
+        if prefix is None:
+            prefix = self._templates[key] = f"symbol={symbol}&side={side}&type={order_type}&quantity="
+        return prefix
+
+    def build(self, symbol: str, side: str, quantity, order_type: str = "MARKET", price=None,
+              timestamp: Optional[int] = None) -> SignedOrder:
+        """
+        Construit et signe une requête d'ordre.
+
+        :param timestamp: Horodatage en millisecondes (par défaut : maintenant).
+        :return: SignedOrder à envoyer tel quel (POST sur url, sans params).
+        """
+        if timestamp is None:
+            timestamp = int(time.time() * 1000)
+        query_string = f"{self.template(symbol, side, order_type)}{quantity}&timestamp={timestamp}"
+        if order_type == "LIMIT" and price:
+            query_string = f"{query_string}&price={price}&timeInForce=GTC"
+        with span("sign"):
+            signer = self._hmac.copy()
+            signer.update(query_string.encode())
+            signature = signer.hexdigest()
+        return SignedOrder(f"{self.endpoint}?{query_string}&signature={signature}", query_string, signature, self.headers)
+
+# -----------------------------
+# ARRONDI DES QUANTITÉS (FILTRES LOT_SIZE ET NOTIONAL)
+# -----------------------------
+
+class LotSize(NamedTuple):
+    """Contraintes de quantité d'un symbole, tirées de /api/v3/exchangeInfo."""
+    step_size: Decimal
+    min_qty: Decimal
+    min_notional: Decimal
+
+def parse_lot_sizes(exchange_info: Dict[str, Any]) -> Dict[str, LotSize]:
+    """Filtres LOT_SIZE et NOTIONAL (ou MIN_NOTIONAL) de chaque symbole d'une réponse /exchangeInfo."""
+    lot_sizes = {}
+    for symbol in exchange_info.get("symbols", []):
+        filters = {entry.get("filterType"): entry for entry in symbol.get("filters", [])}
+        lot = filters.get("LOT_SIZE")
+        if lot is None:
+            continue
+        notional = filters.get("NOTIONAL") or filters.get("MIN_NOTIONAL") or {}
+        lot_sizes[symbol["symbol"]] = LotSize(Decimal(lot["stepSize"]), Decimal(lot["minQty"]),
+                                              Decimal(notional.get("minNotional", "0")))
+    return lot_sizes
+
+def format_quantity(quantity: float, lot_size: LotSize, price: Optional[float] = None) -> Optional[str]:
+    """
+    Arrondit une quantité au multiple de stepSize inférieur et la formate sans exposant
+    (« 0.00001 », jamais « 1e-05 », que l'échange rejette).
+
+    :param price: Prix attendu, pour vérifier minNotional (ignoré si None).
+    :return: Quantité prête pour la query string, ou None si elle passe sous minQty ou minNotional.
+    """
+    value = Decimal(repr(float(quantity)))
+    if lot_size.step_size > 0:
+        value = (value / lot_size.step_size).to_integral_value(rounding=ROUND_DOWN) * lot_size.step_size
+    if value <= 0 or value < lot_size.min_qty:
+        return None
+    if price is not None and value * Decimal(repr(float(price))) < lot_size.min_notional:
+        return None
+    return format(value.normalize(), "f")
+
+_builders: Dict[Tuple[str, str, str], OrderRequestBuilder] = {}
+
+def get_order_builder(api_key: str, secret_key: str, base_url: str = "https://api.binance.com") -> OrderRequestBuilder:
+    """Retourne le constructeur mis en cache pour ce couple de clés et cette URL de base."""
+    key = (api_key, secret_key, base_url)
+    builder = _builders.get(key)
+    if builder is None:
+        builder = _builders.setdefault(key, OrderRequestBuilder(api_key, secret_key, base_url))
+    return builder
+
+# -----------------------------
+# BENCHMARK DES REQUÊTES SIGNÉES (FACULTATIF)
+# -----------------------------
+
+def _legacy_signed_query(symbol, side, quantity, secret_key, order_type="MARKET", price=None, timestamp=0) -> str:
+    """Reproduction de l'ancien place_order : dict, join et HMAC recréé à chaque ordre."""
+    params = {"symbol": symbol, "side": side, "type": order_type, "quantity": quantity, "timestamp": timestamp}
+    if order_type == "LIMIT" and price:
+        params["price"] = price
+        params["timeInForce"] = "GTC"
+    query_string = "&".join([f"{key}={value}" for key, value in params.items()])
+    signature = hmac.new(secret_key.encode(), query_string.encode(), hashlib.sha256).hexdigest()
+    return f"{query_string}&signature={signature}"
+
+def benchmark_order_signing(order_count: int = 200000) -> Dict[str, float]:
+    """Requêtes signées construites par seconde : ancien chemin contre constructeur mis en cache."""
+    secret_key = "s" * 64
+    legs = [("BTCUSDT", "BUY", 0.0015), ("ETHBTC", "BUY", 0.042), ("ETHUSDT", "SELL", 0.042)]
+    builder = OrderRequestBuilder("k" * 64, secret_key)
+
+    # Vérification : mêmes query strings signées que l'ancien chemin, MARKET et LIMIT
+    for symbol, side, quantity in legs:
+        for order_type, price in (("MARKET", None), ("LIMIT", 123.45)):
+            order = builder.build(symbol, side, quantity, order_type, price, timestamp=1700000000000)
+            legacy = _legacy_signed_query(symbol, side, quantity, secret_key, order_type, price, 1700000000000)
+            if f"{order.query_string}&signature={order.signature}" != legacy:
+                raise AssertionError(f"Signature divergente pour {symbol} {side} {order_type}")
+
+    results = {}
+    start = time.perf_counter()
+    for i in range(order_count):
+        symbol, side, quantity = legs[i % 3]
+        _legacy_signed_query(symbol, side, quantity, secret_key, timestamp=int(time.time() * 1000))
+    results["legacy_per_second"] = order_count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(order_count):
+        symbol, side, quantity = legs[i % 3]
+        builder.build(symbol, side, quantity)
+    results["cached_per_second"] = order_count / (time.perf_counter() - start)
+
+    # Chemin critique d'une boucle triangulaire : trois signatures consécutives
+    start = time.perf_counter()
+    for _ in range(order_count // 3):
+        for symbol, side, quantity in legs:
+            builder.build(symbol, side, quantity)
+    results["loop_microseconds"] = (time.perf_counter() - start) / (order_count // 3) * 1e6
+    return results
+
+if __name__ == "__main__":
+    results = benchmark_order_signing(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
+    print(
+        f"Ancien chemin : {results['legacy_per_second']:.0f} req/s | "
+        f"constructeur : {results['cached_per_second']:.0f} req/s | "
+        f"3 jambes signées : {results['loop_microseconds']:.2f} µs"
+    )
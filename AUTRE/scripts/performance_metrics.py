@@ -1,6 +1,7 @@
 import json
+import time
 import logging
-from datetime import datetime
+from performance_rollups import PerformanceRollup
 
 # Configuration du logger
 logging.basicConfig(
@@ -13,7 +14,8 @@ logging.basicConfig(
 FILES = {
     "execution_results": "../data/execution_results.json",
     "metrics": "../data/metrics.json",
-    "trade_data": "../data/trade_data.json"
+    "trade_data": "../data/trade_data.json",
+    "performance_state": "../data/performance_state.json"  # Checkpoint compact des agrégats incrémentaux
 }
 
 # Chargement des fichiers JSON
@@ -39,8 +41,8 @@ def save_json(data, file_path):
     except Exception as e:
         logging.error(f"Erreur lors de la sauvegarde dans {file_path} : {e}")
 
-# Calcul des indicateurs avancés
-def calculate_performance_metrics():
+# Calcul des indicateurs avancés : seules les transactions postérieures au dernier checkpoint sont traitées
+def calculate_performance_metrics(rollup=None):
     execution_results = load_json(FILES["execution_results"])
     metrics = load_json(FILES["metrics"])
     trade_data = load_json(FILES["trade_data"])
@@ -49,38 +51,24 @@ def calculate_performance_metrics():
         logging.error("Impossible de calculer les métriques : données manquantes.")
         return
 
-    # Calcul des indicateurs
-    total_transactions = execution_results.get("summary", {}).get("total_transactions", 0)
-    successful_transactions = execution_results.get("summary", {}).get("successful_transactions", 0)
-    failed_transactions = execution_results.get("summary", {}).get("failed_transactions", 0)
-    total_profit = execution_results.get("summary", {}).get("total_profit", 0.0)
-    average_execution_time = execution_results.get("summary", {}).get("average_execution_time_seconds", 0.0)
+    # Reprise depuis l'état sauvegardé puis rattrapage des nouvelles transactions
+    rollup = rollup or PerformanceRollup.load(FILES["performance_state"])
+    new_transactions = rollup.catch_up(execution_results.get("transactions", []))
+    rollup.checkpoint(FILES["performance_state"])
 
-    active_orders = len(trade_data.get("active_orders", []))
-
-    # Calcul du ratio de succès
-    success_ratio = (successful_transactions / total_transactions) * 100 if total_transactions > 0 else 0
-
-    # Mises à jour des métriques
-    performance_data = {
-        "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
-        "total_transactions": total_transactions,
-        "successful_transactions": successful_transactions,
-        "failed_transactions": failed_transactions,
-        "success_ratio": success_ratio,
-        "total_profit": total_profit,
-        "average_execution_time": average_execution_time,
-        "active_orders": active_orders
-    }
+    # Mises à jour des métriques : fenêtres arrêtées à l'instant présent, pas au dernier trade
+    performance_data = rollup.snapshot(now=time.time())
+    performance_data["active_orders"] = len(trade_data.get("active_orders", []))
 
     # Ajout aux métriques locales
     metrics["performance"] = performance_data
     save_json(metrics, FILES["metrics"])
 
-    logging.info(f"Indicateurs de performance calculés et mis à jour : {performance_data}")
+    logging.info(f"Indicateurs de performance mis à jour ({new_transactions} nouvelles transactions) : {performance_data}")
+    return rollup
 
 # Exécution principale
 if __name__ == "__main__":
     logging.info("Début du calcul des indicateurs avancés de performance.")
     calculate_performance_metrics()
-    logging.info("Calcul des indicateurs de performance terminé.")
\ No newline at end of file
+    logging.info("Calcul des indicateurs de performance terminé.")
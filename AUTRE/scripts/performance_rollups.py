@@ -0,0 +1,370 @@
+import os
+import sys
+import json
+import math
+import time
+import random
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# -----------------------------
+# AGRÉGATS INCRÉMENTAUX DES RÉSULTATS D'EXÉCUTION
+# -----------------------------
+
+CHECKPOINT_VERSION = 1
+BUCKETS_PER_WINDOW = 60  # Résolution des fenêtres glissantes : 1 s pour 1m, 1 min pour 1h, 24 min pour 1d
+WINDOWS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+def transaction_time(transaction: Dict[str, Any]) -> Optional[float]:
+    """Horodatage (secondes epoch) d'une transaction de execution_results.json ; None si absent."""
+    timestamp = transaction.get("timestamp")
+    if not timestamp:
+        return None
+    return datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp()
+
+class RunningStats:
+    """Moyenne et variance de Welford : une mise à jour en O(1), fusion de deux états par la formule de Chan."""
+
+    __slots__ = ("count", "mean", "m2", "minimum", "maximum")
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0,
+                 minimum: float = math.inf, maximum: float = -math.inf):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def update(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        if other.count:
+            total = self.count + other.count
+            delta = other.mean - self.mean
+            self.m2 += other.m2 + delta * delta * self.count * other.count / total
+            self.mean += delta * other.count / total
+            self.count = total
+            self.minimum = min(self.minimum, other.minimum)
+            self.maximum = max(self.maximum, other.maximum)
+        return self
+
+    @property
+    def variance(self) -> float:
+        """Variance d'échantillon (0 tant qu'il y a moins de deux valeurs)."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def to_list(self) -> list:
+        return [self.count, self.mean, self.m2, self.minimum if self.count else None, self.maximum if self.count else None]
+
+    @classmethod
+    def from_list(cls, values: list) -> "RunningStats":
+        count, mean, m2, minimum, maximum = values
+        return cls(count, mean, m2, math.inf if minimum is None else minimum, -math.inf if maximum is None else maximum)
+
+class TumblingWindow:
+    """
+    Fenêtre fixe (minute, heure, jour calendaires) : compteurs de la fenêtre en cours et de la précédente.
+    Les événements plus anciens que la fenêtre en cours sont ignorés.
+    """
+
+    def __init__(self, size_seconds: int):
+        self.size = size_seconds
+        self.start: Optional[int] = None
+        self.current = [0, 0, 0.0]  # transactions, succès, profit
+        self.previous: Optional[list] = None
+
+    def add(self, timestamp: float, success: bool, profit: float) -> None:
+        start = int(timestamp // self.size) * self.size
+        if self.start is None or start > self.start:
+            if self.start is not None:
+                # Fenêtres sautées sans événement : la précédente est vide
+                gap = start != self.start + self.size
+                self.previous = [start - self.size, 0, 0, 0.0] if gap else [self.start] + self.current
+            self.start, self.current = start, [0, 0, 0.0]
+        elif start < self.start:
+            return
+        self.current[0] += 1
+        self.current[1] += success
+        self.current[2] += profit
+
+    def values(self, now: Optional[float] = None) -> Tuple[Optional[int], list]:
+        """(début, [transactions, succès, profit]) de la fenêtre contenant now (dernier événement si None), sans modifier l'état."""
+        if now is not None:
+            start = int(now // self.size) * self.size
+            if self.start is None or start > self.start:
+                return start, [0, 0, 0.0]
+        return self.start, list(self.current)
+
+    def to_list(self) -> list:
+        return [self.start, self.current, self.previous]
+
+    def load(self, values: list) -> None:
+        self.start, self.current, self.previous = values
+
+class SlidingWindow:
+    """
+    Fenêtre glissante découpée en BUCKETS_PER_WINDOW seaux circulaires avec totaux maintenus.
+
+    Ajouter un événement ne parcourt que les seaux périmés depuis le dernier passage, et lire la
+    fenêtre à un instant postérieur au dernier événement au plus tous les seaux : le coût est
+    borné par le nombre de seaux, jamais par l'historique.
+    """
+
+    def __init__(self, size_seconds: int, buckets: int = BUCKETS_PER_WINDOW):
+        self.size = size_seconds
+        self.bucket_seconds = size_seconds / buckets
+        self.ids = [-1] * buckets
+        self.counts = [[0, 0, 0.0] for _ in range(buckets)]
+        self.totals = [0, 0, 0.0]
+        self.newest = -1
+
+    def _advance(self, bucket_id: int) -> None:
+        if bucket_id <= self.newest:
+            return
+        for expired in range(max(self.newest + 1, bucket_id - len(self.ids) + 1), bucket_id + 1):
+            slot = expired % len(self.ids)
+            if self.ids[slot] != expired:
+                old = self.counts[slot]
+                self.totals = [self.totals[0] - old[0], self.totals[1] - old[1], self.totals[2] - old[2]]
+                if not self.totals[0]:
+                    self.totals[2] = 0.0  # Fenêtre vide : on efface les résidus d'arrondi des soustractions
+                self.counts[slot] = [0, 0, 0.0]
+                self.ids[slot] = expired
+        self.newest = bucket_id
+
+    def add(self, timestamp: float, success: bool, profit: float) -> None:
+        bucket_id = int(timestamp // self.bucket_seconds)
+        self._advance(bucket_id)
+        if bucket_id <= self.newest - len(self.ids):
+            return  # Plus ancien que la fenêtre
+        bucket = self.counts[bucket_id % len(self.ids)]
+        bucket[0] += 1
+        bucket[1] += success
+        bucket[2] += profit
+        self.totals[0] += 1
+        self.totals[1] += success
+        self.totals[2] += profit
+
+    def values(self, now: Optional[float] = None) -> list:
+        """Totaux [transactions, succès, profit] de la fenêtre se terminant à now (dernier événement si None), sans modifier l'état."""
+        bucket_id = None if now is None else int(now // self.bucket_seconds)
+        if bucket_id is None or bucket_id <= self.newest:
+            return list(self.totals)
+        values = [0, 0, 0.0]
+        for slot_id, counts in zip(self.ids, self.counts):
+            if slot_id > bucket_id - len(self.ids):
+                values = [values[0] + counts[0], values[1] + counts[1], values[2] + counts[2]]
+        return values
+
+    def to_list(self) -> list:
+        return [self.newest, self.ids, self.counts, self.totals]
+
+    def load(self, values: list) -> None:
+        self.newest, self.ids, self.counts, self.totals = values
+
+def _window_summary(values: list) -> Dict[str, Any]:
+    total, successful, profit = values
+    return {"transactions": total, "successful_transactions": successful, "profit": profit,
+            "success_ratio": successful / total * 100 if total else 0}
+
+class PerformanceRollup:
+    """
+    Indicateurs de performance tenus à jour transaction par transaction.
+
+    update() replie une transaction de execution_results.json dans les compteurs, les statistiques
+    de temps d'exécution et les fenêtres 1m/1h/1d ; offset mémorise le nombre de transactions déjà
+    consommées pour que catch_up() ne traite que les nouvelles. L'état complet tient en quelques Ko
+    et se sauvegarde avec checkpoint().
+    """
+
+    def __init__(self):
+        self.offset = 0
+        self.total = 0
+        self.successful = 0
+        self.failed = 0
+        self.total_profit = 0.0
+        self.execution_time = RunningStats()
+        self.last_timestamp: Optional[float] = None
+        self.tumbling = {name: TumblingWindow(size) for name, size in WINDOWS.items()}
+        self.sliding = {name: SlidingWindow(size) for name, size in WINDOWS.items()}
+
+    def update(self, transaction: Dict[str, Any]) -> None:
+        # Sans horodatage, la transaction est rangée à l'instant du dernier événement connu : une
+        # reconstruction depuis l'offset 0 retrouve ainsi exactement les mêmes fenêtres
+        timestamp = transaction_time(transaction)
+        if timestamp is None:
+            timestamp = self.last_timestamp
+        success = transaction.get("status") == "success"
+        profit = float(transaction.get("profit", 0.0) or 0.0)
+        self.offset += 1
+        self.total += 1
+        self.successful += success
+        self.failed += not success
+        self.total_profit += profit
+        if transaction.get("execution_time_seconds") is not None:
+            self.execution_time.update(float(transaction["execution_time_seconds"]))
+        if timestamp is None:
+            return  # Aucun événement daté encore vu : compteurs à jour, fenêtres inchangées
+        self.last_timestamp = timestamp if self.last_timestamp is None else max(self.last_timestamp, timestamp)
+        for window in self.tumbling.values():
+            window.add(timestamp, success, profit)
+        for window in self.sliding.values():
+            window.add(timestamp, success, profit)
+
+    def catch_up(self, transactions: List[Dict[str, Any]]) -> int:
+        """
+        Traite les transactions au-delà de offset.
+
+        :param transactions: Liste complète des transactions de execution_results.json.
+        :return: Nombre de transactions nouvellement prises en compte.
+        """
+        if len(transactions) < self.offset:
+            # Fichier tronqué ou réinitialisé : l'offset ne désigne plus les mêmes lignes
+            self.__init__()
+        new = transactions[self.offset:]
+        for transaction in new:
+            self.update(transaction)
+        return len(new)
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Indicateurs au format de metrics.json["performance"], complétés des statistiques et des fenêtres.
+
+        :param now: Fin des fenêtres (secondes epoch) ; None les arrête au dernier événement (rejeu, tests).
+        """
+        tumbling = {name: self.tumbling[name].values(now) for name in WINDOWS}
+        return {
+            "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "total_transactions": self.total,
+            "successful_transactions": self.successful,
+            "failed_transactions": self.failed,
+            "success_ratio": self.successful / self.total * 100 if self.total else 0,
+            "total_profit": self.total_profit,
+            "average_execution_time": self.execution_time.mean,
+            "execution_time_stddev": self.execution_time.stddev,
+            "min_execution_time": self.execution_time.minimum if self.execution_time.count else None,
+            "max_execution_time": self.execution_time.maximum if self.execution_time.count else None,
+            "windows": {
+                name: {
+                    "sliding": _window_summary(self.sliding[name].values(now)),
+                    "tumbling": dict(start=tumbling[name][0], **_window_summary(tumbling[name][1])),
+                }
+                for name in WINDOWS
+            },
+        }
+
+    # -----------------------------
+    # SAUVEGARDE DE L'ÉTAT
+    # -----------------------------
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": CHECKPOINT_VERSION,
+            "offset": self.offset,
+            "counters": [self.total, self.successful, self.failed, self.total_profit],
+            "execution_time": self.execution_time.to_list(),
+            "last_timestamp": self.last_timestamp,
+            "tumbling": {name: window.to_list() for name, window in self.tumbling.items()},
+            "sliding": {name: window.to_list() for name, window in self.sliding.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "PerformanceRollup":
+        rollup = cls()
+        if state.get("version") != CHECKPOINT_VERSION:
+            return rollup  # Format inconnu : reconstruction complète depuis l'offset 0
+        rollup.offset = state["offset"]
+        rollup.total, rollup.successful, rollup.failed, rollup.total_profit = state["counters"]
+        rollup.execution_time = RunningStats.from_list(state["execution_time"])
+        rollup.last_timestamp = state["last_timestamp"]
+        for name, values in state["tumbling"].items():
+            rollup.tumbling[name].load(values)
+        for name, values in state["sliding"].items():
+            rollup.sliding[name].load(values)
+        return rollup
+
+    def checkpoint(self, path: str) -> None:
+        """Écrit l'état en JSON compact, de façon atomique (fichier temporaire puis os.replace)."""
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(self.to_dict(), file, separators=(",", ":"))
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> "PerformanceRollup":
+        """Recharge un état sauvegardé ; état vide si le fichier est absent ou illisible."""
+        try:
+            with open(path) as file:
+                return cls.from_dict(json.load(file))
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+            return cls()
+
+# -----------------------------
+# BENCHMARK : RECALCUL COMPLET CONTRE MISE À JOUR INCRÉMENTALE (FACULTATIF)
+# -----------------------------
+
+def _synthetic_transactions(count: int, start: float = 1_731_837_600.0) -> Iterable[Dict[str, Any]]:
+    rng = random.Random(11)
+    for i in range(count):
+        success = rng.random() < 0.8
+        yield {"transaction_id": f"txn_{i}", "profit": rng.uniform(0, 20) if success else -rng.uniform(0, 5),
+               "timestamp": datetime.fromtimestamp(start + i * 0.5, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+               "status": "success" if success else "failed", "execution_time_seconds": rng.uniform(0.1, 1.0)}
+
+def _full_recompute(transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Recalcul complet à chaque exécution, comme le faisait calculate_performance_metrics."""
+    successful = sum(1 for t in transactions if t["status"] == "success")
+    times = [t["execution_time_seconds"] for t in transactions]
+    return {"total_transactions": len(transactions), "successful_transactions": successful,
+            "total_profit": sum(t["profit"] for t in transactions), "average_execution_time": sum(times) / len(times)}
+
+def benchmark_rollups(history_sizes=(10_000, 100_000, 1_000_000), new_trades: int = 100) -> List[Dict[str, float]]:
+    results = []
+    for size in history_sizes:
+        transactions = list(_synthetic_transactions(size + new_trades))
+        history = transactions[:size]
+        rollup = PerformanceRollup()
+        rollup.catch_up(history)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "performance_state.json")
+            rollup.checkpoint(path)
+            checkpoint_bytes = os.path.getsize(path)
+
+            start = time.perf_counter()
+            for n in range(size + 1, size + new_trades + 1):
+                _full_recompute(transactions[:n])
+            full_us = (time.perf_counter() - start) / new_trades * 1e6
+
+            start = time.perf_counter()
+            for transaction in transactions[size:]:
+                rollup.update(transaction)
+            rollup.snapshot()
+            incremental_us = (time.perf_counter() - start) / new_trades * 1e6
+
+            restored = PerformanceRollup.load(path)
+            restored.catch_up(transactions)
+            if restored.to_dict() != rollup.to_dict():
+                raise AssertionError("Reprise depuis le checkpoint différente du calcul continu")
+        expected = _full_recompute(transactions)
+        if abs(expected["average_execution_time"] - rollup.execution_time.mean) > 1e-9:
+            raise AssertionError("Moyenne de Welford différente du recalcul complet")
+        results.append({"history": size, "full_us": full_us, "incremental_us": incremental_us,
+                        "checkpoint_bytes": checkpoint_bytes})
+    return results
+
+if __name__ == "__main__":
+    sizes = tuple(int(value) for value in sys.argv[1:]) or (10_000, 100_000, 1_000_000)
+    for r in benchmark_rollups(sizes):
+        print(f"Historique {r['history']:>8} | recalcul complet {r['full_us']:>10.0f} µs/trade | "
+              f"incrémental {r['incremental_us']:.1f} µs/trade | checkpoint {r['checkpoint_bytes']} octets")
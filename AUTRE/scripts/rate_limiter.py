@@ -0,0 +1,358 @@
+import sys
+import time
+import heapq
+import random
+import threading
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+from prometheus_client import Counter
+from log_pipeline import get_logger
+
+# -----------------------------
+# LIMITES DE POIDS BINANCE (SEAUX À JETONS PAR CLÉ API)
+# -----------------------------
+
+REQUEST_WEIGHT_PER_MINUTE = 6000  # Limite REQUEST_WEIGHT de Binance sur une minute
+USED_WEIGHT_HEADER = "X-MBX-USED-WEIGHT-1M"  # Poids consommé dans la minute, renvoyé à chaque réponse
+DEFAULT_RETRY_AFTER = {429: 60.0, 418: 120.0}  # Attente si Retry-After est absent (418 : bannissement)
+
+# Poids des endpoints REST utilisés par les scripts (barème Binance)
+ENDPOINT_WEIGHTS = {
+    "/api/v3/exchangeInfo": 20,
+    "/api/v3/order": 1,
+    "/api/v3/account": 20,
+    "/api/v3/ping": 1,
+    "/api/v3/time": 1,
+}
+
+rate_limit_responses = Counter("rate_limit_responses_total", "Réponses 429/418 reçues de l'échange", ["status"])
+
+logger = get_logger("rate_limiter")
+
+def request_weight(path: str, params: Optional[Mapping] = None) -> int:
+    """Poids d'une requête REST d'après son endpoint et ses paramètres (profondeur, symbole)."""
+    params = params or {}
+    if path == "/api/v3/depth":
+        limit = int(params.get("limit", 100))
+        return 5 if limit <= 100 else 25 if limit <= 500 else 50 if limit <= 1000 else 250
+    if path == "/api/v3/ticker/24hr":
+        return 2 if "symbol" in params else 80
+    return ENDPOINT_WEIGHTS.get(path, 1)
+
+class TokenBucket:
+    """
+    Seau de capacity jetons (unités de poids) rechargé en continu à refill_per_second.
+
+    La recharge court à partir de updated, qui peut être dans le futur : après une synchronisation
+    sur l'échange, rien n'est rendu avant la fin de sa fenêtre d'une minute. Le score
+    tokens - refill_per_second * updated ne dépend pas de l'instant de lecture : à taux de recharge
+    égal, il ordonne les clés par budget restant sans les recalculer toutes. Pour un seau daté dans
+    le futur, le budget est tokens jusqu'à updated : le score est alors calculé à l'instant présent.
+    """
+
+    __slots__ = ("capacity", "refill_per_second", "tokens", "updated", "blocked_until")
+
+    def __init__(self, capacity: float, refill_per_second: float, now: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = float(capacity)
+        self.updated = now
+        self.blocked_until = 0.0
+
+    def available(self, now: float) -> float:
+        if now <= self.updated:
+            return self.tokens
+        return min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+
+    def score(self, now: float) -> float:
+        return self.tokens - self.refill_per_second * min(self.updated, now)
+
+    def consume(self, weight: float, now: float) -> float:
+        """Prélève weight jetons ; retourne 0 si c'est fait, sinon l'attente nécessaire en secondes."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        tokens = self.available(now)
+        if tokens >= weight:
+            self.tokens, self.updated = tokens - weight, max(now, self.updated)
+            return 0.0
+        return max(self.updated - now, 0.0) + (weight - tokens) / self.refill_per_second
+
+    def sync(self, remaining: float, window_end: float) -> None:
+        """Aligne le seau sur le budget restant annoncé par l'échange, sans recharge avant window_end."""
+        self.tokens, self.updated = max(0.0, min(self.capacity, remaining)), window_end
+
+class RateLimiter:
+    """
+    Seaux à jetons par clé API, débités du poids de chaque endpoint et resynchronisés sur
+    X-MBX-USED-WEIGHT-1M ; un 429 ou un 418 suspend la clé pendant Retry-After.
+
+    Les clés disponibles sont rangées dans un tas par budget restant : try_acquire() sans clé
+    prend la mieux dotée en O(log k), ou la suivante dans le tas si elle ne peut pas fournir le poids. acquire() attend le temps nécessaire au lieu d'échouer.
+
+    :param weight_per_minute: Capacité de chaque seau (part du budget réservée à ce processus).
+    :param server_limit: Limite de l'échange à laquelle se rapporte le poids consommé des en-têtes.
+    :param wall_clock: Heure murale, qui situe les fenêtres d'une minute de l'échange.
+    """
+
+    def __init__(self, api_keys: Iterable[str] = (), weight_per_minute: float = REQUEST_WEIGHT_PER_MINUTE,
+                 server_limit: float = REQUEST_WEIGHT_PER_MINUTE, clock: Callable[[], float] = time.monotonic,
+                 wall_clock: Callable[[], float] = time.time):
+        self.weight_per_minute = weight_per_minute
+        self.server_limit = server_limit
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.buckets: Dict[str, TokenBucket] = {}
+        self._versions: Dict[str, int] = {}
+        self._ready: List[Tuple[float, int, str]] = []  # (-score, version, clé), entrées périmées ignorées
+        self._blocked: List[Tuple[float, str]] = []  # (fin de suspension, clé)
+        self._lock = threading.Lock()
+        for api_key in api_keys:
+            self.add_key(api_key)
+
+    def add_key(self, api_key: str) -> None:
+        with self._lock:
+            self._add_key_locked(api_key)
+
+    def _add_key_locked(self, api_key: str) -> TokenBucket:
+        bucket = self.buckets.get(api_key)
+        if bucket is None:
+            bucket = TokenBucket(self.weight_per_minute, self.weight_per_minute / 60.0, self.clock())
+            self.buckets[api_key] = bucket
+            self._push_locked(api_key, bucket)
+        return bucket
+
+    def _push_locked(self, api_key: str, bucket: TokenBucket) -> None:
+        version = self._versions.get(api_key, 0) + 1
+        self._versions[api_key] = version
+        if bucket.blocked_until > self.clock():
+            heapq.heappush(self._blocked, (bucket.blocked_until, api_key))
+            return
+        heapq.heappush(self._ready, (-bucket.score(self.clock()), version, api_key))
+        if len(self._ready) > 4 * len(self.buckets) + 16:
+            # Compactage : une seule entrée à jour par clé
+            self._ready = [entry for entry in self._ready if self._versions[entry[2]] == entry[1]]
+            heapq.heapify(self._ready)
+
+    def _best_key_locked(self, now: float) -> Optional[str]:
+        while self._blocked and self._blocked[0][0] <= now:
+            _, api_key = heapq.heappop(self._blocked)
+            bucket = self.buckets[api_key]
+            if bucket.blocked_until <= now:
+                self._push_locked(api_key, bucket)
+        while self._ready:
+            _, version, api_key = self._ready[0]
+            if self._versions[api_key] == version:
+                return api_key
+            heapq.heappop(self._ready)
+        return None
+
+    def _reserve(self, weight: float, api_key: Optional[str]) -> Tuple[Optional[str], float]:
+        """Débite weight sur api_key (ou la clé la mieux dotée) ; retourne (clé, 0) ou (None, attente)."""
+        if weight > self.weight_per_minute:
+            raise ValueError(f"Poids {weight} supérieur à la capacité d'un seau ({self.weight_per_minute})")
+        with self._lock:
+            now = self.clock()
+            if api_key is None:
+                return self._reserve_best_locked(weight, now)
+            bucket = self._add_key_locked(api_key)
+            wait = bucket.consume(weight, now)
+            if wait > 0:
+                return None, wait
+            self._push_locked(api_key, bucket)
+            return api_key, 0.0
+
+    def _reserve_best_locked(self, weight: float, now: float) -> Tuple[Optional[str], float]:
+        """
+        Débite la première clé du tas capable de fournir weight : le score n'étant qu'une estimation
+        (plafond du seau, recharge différée), la tête du tas peut manquer de budget alors qu'une
+        autre clé suffit. Les entrées écartées sont remises dans le tas.
+        """
+        skipped = []
+        wait = None
+        try:
+            while True:
+                api_key = self._best_key_locked(now)
+                if api_key is None:
+                    break
+                bucket = self.buckets[api_key]
+                key_wait = bucket.consume(weight, now)
+                if key_wait <= 0:
+                    self._push_locked(api_key, bucket)
+                    return api_key, 0.0
+                wait = key_wait if wait is None else min(wait, key_wait)
+                skipped.append(heapq.heappop(self._ready))
+        finally:
+            for entry in skipped:
+                heapq.heappush(self._ready, entry)
+        if self._blocked:
+            blocked_wait = self._blocked[0][0] - now
+            wait = blocked_wait if wait is None else min(wait, blocked_wait)
+        if wait is None:
+            raise ValueError("Aucune clé API enregistrée dans le limiteur")
+        return None, wait
+
+    def try_acquire(self, weight: float = 1, api_key: Optional[str] = None) -> Optional[str]:
+        """Débite sans attendre ; retourne la clé utilisée, ou None si aucun budget n'est disponible."""
+        return self._reserve(weight, api_key)[0]
+
+    def acquire(self, weight: float = 1, api_key: Optional[str] = None, timeout: Optional[float] = None) -> str:
+        """Attend qu'une clé (api_key, ou la mieux dotée) dispose de weight jetons, puis les débite."""
+        deadline = None if timeout is None else self.clock() + timeout
+        while True:
+            selected, wait = self._reserve(weight, api_key)
+            if selected is not None:
+                return selected
+            if deadline is not None and self.clock() + wait > deadline:
+                raise TimeoutError(f"Budget de poids insuffisant pendant {timeout} s")
+            time.sleep(wait)
+
+    def update_from_response(self, api_key: str, status_code: int, headers: Mapping) -> None:
+        """
+        Resynchronise la clé sur la réponse de l'échange (requests ou dict d'en-têtes) :
+        poids consommé de la minute, puis suspension Retry-After sur 429 (limite) ou 418 (bannissement).
+        """
+        used = headers.get(USED_WEIGHT_HEADER) or headers.get(USED_WEIGHT_HEADER.lower())
+        with self._lock:
+            now = self.clock()
+            window_end = now + 60.0 - self.wall_clock() % 60.0  # Fenêtres alignées sur la minute
+            bucket = self._add_key_locked(api_key)
+            if used is not None:
+                bucket.sync(self.server_limit - float(used), window_end)
+            if status_code in DEFAULT_RETRY_AFTER:
+                retry_after = headers.get("Retry-After") or headers.get("retry-after")
+                delay = float(retry_after) if retry_after else DEFAULT_RETRY_AFTER[status_code]
+                bucket.blocked_until = max(bucket.blocked_until, now + delay)
+                bucket.sync(0.0, max(window_end, bucket.blocked_until))
+                rate_limit_responses.labels(str(status_code)).inc()
+                logger.warning("Clé API %s… suspendue %s s (statut %s)", api_key[:8], delay, status_code)
+            self._push_locked(api_key, bucket)
+
+    def available(self, api_key: str) -> float:
+        """Jetons disponibles pour la clé (0 pendant une suspension)."""
+        with self._lock:
+            bucket = self.buckets.get(api_key)
+            now = self.clock()
+            if bucket is None or now < bucket.blocked_until:
+                return 0.0
+            return bucket.available(now)
+
+    def snapshot(self) -> Dict[str, float]:
+        return {api_key: self.available(api_key) for api_key in list(self.buckets)}
+
+# -----------------------------
+# SIMULATION CONTRE LE COMPTEUR DE REQUÊTES HISTORIQUE (FACULTATIF)
+# -----------------------------
+
+class _VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+class _SimulatedExchange:
+    """Fenêtre fixe d'une minute par clé, comme le REQUEST_WEIGHT de Binance, avec Retry-After jusqu'à la minute suivante."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used: Dict[str, Tuple[int, int]] = {}
+        self.banned_until: Dict[str, float] = {}
+        self.accepted_weight = 0
+        self.rejected = 0
+
+    def request(self, api_key: str, weight: int, now: float) -> Tuple[int, Dict[str, str]]:
+        minute = int(now // 60)
+        window, used = self.used.get(api_key, (minute, 0))
+        used = used if window == minute else 0
+        if now < self.banned_until.get(api_key, 0.0):
+            self.rejected += 1
+            return 418, {"Retry-After": str(int(self.banned_until[api_key] - now) + 1)}
+        used += weight
+        self.used[api_key] = (minute, used)
+        if used > self.limit:
+            self.rejected += 1
+            self.banned_until[api_key] = (minute + 1) * 60.0  # Clé insistante : bannie jusqu'à la minute suivante
+            return 429, {USED_WEIGHT_HEADER: str(used), "Retry-After": str(int((minute + 1) * 60 - now) + 1)}
+        self.accepted_weight += weight
+        return 200, {USED_WEIGHT_HEADER: str(used)}
+
+def _workload(seed: int = 7) -> Callable[[], Tuple[str, int]]:
+    rng = random.Random(seed)
+    endpoints = [("/api/v3/depth", {"limit": 5}), ("/api/v3/depth", {"limit": 500}), ("/api/v3/order", {}),
+                 ("/api/v3/ticker/24hr", {"symbol": "BTCUSDT"}), ("/api/v3/exchangeInfo", {})]
+    mix = [0.5, 0.05, 0.33, 0.1, 0.02]
+    return lambda: (lambda e: (e[0], request_weight(*e)))(rng.choices(endpoints, mix)[0])
+
+def simulate(keys: int = 29, minutes: int = 3, requests_per_second: float = 600.0) -> Dict[str, Dict[str, float]]:
+    """
+    Charge supérieure aux limites répartie sur keys clés, en temps virtuel : compteur de requêtes
+    historique (1200 requêtes par fenêtre, poids ignorés) contre seaux à jetons pondérés.
+    """
+    api_keys = [f"key{i:02d}" for i in range(keys)]
+    step = 1.0 / requests_per_second
+    total = int(minutes * 60 * requests_per_second)
+    results = {}
+
+    # Ancien API_USAGE_TRACKER : compteur par clé, parcours linéaire des clés
+    exchange, clock, next_request = _SimulatedExchange(REQUEST_WEIGHT_PER_MINUTE), _VirtualClock(), _workload()
+    tracker = {api_key: {"requests": 0, "last_reset": 0.0} for api_key in api_keys}
+    throttled = 0
+    for i in range(total):
+        clock.now = i * step
+        _, weight = next_request()
+        for api_key, usage in tracker.items():
+            if clock.now - usage["last_reset"] > 60:
+                usage["requests"], usage["last_reset"] = 0, clock.now
+            if usage["requests"] < 1200:
+                usage["requests"] += 1
+                exchange.request(api_key, weight, clock.now)
+                break
+        else:
+            throttled += 1
+    results["request_counter"] = {"rejected": exchange.rejected, "throttled": throttled,
+                                  "weight_per_key_minute": exchange.accepted_weight / keys / minutes}
+
+    exchange, clock, next_request = _SimulatedExchange(REQUEST_WEIGHT_PER_MINUTE), _VirtualClock(), _workload()
+    limiter = RateLimiter(api_keys, clock=clock, wall_clock=clock)
+    throttled = 0
+    for i in range(total):
+        clock.now = i * step
+        _, weight = next_request()
+        api_key = limiter.try_acquire(weight)
+        if api_key is None:
+            throttled += 1
+            continue
+        status, headers = exchange.request(api_key, weight, clock.now)
+        limiter.update_from_response(api_key, status, headers)
+    results["token_buckets"] = {"rejected": exchange.rejected, "throttled": throttled,
+                                "weight_per_key_minute": exchange.accepted_weight / keys / minutes}
+    return results
+
+def benchmark_key_selection(keys: int, iterations: Optional[int] = None) -> Dict[str, float]:
+    """Coût de choix d'une clé : parcours linéaire du tracker historique contre tas par budget restant."""
+    iterations = iterations or max(2000, 2_000_000 // keys)
+    api_keys = [f"key{i:04d}" for i in range(keys)]
+    tracker = {api_key: {"requests": 1200 if i < keys - 1 else 0, "last_reset": time.time()}
+               for i, api_key in enumerate(api_keys)}  # Pire cas : seule la dernière clé a du budget
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for api_key, usage in tracker.items():
+            if time.time() - usage["last_reset"] <= 60 and usage["requests"] < 1200:
+                break
+    linear = (time.perf_counter() - start) / iterations * 1e6
+    limiter = RateLimiter(api_keys, weight_per_minute=1e12)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        limiter.try_acquire(1)
+    heap = (time.perf_counter() - start) / iterations * 1e6
+    return {"linear_us": linear, "heap_us": heap}
+
+if __name__ == "__main__":
+    keys = int(sys.argv[1]) if len(sys.argv) > 1 else 29
+    for requests_per_second in (600.0, 800.0):  # Charge dans la limite des clés, puis au-delà
+        print(f"{requests_per_second:.0f} requêtes/s sur {keys} clés :")
+        for name, r in simulate(keys, requests_per_second=requests_per_second).items():
+            print(f"  {name:>15} : {r['rejected']} réponses 429/418 | {r['throttled']} requêtes retenues localement | "
+                  f"{r['weight_per_key_minute']:.0f} de poids accepté par clé et par minute")
+    for k in (29, 1000):
+        r = benchmark_key_selection(k)
+        print(f"Choix d'une clé parmi {k} : parcours linéaire {r['linear_us']:.2f} µs | tas {r['heap_us']:.2f} µs")
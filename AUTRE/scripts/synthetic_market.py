@@ -0,0 +1,26 @@
+import random
+
+# -----------------------------
+# MARCHÉ SYNTHÉTIQUE (BENCHMARKS, ÉCHANGE SIMULÉ, TESTS)
+# -----------------------------
+
+def generate_synthetic_market(symbol_count: int, seed: int = 42) -> list:
+    """
+    Génère un marché synthétique de paires {symbol, base, quote, price} sans doublon.
+    Le nombre d'actifs croît avec la racine du nombre de symboles, comme sur un vrai exchange
+    où quelques devises de cotation (USDT, BTC, ETH...) concentrent la majorité des paires.
+    """
+    rng = random.Random(seed)
+    asset_count = max(8, int((symbol_count * 4) ** 0.5))
+    assets = [f"A{i:04d}" for i in range(asset_count)]
+    quotes = assets[:max(4, asset_count // 8)]
+
+    pairs, seen = [], set()
+    while len(pairs) < symbol_count:
+        quote = rng.choice(quotes) if rng.random() < 0.8 else rng.choice(assets)
+        base = rng.choice(assets)
+        if base == quote or (base, quote) in seen or (quote, base) in seen:
+            continue
+        seen.add((base, quote))
+        pairs.append({"symbol": f"{base}{quote}", "base": base, "quote": quote, "price": rng.uniform(0.01, 100.0)})
+    return pairs
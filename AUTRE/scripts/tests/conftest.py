@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Les scripts sont des modules plats importés par leur nom (from helpers import ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Pas de Pushgateway pendant les tests : update_metrics ne pousse rien
+os.environ.setdefault("ARBITRAGE_PUSHGATEWAY_URL", "")
@@ -0,0 +1,53 @@
+import os
+from decimal import Decimal
+
+import pytest
+
+if not os.path.exists("/config/config.yml"):
+    pytest.skip("arbitrage_execution lit /config/config.yml à l'import", allow_module_level=True)
+
+import arbitrage_execution
+from order_book_store import OrderBookStore
+from order_signing import LotSize
+
+# USDT -> BTC -> ETH -> USDT, rentable de 1 % sur le premier niveau
+LOOP = [
+    {"symbol": "BTCUSDT", "side": "BUY", "quantity": 0.01},
+    {"symbol": "ETHBTC", "side": "SELL", "quantity": 0.2},
+    {"symbol": "ETHUSDT", "side": "SELL", "quantity": 0.2},
+]
+
+@pytest.fixture
+def books(monkeypatch):
+    store = OrderBookStore()
+    monkeypatch.setattr(arbitrage_execution, "order_book_cache", store)
+    monkeypatch.setitem(arbitrage_execution.config, "trading_fee", 0.0)
+    store.update("BTCUSDT", [["49990", "1"]], [["50000", "0.1"]])
+    store.update("ETHBTC", [["20.2", "1"]], [["20.3", "1"]])  # Base BTC, cotation ETH dans la boucle de test
+    return store
+
+def test_loop_is_skipped_when_a_book_is_missing(books):
+    assert arbitrage_execution.loop_size_ratio(LOOP) is None  # ETHUSDT inconnu
+    books.update("ETHUSDT", [["2500", "1000"]], [["2501", "1000"]])
+    assert 0 < arbitrage_execution.loop_size_ratio(LOOP) <= 1
+
+def test_sized_legs_round_to_step_and_skip_loops_below_min_qty(books, monkeypatch):
+    books.update("ETHUSDT", [["2500", "1000"]], [["2501", "1000"]])
+    lot_size = LotSize(Decimal("0.0001"), Decimal("0.0001"), Decimal("0"))
+    monkeypatch.setattr(arbitrage_execution, "symbol_lot_sizes", {trade["symbol"]: lot_size for trade in LOOP})
+
+    legs = arbitrage_execution.sized_legs(LOOP, 0.12345)
+    assert [leg["quantity"] for leg in legs] == ["0.0012", "0.0246", "0.0246"]
+    assert arbitrage_execution.sized_legs(LOOP, 0.001) is None  # 0.00001 BTC < minQty 0.0001
+
+    del arbitrage_execution.symbol_lot_sizes["ETHBTC"]
+    assert arbitrage_execution.sized_legs(LOOP, 0.5) is None  # Filtre inconnu : boucle ignorée
+
+def test_tick_is_skipped_when_a_book_side_is_empty(books, monkeypatch):
+    ticks = []
+    monkeypatch.setattr(arbitrage_execution, "loop_repricer", None)
+    monkeypatch.setattr(arbitrage_execution, "tick_store", type("Ticks", (), {"append": staticmethod(ticks.append)}))
+    books.update("ETHUSDT", [["2500", "1000"]], [])
+    arbitrage_execution.on_book_update("ETHUSDT")
+    arbitrage_execution.on_book_update("BTCUSDT")
+    assert [tick["symbol"] for tick in ticks] == ["BTCUSDT"]
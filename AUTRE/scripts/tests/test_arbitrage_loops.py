@@ -0,0 +1,48 @@
+import math
+from arbitrage_loops import LoopRepricer, calculate_profit, find_arbitrage_loops
+
+def make_pairs():
+    return [
+        {"symbol": "BTCUSDT", "base": "USDT", "quote": "BTC", "price": 1 / 50000},
+        {"symbol": "ETHBTC", "base": "BTC", "quote": "ETH", "price": 15.0},
+        {"symbol": "ETHUSDT", "base": "ETH", "quote": "USDT", "price": 3400.0},
+        {"symbol": "BNBBTC", "base": "BTC", "quote": "BNB", "price": 120.0},
+        {"symbol": "BNBUSDT", "base": "BNB", "quote": "USDT", "price": 420.0},
+    ]
+
+def test_update_price_reprices_copies_without_touching_inputs():
+    pairs = make_pairs()
+    snapshot = [dict(pair) for pair in pairs]
+    repricer = LoopRepricer(find_arbitrage_loops(pairs), trading_fee=0.001)
+
+    repricer.update_price("ETHUSDT", 3500.0, 3501.0)
+
+    assert pairs == snapshot
+    for loop, profit in repricer.top(len(repricer.loops)):
+        assert profit == calculate_profit(loop, 0.001)
+    assert [profit for _, profit in repricer.top(10)] == sorted(repricer.profits, reverse=True)
+
+def test_nan_prices_sink_to_the_bottom_of_the_ranking():
+    repricer = LoopRepricer(find_arbitrage_loops(make_pairs()))
+    repricer.update_price("ETHUSDT", math.nan, math.nan)
+
+    ranking = repricer.top(len(repricer.loops))
+    assert all(not math.isnan(profit) for _, profit in ranking)
+    assert ranking[-1][1] == -math.inf
+    # Le classement reste cohérent : une nouvelle mise à jour retrouve et remplace l'entrée rejetée
+    repricer.update_price("ETHUSDT", 3400.0, 3400.0)
+    assert all(math.isfinite(profit) for _, profit in repricer.top(len(repricer.loops)))
+
+def test_zero_or_negative_prices_rank_below_losing_loops():
+    repricer = LoopRepricer(find_arbitrage_loops(make_pairs()), trading_fee=0.001)
+
+    touched = repricer.update_price("ETHUSDT", 0.0, 0.0)  # Carnet vide : best_bid/best_ask à 0.0
+    untouched = [profit for loop_id, profit in enumerate(repricer.profits) if loop_id not in touched]
+    assert touched and any(profit < 0 for profit in untouched)
+    for loop_id in touched:
+        assert repricer.profits[loop_id] == -math.inf
+    assert sorted(loop_id for _, loop_id in repricer._ranking[-len(touched):]) == sorted(touched)
+    assert all(math.isfinite(profit) for _, profit in repricer.top(len(untouched)))
+
+    repricer.update_price("ETHUSDT", 3400.0, -1.0)
+    assert all(repricer.profits[loop_id] == -math.inf for loop_id in touched)
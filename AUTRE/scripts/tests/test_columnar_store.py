@@ -0,0 +1,64 @@
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import columnar_store
+from columnar_store import EXECUTION_COLUMNS, ColumnarWriter, scan
+
+def _row(i, symbol, day):
+    return {"ts": datetime(2024, 1, day, 12, 0, i % 60, tzinfo=timezone.utc), "execution_id": f"exec_{i}",
+            "symbol": symbol, "side": "BUY", "price": 100.0 + i, "quantity": 1.0}
+
+def test_append_does_not_write_on_caller_thread(tmp_path, monkeypatch):
+    release = threading.Event()
+    writer_threads = []
+    write_to_dataset = columnar_store.pq.write_to_dataset
+
+    def slow_write(*args, **kwargs):
+        writer_threads.append(threading.current_thread().name)
+        release.wait(5)
+        return write_to_dataset(*args, **kwargs)
+
+    monkeypatch.setattr(columnar_store.pq, "write_to_dataset", slow_write)
+    writer = ColumnarWriter(str(tmp_path), EXECUTION_COLUMNS, batch_rows=2)
+    for i in range(4):
+        writer.append(_row(i, "BTCUSDT", 1))  # Deux lots complets : aucun ne doit bloquer append()
+    assert writer.rows_written == 0
+    release.set()
+    writer.close()
+    assert writer_threads and all(name == "columnar_writer" for name in writer_threads)
+    assert writer.rows_written == 4
+
+def test_close_writes_remainder_and_counts_partition_files(tmp_path):
+    writer = ColumnarWriter(str(tmp_path), EXECUTION_COLUMNS, batch_rows=1000)
+    rows = [_row(i, symbol, day) for i, (symbol, day) in
+            enumerate([("BTCUSDT", 1), ("ETHUSDT", 1), ("BTCUSDT", 2), ("BTCUSDT", 1), ("ETHBTC", 2)])]
+    for row in rows:
+        writer.append(row)
+    writer.close()
+    assert writer.rows_written == len(rows)
+    assert writer.files_written == 4  # (01, BTC), (01, ETH), (02, BTC), (02, ETHBTC)
+    table = scan(str(tmp_path), columns=["execution_id", "symbol", "date"])
+    assert sorted(table["execution_id"].to_pylist()) == sorted(row["execution_id"] for row in rows)
+    assert set(scan(str(tmp_path), columns=["symbol"], start_date="2024-01-02")["symbol"].to_pylist()) == {"BTCUSDT", "ETHBTC"}
+
+def test_failed_batch_is_logged_and_writer_keeps_draining(tmp_path, monkeypatch):
+    write_to_dataset = columnar_store.pq.write_to_dataset
+    calls = []
+
+    def flaky_write(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise ValueError("Fragment would be written into too many partitions")  # Hors ArrowException/OSError
+        return write_to_dataset(*args, **kwargs)
+
+    monkeypatch.setattr(columnar_store.pq, "write_to_dataset", flaky_write)
+    writer = ColumnarWriter(str(tmp_path), EXECUTION_COLUMNS, batch_rows=1)
+    writer.append(_row(0, "BTCUSDT", 1))
+    writer.append(_row(1, "BTCUSDT", 1))
+    writer.close()
+    assert writer.rows_written == 1
+    assert scan(str(tmp_path), columns=["execution_id"])["execution_id"].to_pylist() == ["exec_1"]
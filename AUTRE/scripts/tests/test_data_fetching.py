@@ -0,0 +1,57 @@
+import pytest
+
+import data_fetching
+from rate_limiter import RateLimiter
+
+# Champs réellement renvoyés par /api/v3/ticker/24hr (aucun champ d'ancienneté)
+TICKERS = [
+    {"symbol": "BTCUSDT", "lastPrice": "60000.0", "volume": "25000", "quoteVolume": "1500000000"},
+    {"symbol": "ETHBTC", "lastPrice": "0.05", "volume": "40000", "quoteVolume": "2000"},
+]
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.headers = {}
+        self._body = body
+
+    def json(self):
+        return self._body
+
+class FakeClient:
+    def __init__(self, serve_bulk_ticker=True):
+        self.serve_bulk_ticker = serve_bulk_ticker
+        self.requests = []
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        symbol = (params or {}).get("symbol")
+        self.requests.append(symbol)
+        if symbol is not None:
+            return FakeResponse(200, next(ticker for ticker in TICKERS if ticker["symbol"] == symbol))
+        if self.serve_bulk_ticker:
+            return FakeResponse(200, TICKERS)
+        return FakeResponse(404, {"code": -1, "msg": "Not found"})
+
+@pytest.fixture
+def screening(monkeypatch):
+    monkeypatch.setattr(data_fetching, "BASE_URL", "http://exchange.test")
+    monkeypatch.setattr(data_fetching, "VOLUME_THRESHOLD", 100000)
+    monkeypatch.setattr(data_fetching, "screening_limiter", RateLimiter(weight_per_minute=10 ** 9))
+
+    def use(client):
+        monkeypatch.setattr(data_fetching, "http_client", client)
+        return client
+    return use
+
+def test_bulk_ticker_accepts_pairs_above_min_volume(screening):
+    client = screening(FakeClient())
+    assert data_fetching.filter_active_pairs(["BTCUSDT", "ETHBTC"], "key", "secret") == ["BTCUSDT"]
+    assert client.requests == [None]  # Un seul appel groupé
+
+def test_per_pair_fallback_applies_the_same_criterion(screening):
+    client = screening(FakeClient(serve_bulk_ticker=False))
+    assert data_fetching.filter_active_pairs(["BTCUSDT", "ETHBTC"], "key", "secret") == ["BTCUSDT"]
+    assert sorted(filter(None, client.requests)) == ["BTCUSDT", "ETHBTC"]
+
+def test_missing_ticker_is_rejected(screening):
+    assert data_fetching.ticker_meets_criteria(None) is False
@@ -0,0 +1,66 @@
+import json
+import os
+import threading
+
+import pytest
+
+from error_logging import TAIL_BLOCK_BYTES, ErrorLogSink, _tail_lines, read_recent_errors
+
+def _write_lines(path, line_length, total_bytes):
+    """Lignes de line_length octets (saut de ligne compris) ; la première est raccourcie pour totaliser total_bytes."""
+    count = -(-total_bytes // line_length)
+    lines = [f"{i:0{line_length - 1}d}".encode()[-(line_length - 1):] for i in range(count)]
+    data = b"".join(line + b"\n" for line in lines)[-total_bytes:]
+    with open(path, "wb") as file:
+        file.write(data)
+    return [line for line in data.split(b"\n") if line]
+
+@pytest.mark.parametrize("line_length", [64, 100, 4096])  # 64 divise le bloc : frontières de bloc = débuts de ligne
+@pytest.mark.parametrize("total_bytes", [TAIL_BLOCK_BYTES - 1, TAIL_BLOCK_BYTES, TAIL_BLOCK_BYTES + 1,
+                                         2 * TAIL_BLOCK_BYTES, 2 * TAIL_BLOCK_BYTES + 37])
+def test_tail_lines_at_block_boundaries(tmp_path, line_length, total_bytes):
+    path = str(tmp_path / "errors.jsonl")
+    lines = _write_lines(path, line_length, total_bytes)
+    per_block = TAIL_BLOCK_BYTES // line_length
+    for limit in sorted({1, per_block - 1, per_block, per_block + 1, len(lines) - 1, len(lines), len(lines) + 5}):
+        assert _tail_lines(path, limit) == lines[-limit:], limit
+
+def test_tail_lines_of_missing_file(tmp_path):
+    assert _tail_lines(str(tmp_path / "absent.jsonl"), 5) == []
+
+def test_recent_errors_spill_into_rotated_file(tmp_path):
+    path = str(tmp_path / "errors.jsonl")
+    sink = ErrorLogSink(path, max_bytes=1, backup_count=2, ring_size=0)  # Rotation après chaque lot
+    sink.write_batch([{"message": f"old_{i}"} for i in range(3)])
+    sink.write_batch([{"message": f"rotated_{i}"} for i in range(2)])
+    assert not os.path.exists(path)  # Juste après une rotation, seul .1 et .2 existent
+    assert [e["message"] for e in read_recent_errors(path, 4, 2)] == ["old_1", "old_2", "rotated_0",
+                                                                       "rotated_1"]
+
+    with open(path, "w") as file:
+        file.write(json.dumps({"message": "current"}) + "\n")
+    assert [e["message"] for e in read_recent_errors(path, 3, 2)] == ["rotated_0", "rotated_1",
+                                                                       "current"]
+    assert len(read_recent_errors(path, 100, 2)) == 6
+    assert len(read_recent_errors(path, 100, 1)) == 3  # .2 au-delà de backup_count : ignoré
+
+def test_submit_drops_and_counts_when_queue_is_full(tmp_path, monkeypatch):
+    sink = ErrorLogSink(str(tmp_path / "errors.jsonl"), max_queue=1)
+    writing, release = threading.Event(), threading.Event()
+    write_batch = sink.write_batch
+
+    def blocked_write(entries):
+        writing.set()
+        release.wait(5)
+        write_batch(entries)
+
+    monkeypatch.setattr(sink, "write_batch", blocked_write)
+    assert sink.submit({"message": "first"})
+    assert writing.wait(5)  # Le thread d'écriture est bloqué sur la première entrée, la file est vide
+    assert sink.submit({"message": "second"})
+    assert not sink.submit({"message": "dropped"})
+    assert sink.dropped == 1
+    assert [e["message"] for e in sink.recent(from_memory=True)] == ["first", "second", "dropped"]
+    release.set()
+    sink.flush()
+    assert [e["message"] for e in read_recent_errors(sink.path, 10)] == ["first", "second"]
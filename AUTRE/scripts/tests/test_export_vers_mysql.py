@@ -0,0 +1,39 @@
+import sqlite3
+
+from export_vers_MySQL import EXPORT_TABLE, STATE_TABLE, _seed_trades, export_new_rows, read_high_water
+from trade_writer import TRADE_COLUMNS, trade_table_ddl
+
+# DDL de l'ancien export (SQL Server), transposée en SQLite : id IDENTITY, horodatage par défaut, pas de source_rowid
+LEGACY_DDL = (f"CREATE TABLE {EXPORT_TABLE} (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+              f"{', '.join(TRADE_COLUMNS)}, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)")
+
+def legacy_target(source):
+    """Cible remplie par l'ancien export, avec une marque haute résiduelle à ignorer."""
+    target = sqlite3.connect(":memory:")
+    target.execute(LEGACY_DDL)
+    target.executemany(f"INSERT INTO {EXPORT_TABLE} ({', '.join(TRADE_COLUMNS)}) VALUES ({', '.join('?' * len(TRADE_COLUMNS))})",
+                       source.execute(f"SELECT {', '.join(TRADE_COLUMNS)} FROM trades").fetchall())
+    target.execute(f"CREATE TABLE {STATE_TABLE} (table_name VARCHAR(100) PRIMARY KEY, high_water INTEGER NOT NULL)")
+    target.execute(f"INSERT INTO {STATE_TABLE} VALUES (?, ?)", (EXPORT_TABLE, 8))
+    target.commit()
+    return target
+
+def test_export_migrates_legacy_table_once():
+    source = sqlite3.connect(":memory:")
+    source.execute(trade_table_ddl())
+    _seed_trades(source, 0, 10)
+    target = legacy_target(source)
+
+    assert export_new_rows(source, target, "sqlite", chunk_size=4) == 10
+    columns = [row[1] for row in target.execute(f"PRAGMA table_info({EXPORT_TABLE})")]
+    assert columns == ["source_rowid"] + list(TRADE_COLUMNS)
+    assert target.execute(f"SELECT COUNT(*), COUNT(DISTINCT source_rowid) FROM {EXPORT_TABLE}").fetchone() == (10, 10)
+    assert read_high_water(target, "sqlite") == 10
+
+    # La migration n'a lieu qu'une fois : les exports suivants restent incrémentaux
+    assert export_new_rows(source, target, "sqlite") == 0
+    _seed_trades(source, 10, 3)
+    assert export_new_rows(source, target, "sqlite") == 3
+    assert target.execute(f"SELECT COUNT(*), MAX(source_rowid) FROM {EXPORT_TABLE}").fetchone() == (13, 13)
+    ids = [row[0] for row in target.execute(f"SELECT execution_id FROM {EXPORT_TABLE} ORDER BY source_rowid")]
+    assert ids == [f"exec_{i}" for i in range(13)]
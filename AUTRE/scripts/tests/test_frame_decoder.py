@@ -0,0 +1,33 @@
+import json
+import pytest
+from frame_decoder import DepthRecord, available_decoders, get_decoder, synthetic_frame_corpus
+
+EDGE_FRAMES = [
+    # Instantanés @depth5 aux carnets vides : un enregistrement doit être produit par tous les décodeurs
+    {"stream": "btcusdt@depth5", "data": {"lastUpdateId": 7, "bids": [], "asks": []}},
+    {"stream": "ethbtc@depth5", "data": {"lastUpdateId": 8, "bids": [["0.05", "1.0"]], "asks": []}},
+    {"stream": "ethbtc@depth5", "data": {"lastUpdateId": 9, "bids": []}},
+    {"lastUpdateId": 10, "bids": [], "asks": [["1.0", "2.0"]]},
+    # Carnet sans bids : ignoré par tous
+    {"stream": "ethbtc@depth5", "data": {"lastUpdateId": 11, "asks": [["0.05", "1.0"]]}},
+    {"stream": "bnbusdt@depth", "data": {"e": "depthUpdate", "E": 1, "s": "BNBUSDT", "U": 5, "u": 6, "b": [], "a": []}},
+    {"result": None, "id": 1},
+]
+
+@pytest.mark.parametrize("frame", EDGE_FRAMES)
+def test_decoders_agree_on_edge_frames(frame):
+    message = json.dumps(frame).encode()
+    records = {name: get_decoder(name).decode(message) for name in available_decoders()}
+    assert all(record == records["json"] for record in records.values()), records
+
+def test_empty_snapshot_is_a_depth_record():
+    message = json.dumps(EDGE_FRAMES[0]).encode()
+    for name in available_decoders():
+        assert get_decoder(name).decode(message) == DepthRecord("BTCUSDT", 7, 7, [], [])
+
+def test_decoders_agree_on_corpus():
+    corpus = synthetic_frame_corpus(3000)
+    reference = get_decoder("json")
+    for name in available_decoders():
+        decoder = get_decoder(name)
+        assert [decoder.decode(message) for message in corpus] == [reference.decode(message) for message in corpus]
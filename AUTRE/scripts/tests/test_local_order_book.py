@@ -0,0 +1,145 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+from frame_decoder import get_decoder
+import local_order_book
+from local_order_book import LocalOrderBookManager
+from order_book_store import OrderBookStore
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "btcusdt_depth_gaps.json")
+
+def load_fixture():
+    with open(FIXTURE) as fixture_file:
+        return json.load(fixture_file)
+
+def levels(raw):
+    return [[float(price), float(quantity)] for price, quantity in raw]
+
+def replay(fixture, after_frame=None):
+    """Rejoue les trames ; les snapshots REST sont servis dans l'ordre enregistré."""
+    snapshots = iter(fixture["snapshots"])
+    requests = []
+
+    def snapshot_fetcher(symbol, limit):
+        requests.append(symbol)
+        return next(snapshots)
+
+    store = OrderBookStore()
+    manager = LocalOrderBookManager(snapshot_fetcher, store=store)
+    decoder = get_decoder()
+    for frame in fixture["frames"]:
+        manager.on_diff(decoder.decode(json.dumps(frame)))
+        if after_frame is not None:
+            after_frame(manager, frame)
+    return manager, store, requests
+
+def test_gaps_trigger_resyncs_and_book_matches_reference():
+    fixture = load_fixture()
+    manager, store, requests = replay(fixture)
+    book = manager.books[fixture["symbol"]]
+    expected = fixture["expected"]
+
+    # Démarrage, deux trous et un snapshot périmé : quatre snapshots demandés, tous consommés
+    assert manager.resync_count == len(fixture["snapshots"]) == len(requests) == 4
+    assert book.synced
+    assert book.last_update_id == expected["lastUpdateId"]
+    bids, asks = book.top(1000)
+    assert bids == levels(expected["bids"])
+    assert asks == levels(expected["asks"])
+    published_bids, published_asks = store.book(fixture["symbol"])
+    assert published_bids.tolist() == levels(expected["bids"])[:5]
+    assert published_asks.tolist() == levels(expected["asks"])[:5]
+
+def test_dropped_diffs_mark_the_book_unsynced_until_a_fresh_snapshot():
+    fixture = load_fixture()
+    dropped = fixture["dropped_update_ids"]
+    states = []
+
+    def after_frame(manager, frame):
+        states.append((frame["data"]["u"], manager.books[fixture["symbol"]].synced))
+
+    replay(fixture, after_frame)
+    after_first_gap = [synced for update_id, synced in states if update_id > dropped[0]]
+    # Snapshot périmé : le carnet reste désynchronisé un diff, puis se recale
+    assert after_first_gap[:2] == [False, True]
+    after_second_gap = [synced for update_id, synced in states if update_id > dropped[1]]
+    assert after_second_gap[0] is True
+
+def test_failed_snapshot_fetch_does_not_raise_and_is_retried():
+    fixture = load_fixture()
+    calls = []
+
+    def failing_fetcher(symbol, limit):
+        calls.append(symbol)
+        if len(calls) == 1:
+            raise ConnectionError("snapshot indisponible")
+        return fixture["snapshots"][0]
+
+    decoder = get_decoder()
+    clock = {"now": 100.0}
+    updates = []
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        manager = LocalOrderBookManager(failing_fetcher, executor=executor, on_update=updates.append,
+                                        clock=lambda: clock["now"])
+        manager.on_diff(decoder.decode(json.dumps(fixture["frames"][0])))
+    assert fixture["symbol"] not in manager._resyncing
+    assert not manager.books[fixture["symbol"]].synced
+
+    # Pendant le délai de backoff, les diffs sont mis en tampon sans nouvelle requête REST
+    manager.on_diff(decoder.decode(json.dumps(fixture["frames"][1])))
+    assert len(calls) == 1
+
+    clock["now"] += local_order_book.RESYNC_BACKOFF_SECONDS
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        manager.executor = executor
+        manager.on_diff(decoder.decode(json.dumps(fixture["frames"][2])))
+    assert len(calls) == 2
+    assert manager.books[fixture["symbol"]].synced
+    assert updates == [fixture["symbol"]]  # Resynchronisation terminée dans l'executor : repricer prévenu
+
+def test_backoff_doubles_after_each_failed_snapshot():
+    fixture = load_fixture()
+    calls = []
+    clock = {"now": 0.0}
+    manager = LocalOrderBookManager(lambda symbol, limit: calls.append(clock["now"]), clock=lambda: clock["now"])
+    decoder = get_decoder()
+    for frame in fixture["frames"][:40]:
+        manager.on_diff(decoder.decode(json.dumps(frame)))
+        clock["now"] += 0.5
+    # Échecs à t=0, puis après 1 s, 2 s, 4 s, 8 s d'attente (diffs toutes les 0.5 s)
+    assert calls == [0.0, 1.0, 3.0, 7.0, 15.0]
+    assert manager.resync_count == len(calls)
+    assert len(manager._buffers[fixture["symbol"]]) == 40
+
+class FakeResponse:
+    status_code = 200
+    headers = {"X-MBX-USED-WEIGHT-1M": "6000"}  # Limite de la minute atteinte
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"lastUpdateId": 1, "bids": [], "asks": []}
+
+def test_snapshot_fetch_goes_through_the_shared_limiter(monkeypatch):
+    import helpers
+    from rate_limiter import RateLimiter
+
+    sent = []
+
+    class FakeClient:
+        def get(self, url, **kwargs):
+            sent.append(kwargs)
+            return FakeResponse()
+
+    monkeypatch.setattr(local_order_book, "get_http_client", lambda: FakeClient())
+    monkeypatch.setattr(helpers, "API_USAGE_TRACKER", RateLimiter(weight_per_minute=60))
+    assert local_order_book.fetch_depth_snapshot("BTCUSDT", 1000) is None  # Aucune clé : pas de requête
+    assert sent == []
+
+    helpers.API_USAGE_TRACKER.add_key("key")
+    assert local_order_book.fetch_depth_snapshot("BTCUSDT", 1000)["lastUpdateId"] == 1
+    assert sent[0]["headers"] == {"X-MBX-APIKEY": "key"} and sent[0]["endpoint"] == "/api/v3/depth"
+    assert helpers.API_USAGE_TRACKER.available("key") == 0  # Poids 50 débité puis recalé sur l'en-tête
+    assert local_order_book.fetch_depth_snapshot("BTCUSDT", 1000) is None  # Budget épuisé : pas de requête
+    assert len(sent) == 1
@@ -0,0 +1,82 @@
+import random
+import numpy as np
+import pytest
+from arbitrage_loops import calculate_profit, find_arbitrage_loops
+from synthetic_market import generate_synthetic_market
+from loop_pricing import DepthLoopSizer, LoopPricingEngine
+
+def make_loops(symbol_count=600, seed=3):
+    rng = random.Random(seed)
+    pairs = generate_synthetic_market(symbol_count, seed)
+    for pair in pairs:
+        pair["bid"] = pair["price"] * rng.uniform(0.995, 1.0)
+        pair["ask"] = pair["price"] * rng.uniform(1.0, 1.005)
+    return find_arbitrage_loops(pairs)
+
+def test_vectorized_profits_match_scalar_reference():
+    loops = make_loops()
+    assert len(loops) > 100
+    for trading_fee in (0.0, 0.001, 0.0075):
+        vectorized = LoopPricingEngine(loops).compute_profits(trading_fee)
+        reference = np.array([calculate_profit(loop, trading_fee) for loop in loops])
+        assert np.max(np.abs(vectorized - reference)) <= 1e-12
+
+def test_update_price_matches_reference_after_tick():
+    loops = make_loops()
+    engine = LoopPricingEngine(loops)
+    pair = loops[0][1]
+    pair["bid"], pair["ask"] = pair["bid"] * 1.01, pair["ask"] * 1.01
+    engine.update_price(pair["symbol"], pair["bid"], pair["ask"])
+
+    reference = np.array([calculate_profit(loop, 0.001) for loop in loops])
+    assert np.max(np.abs(engine.compute_profits(0.001) - reference)) <= 1e-12
+
+def test_top_is_sorted_and_consistent():
+    loops = make_loops()
+    engine = LoopPricingEngine(loops)
+    top = engine.top(10, 0.001)
+    profits = [profit for _, profit in top]
+    assert profits == sorted(profits, reverse=True)
+    assert profits[0] == max(engine.compute_profits(0.001))
+
+def test_price_only_pairs_keep_the_legacy_profit():
+    # Sans bid/ask ni frais, calculate_profit reproduit l'ancien calcul sur "price"
+    loops = find_arbitrage_loops(generate_synthetic_market(300, 5))
+    for a, b, c in loops[:50]:
+        assert calculate_profit((a, b, c)) == 1 / a["price"] * b["price"] * c["price"] - 1
+
+def sized(books, trading_fee=0.0, min_return=0.0):
+    """books : niveaux de chaque jambe (asks pour l'achat USDT -> A, bids pour les deux ventes)."""
+    sizer = DepthLoopSizer()
+    for leg, (levels, is_buy) in enumerate(zip(books, (True, False, False))):
+        sizer.load_leg(leg, levels, is_buy)
+    return sizer.size(trading_fee, min_return)
+
+# USDT -> A au prix 1, A -> B à 1.01, B -> USDT à 1 : 1 % de gain par unité jusqu'à la capacité
+DEEP = [[1.0, 1000.0]]
+
+def test_one_level_books_use_the_whole_capacity():
+    notional, profit = sized([[[1.0, 100.0]], [[1.01, 1000.0]], DEEP])
+    assert notional == pytest.approx(100.0)
+    assert profit == pytest.approx(1.0)
+
+def test_capacity_limited_by_a_later_leg():
+    notional, profit = sized([[[1.0, 100.0]], [[1.01, 50.0]], DEEP])
+    assert notional == pytest.approx(50.0)
+    assert profit == pytest.approx(0.5)
+
+def test_stops_where_marginal_return_turns_negative():
+    # Deuxième niveau à 1.02 : chaque USDT au-delà de 50 rapporte 1.01 / 1.02 < 1
+    notional, profit = sized([[[1.0, 50.0], [1.02, 50.0]], [[1.01, 1000.0]], DEEP])
+    assert notional == pytest.approx(50.0)
+    assert profit == pytest.approx(0.5)
+
+def test_unprofitable_first_segment_returns_zero():
+    assert sized([[[1.0, 100.0]], [[0.99, 1000.0]], DEEP]) == (0.0, 0.0)
+    assert sized([[[1.0, 100.0]], [[1.01, 1000.0]], DEEP], min_return=0.02) == (0.0, 0.0)
+
+def test_fees_are_applied_on_each_leg():
+    notional, profit = sized([[[1.0, 100.0]], [[1.01, 1000.0]], DEEP], trading_fee=0.001)
+    assert notional == pytest.approx(100.0)
+    assert profit == pytest.approx(100.0 * (1.01 * 0.999 ** 3 - 1))
+    assert sized([[[1.0, 100.0]], [[1.01, 1000.0]], DEEP], trading_fee=0.004) == (0.0, 0.0)
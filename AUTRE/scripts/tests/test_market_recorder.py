@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+from arbitrage_loops import calculate_profit
+from feed_manager import FeedManager
+from market_recorder import MarketRecorder, MarketReplayer, iter_recording
+from order_book_store import OrderBookStore
+
+# Triangle A -> B -> C -> A : trois rotations de la même boucle
+PAIRS = [{"symbol": "AB", "base": "A", "quote": "B", "price": 1.0},
+         {"symbol": "BC", "base": "B", "quote": "C", "price": 1.0},
+         {"symbol": "CA", "base": "C", "quote": "A", "price": 1.0}]
+
+def _frame(symbol, bid, ask):
+    return json.dumps({"stream": f"{symbol.lower()}@depth5",
+                       "data": {"lastUpdateId": 1, "bids": [[str(bid), "1"]], "asks": [[str(ask), "1"]]}}).encode()
+
+def test_replayer_reports_profit_net_of_the_repricer_fee():
+    opportunities = []
+    replayer = MarketReplayer(PAIRS, trading_fee=0.001, min_profit=0.001,
+                              on_opportunity=lambda loop, profit, ns: opportunities.append(
+                                  (profit, calculate_profit(loop, 0.001), calculate_profit(loop, 0.0))))
+    assert replayer.repricer.trading_fee == 0.001
+    replayer.replay((i, _frame(pair["symbol"], 1.02, 1.021)) for i, pair in enumerate(PAIRS))
+    assert opportunities
+    for profit, net, gross in opportunities:  # Boucle évaluée au moment de l'opportunité
+        assert profit == pytest.approx(net)
+        assert profit < gross
+
+def test_feed_manager_stop_closes_the_recorder(tmp_path):
+    recorder = MarketRecorder(str(tmp_path))
+    feed_manager = FeedManager(["AB"], OrderBookStore(), recorder=recorder)
+    recorder.record(_frame("AB", 1.0, 1.1), 42)
+    feed_manager.stop()  # Jamais démarré : seul l'enregistreur est à fermer
+    assert list(iter_recording(str(tmp_path))) == [(42, _frame("AB", 1.0, 1.1))]
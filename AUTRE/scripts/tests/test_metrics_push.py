@@ -0,0 +1,33 @@
+import metrics_push
+from metrics_push import MetricBatcher, get_metric_batcher
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+class FakeClient:
+    def __init__(self, *status_codes):
+        self.status_codes = list(status_codes)
+        self.posts = []
+
+    def post(self, url, data=None, headers=None):
+        self.posts.append(data)
+        return FakeResponse(self.status_codes.pop(0))
+
+def test_failed_push_is_retried_at_next_flush(monkeypatch):
+    client = FakeClient(500, 200)
+    batcher = MetricBatcher("http://pushgateway.test/metrics/job/test", interval=3600, http_client=client)
+    monkeypatch.setattr(batcher, "start", lambda: None)  # Pas de thread d'envoi : flush() appelé à la main
+    batcher.set("loops_found", 3)
+    assert batcher.flush() is False
+    assert batcher.flush() is True  # Valeurs toujours en attente après le 500
+    assert batcher.flush() is True and len(client.posts) == 2  # Plus rien à envoyer
+    assert batcher.failures == 1 and b"loops_found 3.0" in client.posts[-1]
+
+def test_shared_batcher_interval_is_updated_explicitly_only(monkeypatch):
+    monkeypatch.setattr(metrics_push, "_batchers", {})
+    url = "http://pushgateway.test/metrics/job/gpu_monitor"
+    batcher = get_metric_batcher(url)  # Créé par update_metrics avant le moniteur
+    assert batcher.interval == metrics_push.DEFAULT_PUSH_INTERVAL
+    assert get_metric_batcher(url, 45.0) is batcher and batcher.interval == 45.0
+    assert get_metric_batcher(url) is batcher and batcher.interval == 45.0
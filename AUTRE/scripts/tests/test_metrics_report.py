@@ -0,0 +1,55 @@
+import math
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from metrics_report import PUSHDOWN_QUERY, RunningAggregates, aggregate_trading_data
+
+def _trades(row_count=1000, seed=3):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"price": rng.uniform(0.01, 50000, row_count), "quantity": rng.uniform(0.001, 10, row_count)})
+    df.loc[rng.choice(row_count, row_count // 10, replace=False), "price"] = np.nan  # Prix manquants ignorés par mean/max/min
+    return df
+
+def _reference(df):
+    return {"total_trades": len(df), "average_trade_price": df["price"].mean(), "total_quantity": df["quantity"].sum(),
+            "max_trade_price": df["price"].max(), "min_trade_price": df["price"].min()}
+
+def _assert_metrics(metrics, expected):
+    assert metrics.keys() == expected.keys()
+    for name, value in expected.items():
+        assert metrics[name] == pytest.approx(value, rel=1e-9, nan_ok=True), name
+
+@pytest.mark.parametrize("chunksize", [1, 7, 100, 5000])
+def test_chunked_update_matches_full_table(chunksize):
+    df = _trades()
+    aggregates = RunningAggregates()
+    for offset in range(0, len(df), chunksize):
+        aggregates.update(df.iloc[offset:offset + chunksize])
+    _assert_metrics(aggregates.to_metrics(), _reference(df))
+
+def test_merge_of_partitions_matches_full_table():
+    df = _trades()
+    parts = [RunningAggregates.from_frame(df.iloc[offset:offset + 200]) for offset in range(0, len(df), 200)]
+    merged = RunningAggregates()
+    for part in reversed(parts):  # L'ordre de fusion est indifférent
+        merged.merge(part)
+    _assert_metrics(merged.to_metrics(), _reference(df))
+
+def test_chunks_without_prices_do_not_reset_extremes():
+    df = _trades(row_count=20)
+    df.loc[10:, "price"] = np.nan
+    aggregates = RunningAggregates.from_frame(df.iloc[:10]).merge(RunningAggregates.from_frame(df.iloc[10:]))
+    _assert_metrics(aggregates.to_metrics(), _reference(df))
+    assert math.isnan(RunningAggregates().to_metrics()["average_trade_price"])
+
+def test_sql_pushdown_and_streaming_match_pandas():
+    df = _trades()
+    conn = sqlite3.connect(":memory:")
+    df.to_sql("trades", conn, index=False)
+    _assert_metrics(aggregate_trading_data(conn, chunksize=64).to_metrics(), _reference(df))
+    _assert_metrics(aggregate_trading_data(conn, pushdown=True).to_metrics(), _reference(df))
+    assert RunningAggregates.from_row(conn.execute(PUSHDOWN_QUERY).fetchone()).count == len(df)
+    conn.close()
@@ -0,0 +1,83 @@
+import json
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from order_dispatch import OrderDispatcher, prepare_loop_orders
+from order_signing import OrderRequestBuilder
+
+LEGS = [{"symbol": "BTCUSDT", "side": "BUY", "quantity": "0.01"},
+        {"symbol": "ETHBTC", "side": "BUY", "quantity": "0.2"},
+        {"symbol": "ETHUSDT", "side": "SELL", "quantity": "0.2"}]
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.headers = {}
+        self.content = json.dumps(body).encode()
+        self.text = self.content.decode()
+        self._body = body
+
+    def json(self):
+        return self._body
+
+class ScriptedClient:
+    """Répond à chaque ordre selon outcomes[(symbole, sens)] : FILLED par défaut, sinon (statut, executedQty) ou code HTTP."""
+
+    def __init__(self, outcomes=None):
+        self.outcomes = outcomes or {}
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def post(self, url, headers=None, endpoint=None, **kwargs):
+        params = {name: values[0] for name, values in parse_qs(urlsplit(url).query).items()}
+        with self._lock:
+            self.sent.append((params["symbol"], params["side"], params["quantity"]))
+        outcome = self.outcomes.get((params["symbol"], params["side"]), ("FILLED", params["quantity"]))
+        if isinstance(outcome, int):
+            return FakeResponse(outcome, {"code": -1, "msg": "Service unavailable"})
+        status, executed = outcome
+        return FakeResponse(200, {"orderId": len(self.sent), "status": status, "executedQty": executed,
+                                  "origQty": params["quantity"]})
+
+@pytest.fixture
+def builder():
+    return OrderRequestBuilder("key", "secret", "http://exchange.test")
+
+def test_sequential_is_the_default_and_parallel_policies_need_inventory():
+    assert OrderDispatcher(http_client=ScriptedClient()).policy == "sequential"
+    for policy in ("concurrent", "pipelined"):
+        with pytest.raises(ValueError):
+            OrderDispatcher(policy, ScriptedClient())
+        assert OrderDispatcher(policy, ScriptedClient(), pre_held_inventory=True).policy == policy
+
+def test_sequential_stops_after_a_partial_fill_and_unwinds_it(builder):
+    client = ScriptedClient({("ETHBTC", "BUY"): ("PARTIALLY_FILLED", "0.1")})
+    dispatcher = OrderDispatcher("sequential", client)
+    trace = dispatcher.dispatch(prepare_loop_orders(builder, LEGS), LEGS)
+    assert not trace.succeeded
+    assert [leg.symbol for leg in trace.exposed_legs] == ["BTCUSDT", "ETHBTC"]
+    assert client.sent == [("BTCUSDT", "BUY", "0.01"), ("ETHBTC", "BUY", "0.2")]  # Troisième jambe jamais envoyée
+
+    unwound = dispatcher.unwind(builder, trace)
+    assert client.sent[2:] == [("ETHBTC", "SELL", "0.1"), ("BTCUSDT", "SELL", "0.01")]  # Quantités exécutées, ordre inverse
+    assert all(leg.filled for leg in unwound) and trace.unwind == unwound
+    dispatcher.close()
+
+def test_concurrent_failure_unwinds_only_executed_legs(builder):
+    client = ScriptedClient({("ETHBTC", "BUY"): 503})
+    dispatcher = OrderDispatcher("concurrent", client, pre_held_inventory=True)
+    trace = dispatcher.dispatch(prepare_loop_orders(builder, LEGS), LEGS)
+    assert [leg.symbol for leg in trace.exposed_legs] == ["BTCUSDT", "ETHUSDT"]
+    dispatcher.unwind(builder, trace)
+    assert client.sent[3:] == [("ETHUSDT", "BUY", "0.2"), ("BTCUSDT", "SELL", "0.01")]
+    dispatcher.close()
+
+def test_filled_loop_is_not_unwound(builder):
+    client = ScriptedClient()
+    dispatcher = OrderDispatcher(http_client=client)
+    trace = dispatcher.dispatch(prepare_loop_orders(builder, LEGS), LEGS)
+    assert trace.succeeded and trace.exposed_legs == []
+    assert dispatcher.unwind(builder, trace) == [] and len(client.sent) == 3
+    dispatcher.close()
@@ -0,0 +1,41 @@
+from decimal import Decimal
+
+from order_signing import LotSize, OrderRequestBuilder, format_quantity, parse_lot_sizes
+
+EXCHANGE_INFO = {"symbols": [
+    {"symbol": "BTCUSDT", "filters": [
+        {"filterType": "PRICE_FILTER", "tickSize": "0.01000000"},
+        {"filterType": "LOT_SIZE", "minQty": "0.00001000", "maxQty": "9000.00000000", "stepSize": "0.00001000"},
+        {"filterType": "NOTIONAL", "minNotional": "5.00000000"},
+    ]},
+    {"symbol": "ETHBTC", "filters": [
+        {"filterType": "LOT_SIZE", "minQty": "0.00010000", "maxQty": "100000.00000000", "stepSize": "0.00010000"},
+        {"filterType": "MIN_NOTIONAL", "minNotional": "0.00010000"},
+    ]},
+    {"symbol": "NOFILTER", "filters": []},
+]}
+
+def test_parse_lot_sizes_reads_lot_size_and_notional_filters():
+    lot_sizes = parse_lot_sizes(EXCHANGE_INFO)
+    assert set(lot_sizes) == {"BTCUSDT", "ETHBTC"}
+    assert lot_sizes["BTCUSDT"] == LotSize(Decimal("0.00001"), Decimal("0.00001"), Decimal("5"))
+    assert lot_sizes["ETHBTC"].min_notional == Decimal("0.0001")
+
+def test_format_quantity_rounds_down_to_step_without_exponent():
+    btc = parse_lot_sizes(EXCHANGE_INFO)["BTCUSDT"]
+    assert format_quantity(1e-05, btc) == "0.00001"
+    assert format_quantity(0.0123456789, btc) == "0.01234"
+    assert format_quantity(0.29999999999999993, btc) == "0.29999"
+    assert format_quantity(3.0, btc) == "3"
+    assert format_quantity(0.1 + 0.2, btc) == "0.3"
+
+def test_format_quantity_rejects_below_min_qty_or_min_notional():
+    btc = parse_lot_sizes(EXCHANGE_INFO)["BTCUSDT"]
+    assert format_quantity(0.000009, btc) is None
+    assert format_quantity(0.0001, btc, price=40000.0) is None  # 4 USDT < minNotional 5
+    assert format_quantity(0.0002, btc, price=40000.0) == "0.0002"
+
+def test_formatted_quantity_goes_unchanged_into_the_query_string():
+    order = OrderRequestBuilder("k", "s").build("BTCUSDT", "BUY", format_quantity(1e-05, parse_lot_sizes(EXCHANGE_INFO)["BTCUSDT"]),
+                                                timestamp=1700000000000)
+    assert "quantity=0.00001&" in order.query_string
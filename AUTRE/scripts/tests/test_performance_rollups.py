@@ -0,0 +1,75 @@
+from datetime import datetime, timezone
+
+from performance_rollups import PerformanceRollup, SlidingWindow, TumblingWindow
+
+START = 1_731_837_600.0  # Début d'heure et de minute
+
+def _transaction(i, offset_seconds, success=True, profit=1.0, timestamp=True):
+    transaction = {"transaction_id": f"txn_{i}", "status": "success" if success else "failed",
+                   "profit": profit, "execution_time_seconds": 0.1 * (i % 7 + 1)}
+    if timestamp:
+        transaction["timestamp"] = datetime.fromtimestamp(START + offset_seconds, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return transaction
+
+def test_sliding_window_expires_against_now_without_new_events():
+    window = SlidingWindow(60)
+    window.add(START, True, 2.0)
+    window.add(START + 30, False, -1.0)
+    assert window.values() == [2, 1, 1.0]
+    assert window.values(START + 59) == [2, 1, 1.0]
+    assert window.values(START + 61) == [1, 0, -1.0]  # Le premier événement est sorti de la fenêtre
+    assert window.values(START + 500) == [0, 0, 0.0]
+    assert window.values() == [2, 1, 1.0]  # La lecture ne modifie pas l'état
+
+def test_tumbling_window_is_empty_once_now_leaves_it():
+    window = TumblingWindow(60)
+    window.add(START + 10, True, 3.0)
+    assert window.values(START + 59) == (START, [1, 1, 3.0])
+    assert window.values(START + 60) == (START + 60, [0, 0, 0.0])
+    window.add(START + 200, True, 1.0)  # Deux minutes sautées : la précédente est vide
+    assert window.previous == [START + 120, 0, 0, 0.0]
+
+def test_snapshot_windows_follow_now():
+    rollup = PerformanceRollup()
+    rollup.catch_up([_transaction(i, i) for i in range(30)])
+    windows = rollup.snapshot()["windows"]
+    assert windows["1m"]["sliding"]["transactions"] == 30
+    later = rollup.snapshot(now=START + 3600 + 30)["windows"]
+    assert later["1m"]["sliding"]["transactions"] == 0
+    assert later["1m"]["tumbling"]["transactions"] == 0
+    assert later["1h"]["tumbling"]["start"] == START + 3600
+    assert later["1d"]["sliding"]["transactions"] == 30
+
+def test_untimestamped_transaction_uses_last_event_time():
+    rollup = PerformanceRollup()
+    rollup.update(_transaction(0, 0, timestamp=False))  # Aucun horodatage connu : fenêtres inchangées
+    assert rollup.total == 1 and rollup.sliding["1m"].values() == [0, 0, 0.0]
+    rollup.update(_transaction(1, 10))
+    rollup.update(_transaction(2, 0, timestamp=False))
+    assert rollup.sliding["1m"].values() == [2, 2, 2.0]
+    assert rollup.last_timestamp == START + 10
+
+def test_checkpoint_round_trip_matches_full_rebuild(tmp_path):
+    transactions = [_transaction(i, i * 7, success=i % 3 != 0, profit=i % 5 - 1.5, timestamp=i % 11 != 0)
+                    for i in range(400)]
+    path = str(tmp_path / "performance_state.json")
+
+    continuous = PerformanceRollup()
+    continuous.catch_up(transactions[:250])
+    continuous.checkpoint(path)
+    continuous.snapshot(now=START + 10 ** 6)  # Une lecture à l'instant présent ne change pas l'état sauvegardé
+    continuous.catch_up(transactions)
+
+    restored = PerformanceRollup.load(path)
+    assert restored.offset == 250
+    restored.catch_up(transactions)
+    rebuilt = PerformanceRollup()
+    rebuilt.catch_up(transactions)
+
+    assert restored.to_dict() == continuous.to_dict() == rebuilt.to_dict()
+    assert rebuilt.snapshot(now=START + 3000)["windows"] == continuous.snapshot(now=START + 3000)["windows"]
+
+def test_unreadable_checkpoint_restarts_from_zero(tmp_path):
+    path = tmp_path / "performance_state.json"
+    path.write_text("{")
+    assert PerformanceRollup.load(str(path)).offset == 0
@@ -0,0 +1,41 @@
+from rate_limiter import USED_WEIGHT_HEADER, RateLimiter
+
+class VirtualClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def limiter(clock):
+    # Heure murale à 10 s dans la minute : une synchronisation gèle la recharge pendant 50 s
+    return RateLimiter(["A", "B"], weight_per_minute=6000, server_limit=6000, clock=clock, wall_clock=lambda: 10.0)
+
+def test_synced_key_with_budget_is_selected():
+    clock = VirtualClock()
+    rate_limiter = limiter(clock)
+    assert rate_limiter.try_acquire(5900, "B") == "B"  # B : 100 jetons en local
+    rate_limiter.update_from_response("A", 200, {USED_WEIGHT_HEADER: "1000"})  # A : 5000 jetons jusqu'à la fin de la minute
+    assert rate_limiter.available("A") == 5000
+    assert rate_limiter.try_acquire(200) == "A"
+    assert rate_limiter.available("A") == 4800
+    assert rate_limiter.available("B") == 100
+
+def test_falls_back_to_next_key_when_heap_top_is_short():
+    clock = VirtualClock()
+    rate_limiter = limiter(clock)
+    assert rate_limiter.try_acquire(5900, "B") == "B"
+    rate_limiter.update_from_response("A", 200, {USED_WEIGHT_HEADER: "5850"})  # A : 150 jetons, sans recharge avant 50 s
+    clock.now += 1.0  # B s'est rechargé à 200 jetons, A est toujours en tête du tas
+    assert rate_limiter.try_acquire(180) == "B"
+    assert rate_limiter.try_acquire(180) is None
+    assert rate_limiter.try_acquire(150) == "A"
+    assert rate_limiter.available("A") == 0
+
+def test_wait_is_shortest_over_all_keys():
+    clock = VirtualClock()
+    rate_limiter = limiter(clock)
+    rate_limiter.update_from_response("A", 200, {USED_WEIGHT_HEADER: "6000"})  # A : rien avant 50 s
+    assert rate_limiter.try_acquire(6000, "B") == "B"  # B : vide, recharge immédiate à 100 jetons/s
+    selected, wait = rate_limiter._reserve(300, None)
+    assert selected is None and abs(wait - 3.0) < 1e-9
@@ -0,0 +1,41 @@
+import os
+import sqlite3
+import time
+
+import trade_writer
+from trade_writer import TradeWriter, _sample_trade
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_writer_retries_connection_until_database_is_reachable(tmp_path, monkeypatch):
+    monkeypatch.setattr(trade_writer, "CONNECT_RETRY_SECONDS", 0.01)
+    directory = tmp_path / "data"  # Absent au démarrage : la connexion échoue
+    writer = TradeWriter(str(directory / "trades.sqlite"), flush_seconds=0.01)
+    for i in range(3):
+        writer.submit(_sample_trade(i))
+    time.sleep(0.05)
+    assert writer._thread.is_alive() and writer.rows_written == 0
+
+    os.makedirs(directory)
+    assert wait_for(lambda: writer.rows_written == 3)
+    writer.submit(_sample_trade(3))
+    writer.stop()
+    assert sqlite3.connect(str(directory / "trades.sqlite")).execute("SELECT COUNT(*) FROM trades").fetchone()[0] == 4
+
+def test_submit_does_not_block_once_writer_stopped_without_connection(tmp_path, monkeypatch):
+    monkeypatch.setattr(trade_writer, "CONNECT_RETRY_SECONDS", 0.01)
+    writer = TradeWriter(str(tmp_path / "missing" / "trades.sqlite"), max_queue=2)
+    writer.submit(_sample_trade(0))
+    writer.submit(_sample_trade(1))
+    writer.stop(timeout=1.0)
+    assert not writer._thread.is_alive()
+    dropped = trade_writer.trade_writer_dropped._value.get()
+    start = time.monotonic()
+    for i in range(5):
+        writer.submit(_sample_trade(i))  # File pleine et thread arrêté : ne doit jamais bloquer
+    assert time.monotonic() - start < 0.5
+    assert trade_writer.trade_writer_dropped._value.get() == dropped + 5
@@ -0,0 +1,229 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+from prometheus_client import Counter, Gauge, Histogram
+from helpers import log_info, log_error, connect_sqlite, ensure_sqlite_indexes, insert_statement
+
+# -----------------------------
+# ÉCRITURE ASYNCHRONE ET GROUPÉE DES TRADES
+# -----------------------------
+
+# Colonnes de la table trades (mêmes clés que le dictionnaire trade_data d'execute_trade)
+TRADE_COLUMNS = (
+    "execution_id", "loop_id", "pair_sequence", "execution_prices", "quantities", "initial_investment",
+    "final_return", "net_profit", "instance_id", "side", "exchange", "pair", "base_currency", "stake_currency",
+    "is_open", "fee_open", "fee_open_cost", "fee_open_currency", "fee_close", "fee_close_cost",
+    "fee_close_currency", "open_rate", "open_trade_value", "close_rate", "realized_profit", "close_profit",
+    "close_profit_abs", "stake_amount", "amount", "open_date", "close_date", "stop_loss", "exit_reason",
+    "strategy", "timeframe", "trading_mode", "amount_precision", "price_precision", "final_balance",
+)
+TEXT_COLUMNS = {"execution_id", "loop_id", "pair_sequence", "execution_prices", "quantities", "instance_id", "side",
+                "exchange", "pair", "base_currency", "stake_currency", "fee_open_currency", "fee_close_currency",
+                "open_date", "close_date", "exit_reason", "strategy", "trading_mode"}
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_SECONDS = 0.5
+CONNECT_RETRY_SECONDS = 0.5  # Premier délai avant un nouvel essai de connexion, doublé à chaque échec
+CONNECT_RETRY_MAX_SECONDS = 30.0
+_STOP = object()  # Sentinelle de fin : le thread vide la file puis s'arrête
+
+trade_writer_queue_depth = Gauge("trade_writer_queue_depth", "Trades en attente d'écriture")
+trade_writer_flush_latency = Histogram(
+    "trade_writer_flush_seconds", "Durée d'une transaction executemany du writer",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+trade_writer_rows = Counter("trade_writer_rows_written_total", "Trades écrits en base par le writer")
+trade_writer_backpressure = Counter("trade_writer_queue_full_total", "Trades mis en attente car la file était pleine")
+trade_writer_errors = Counter("trade_writer_flush_errors_total", "Transactions du writer en échec")
+trade_writer_connect_errors = Counter("trade_writer_connect_errors_total", "Connexions du writer à la base en échec")
+trade_writer_dropped = Counter("trade_writer_dropped_total", "Trades abandonnés car le writer était arrêté")
+
+def trade_table_ddl(table: str = "trades") -> str:
+    columns = ", ".join(f"{name} {'TEXT' if name in TEXT_COLUMNS else 'REAL'}" for name in TRADE_COLUMNS)
+    return f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY AUTOINCREMENT, {columns})"
+
+def trade_row(record: Dict[str, Any], columns: Sequence[str] = TRADE_COLUMNS) -> tuple:
+    """Ligne prête pour executemany ; les listes (séquence de paires, prix...) sont stockées en JSON."""
+    return tuple(json.dumps(value) if isinstance(value, (list, dict)) else value
+                 for value in (record.get(name) for name in columns))
+
+class TradeWriter:
+    """
+    Persiste les trades depuis un thread dédié.
+
+    Le chemin d'exécution n'appelle que submit(), qui dépose le dictionnaire dans une file bornée.
+    Le thread regroupe les enregistrements et les écrit par executemany dans une seule transaction,
+    dès que batch_size enregistrements sont en attente ou que flush_seconds est écoulé.
+    Quand la file est pleine, submit() attend (contre-pression) : aucun trade n'est abandonné.
+    Si la base est inaccessible, le thread retente la connexion avec un délai croissant au lieu de
+    s'arrêter ; une fois le writer arrêté, submit() compte et abandonne au lieu d'attendre.
+    stop() (appelé aussi à la sortie du processus) vide la file avant de fermer la connexion.
+    """
+
+    def __init__(self, db_path: str, table: str = "trades", max_queue: int = DEFAULT_QUEUE_SIZE,
+                 batch_size: int = DEFAULT_BATCH_SIZE, flush_seconds: float = DEFAULT_FLUSH_SECONDS):
+        self.db_path = db_path
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.rows_written = 0
+        self.flushes = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._insert = insert_statement(table, TRADE_COLUMNS)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trade_writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def submit(self, record: Dict[str, Any]) -> None:
+        """Dépose un trade dans la file (démarre le thread au premier appel)."""
+        if self._thread is None:
+            self.start()
+        elif not self._thread.is_alive():
+            # Writer arrêté : attendre une place dans la file bloquerait la boucle de trading
+            trade_writer_dropped.inc()
+            log_error(f"Writer des trades arrêté, trade {record.get('execution_id')} non écrit")
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            trade_writer_backpressure.inc()
+            self._queue.put(record)
+        trade_writer_queue_depth.set(self._queue.qsize())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = connect_sqlite(self.db_path)  # WAL et pragmas du profil partagé
+        conn.execute(trade_table_ddl(self.table))
+        ensure_sqlite_indexes(conn)
+        return conn
+
+    def _connect_with_retry(self) -> Optional[sqlite3.Connection]:
+        """Connexion à la base, retentée avec un délai croissant ; None si stop() est appelé entre-temps."""
+        delay = CONNECT_RETRY_SECONDS
+        while True:
+            try:
+                return self._connect()
+            except (sqlite3.Error, OSError) as e:
+                trade_writer_connect_errors.inc()
+                log_error(f"Connexion du writer à {self.db_path} impossible, nouvel essai dans {delay:.1f} s : {e}")
+            if self._stopping.wait(delay):
+                return None
+            delay = min(delay * 2, CONNECT_RETRY_MAX_SECONDS)
+
+    def _flush(self, conn: sqlite3.Connection, batch: List[Dict[str, Any]]) -> bool:
+        start = time.perf_counter()
+        try:
+            with conn:  # Une transaction par lot : un seul fsync pour batch_size trades
+                conn.executemany(self._insert, [trade_row(record) for record in batch])
+        except sqlite3.Error as e:
+            trade_writer_errors.inc()
+            log_error(f"Échec de l'écriture de {len(batch)} trades dans {self.table} : {e}")
+            return False
+        trade_writer_flush_latency.observe(time.perf_counter() - start)
+        trade_writer_rows.inc(len(batch))
+        trade_writer_queue_depth.set(self._queue.qsize())
+        self.rows_written += len(batch)
+        self.flushes += 1
+        return True
+
+    def _run(self) -> None:
+        conn = self._connect_with_retry()
+        if conn is None:
+            log_error(f"Writer des trades arrêté sans connexion : {self._queue.qsize()} trades non écrits")
+            return
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_seconds
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+            except queue.Empty:
+                pass
+            if batch and (stopping or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                if self._flush(conn, batch):
+                    batch = []
+                elif stopping:
+                    log_error(f"{len(batch)} trades non écrits à l'arrêt du writer")
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_seconds
+        conn.close()
+        log_info(f"Writer des trades arrêté : {self.rows_written} trades écrits en {self.flushes} transactions")
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Vide la file, écrit le dernier lot et arrête le thread."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._stopping.set()
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass  # Thread sorti sans connexion : la file pleine n'est plus vidée
+        self._thread.join(timeout)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+# -----------------------------
+# BENCHMARK CONTRE L'INSERTION SYNCHRONE (FACULTATIF)
+# -----------------------------
+
+def _sample_trade(i: int) -> Dict[str, Any]:
+    return {"execution_id": f"exec_{i}", "loop_id": f"loop_{i % 10}", "pair_sequence": ["BTCUSDT", "ETHBTC", "ETHUSDT"],
+            "execution_prices": [40000.0, 0.067, 2550.0], "quantities": [0.001, 0.65, 25.5], "side": "BUY",
+            "pair": "BTCUSDT", "open_rate": 40000.0 + i, "amount": 0.001, "realized_profit": 0.01,
+            "open_date": "2024-01-01T00:00:00Z", "final_balance": 100.0}
+
+def benchmark_trade_writer(trade_count: int = 5000) -> Dict[str, float]:
+    """Temps passé dans le chemin d'exécution : INSERT + COMMIT par trade contre submit() dans la file."""
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        sync_path = os.path.join(directory, "sync.sqlite")
+        conn = sqlite3.connect(sync_path)
+        conn.execute(trade_table_ddl())
+        insert = insert_statement("trades", TRADE_COLUMNS)
+        start = time.perf_counter()
+        for i in range(trade_count):
+            conn.execute(insert, trade_row(_sample_trade(i)))
+            conn.commit()
+        results["sync_us_per_trade"] = (time.perf_counter() - start) / trade_count * 1e6
+        conn.close()
+
+        writer = TradeWriter(os.path.join(directory, "async.sqlite"))
+        writer.start()
+        records = [_sample_trade(i) for i in range(trade_count)]
+        start = time.perf_counter()
+        for record in records:
+            writer.submit(record)
+        results["submit_us_per_trade"] = (time.perf_counter() - start) / trade_count * 1e6
+        writer.stop()
+        results["drain_seconds"] = time.perf_counter() - start
+        results["flushes"] = writer.flushes
+        stored = sqlite3.connect(writer.db_path).execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+        if stored != trade_count:
+            raise AssertionError(f"{stored} trades écrits sur {trade_count}")
+    return results
+
+if __name__ == "__main__":
+    results = benchmark_trade_writer(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
+    print(f"INSERT + COMMIT synchrone : {results['sync_us_per_trade']:.1f} µs/trade | "
+          f"submit() : {results['submit_us_per_trade']:.1f} µs/trade | "
+          f"file vidée en {results['drain_seconds']:.2f} s ({results['flushes']} transactions)")